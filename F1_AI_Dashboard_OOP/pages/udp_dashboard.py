@@ -4,16 +4,27 @@ import plotly.graph_objs as go
 import threading
 import dash_bootstrap_components as dbc
 from f1_22_telemetry.listener import TelemetryListener
-from f1_22_telemetry.packets import *
 from pages.top_bar import top_bar
 from collections import deque
 import socket
 import time
+import os
+import sys
 import numpy as np
 import pandas as pd
 
+# The F1 22 / F1 23 decoder registry is shared with the event detection pipeline
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "event_detection_telemetry"))
+from decoders.registry import classes_for, packet_class_of, packet_format_of
+from vectorized.numpy_decoder import decode_cars
+
 dash.register_page(__name__, path="/udp-dashboard")
 
+# Packet classes of every supported game year, by packet type
+PARTICIPANTS_PACKETS = classes_for(4)
+MOTION_PACKETS = classes_for(0)
+CAR_TELEMETRY_PACKETS = classes_for(6)
+
 # Global variables
 listener = None
 udp_thread = None
@@ -37,6 +48,15 @@ telem_data = np.empty((buffer_size,len(telem_columns)), dtype=object)  # Stores
 telem_index = 0 
 selected_driver_index = 0  # Set to correct driver index
 
+# Packet fields behind each buffer column (after the timestamp)
+motion_fields = [
+        "world_position_x", "world_position_y", "world_position_z",
+        "world_velocity_x", "world_velocity_y", "world_velocity_z",
+        "g_force_lateral", "g_force_longitudinal", "g_force_vertical"
+    ]
+telem_fields = ["speed", "throttle", "brake", "gear", "engine_rpm"]
+
+
 def reset_data():
     global buffer_size, motion_columns, motion_data, motion_index, telem_columns, telem_data, telem_index
     del motion_data, telem_data
@@ -81,21 +101,35 @@ layout = html.Div([
     dcc.Store(id="udp-selected-driver"),
 ])
 
-def udp_listener(ip, port):
-    """Listens for F1 22 telemetry and updates driver data."""
+def udp_listener(ip, port, packet_format=2022):
+    """Listens for F1 22 or F1 23 telemetry, as selected in the UDP settings, and updates driver data."""
     global running, listener, rate, selected_driver_index
 
     try:
         port = int(port)  # ✅ Ensure port is an integer
         listener = TelemetryListener(host=ip, port=port)
-        print(f"✅ Started UDP Listener on {ip}:{port}")
+        print(f"✅ Started UDP Listener on {ip}:{port} for F1 {packet_format % 100} packets")
+        other_format_warned = False
 
         while running:
             try:
-                packet = listener.get()
+                data = listener.socket.recv(2048)
+
+                # Decode with the layout registered for the selected game year only
+                if packet_format_of(data) != packet_format:
+                    if not other_format_warned:
+                        print(f"⚠️ Skipping packets with format {packet_format_of(data)}, "
+                              f"the selected format is {packet_format}. Check the UDP settings.")
+                        other_format_warned = True
+                    continue
+
+                packet_class = packet_class_of(data)
+                if packet_class is None:
+                    continue
+                packet = packet_class.unpack(data)
 
                 # ✅ Extract driver names (filter out empty entries)
-                if isinstance(packet, PacketParticipantsData):
+                if isinstance(packet, PARTICIPANTS_PACKETS):
                     for i, participant in enumerate(packet.participants):
                         driver_name = participant.name.decode("utf-8").strip()
                         if driver_name:
@@ -104,34 +138,26 @@ def udp_listener(ip, port):
                 global motion_data, motion_index, buffer_size, telem_data, telem_index
                 timestamp = packet.header.session_time  # Common timestamp for all packets
 
-                if isinstance(packet, PacketMotionData): 
-                    for i, player in enumerate(packet.car_motion_data):
-                        if i == selected_driver_index:
-                            data_row = [timestamp, player.world_position_x, player.world_position_y, player.world_position_z,
-                                        player.world_velocity_x, player.world_velocity_y, player.world_velocity_z,
-                                        player.g_force_lateral, player.g_force_longitudinal, player.g_force_vertical]
-                            
-                            # Store data in the circular buffer
-                            motion_data[motion_index % buffer_size] = data_row
-                            
-                            # Update index (ensures rolling behavior)
-                            motion_index += 1
-                    # print("Motion!")
-
-                if isinstance(packet, PacketCarTelemetryData):
-                    for i, player in enumerate(packet.car_telemetry_data):
-                        if i == selected_driver_index:
-                            data_row = [timestamp, player.speed, player.throttle, player.brake, player.gear,
-                                        player.engine_rpm, #"Active" if player.drs else "Inactive",
-                                        player.tyres_surface_temperature[0], player.tyres_surface_temperature[1],
-                                        player.tyres_surface_temperature[2], player.tyres_surface_temperature[3]]
-                            
-                            # Store data in the circular buffer
-                            telem_data[telem_index % buffer_size] = data_row
-                            
-                            # Update index (ensures rolling behavior)
-                            telem_index += 1
-                    # print("Telemetry!")
+                if isinstance(packet, MOTION_PACKETS):
+                    cars = decode_cars(packet, type(packet))
+                    data_row = [timestamp, *cars[motion_fields][selected_driver_index].tolist()]
+
+                    # Store data in the circular buffer
+                    motion_data[motion_index % buffer_size] = data_row
+
+                    # Update index (ensures rolling behavior)
+                    motion_index += 1
+
+                if isinstance(packet, CAR_TELEMETRY_PACKETS):
+                    cars = decode_cars(packet, type(packet))
+                    data_row = [timestamp, *cars[telem_fields][selected_driver_index].tolist(),
+                                *cars["tyres_surface_temperature"][selected_driver_index].tolist()]
+
+                    # Store data in the circular buffer
+                    telem_data[telem_index % buffer_size] = data_row
+
+                    # Update index (ensures rolling behavior)
+                    telem_index += 1
 
                 # time.sleep(0.2)  # ✅ Force continuous updates based on FPS
 
@@ -172,6 +198,7 @@ def toggle_udp(n_clicks, udp_config):
     ip = udp_config.get("ip", "127.0.0.1")
     port = udp_config.get("port", 20777)
     rate = int(udp_config.get("rate", 30))
+    packet_format = int(udp_config.get("format", 2022))
 
     if running:
         print("⚠️ Stopping existing UDP listener...")
@@ -191,7 +218,7 @@ def toggle_udp(n_clicks, udp_config):
     running = True
 
     print(f"✅ Starting new UDP listener on {ip}:{port}...")
-    udp_thread = threading.Thread(target=udp_listener, args=(ip, port), daemon=True)
+    udp_thread = threading.Thread(target=udp_listener, args=(ip, port, packet_format), daemon=True)
     udp_thread.start()
 
     return "Stop Streaming"
@@ -1,4 +1,5 @@
 import logging
+import argparse
 import csv
 import threading
 import signal
@@ -7,10 +8,18 @@ import os
 import time
 import datetime
 import re
+import select
 import shutil
+import socket
+import ctypes
 from f1_22_telemetry.listener import TelemetryListener
 from f1_22_telemetry.packets import *
 
+# The NumPy packet decoder is shared with the event detection pipeline
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "event_detection_telemetry"))
+from vectorized.numpy_decoder import decode_cars
+
+
 class TelemetryLogger:
     """Handles directory creation and file writing operations for telemetry data."""
 
@@ -131,54 +140,65 @@ class TelemetryProcessor:
 
         # ✅ 4. MOTION DATA (Per Driver)
         elif isinstance(packet, PacketMotionData):
-            for i, player in enumerate(packet.car_motion_data):
-                self.logger.write_to_csv(i, "motion", [
-                    timestamp, player.world_position_x, player.world_position_y, player.world_position_z,
-                    player.world_velocity_x, player.world_velocity_y, player.world_velocity_z,
-                    player.g_force_lateral, player.g_force_longitudinal, player.g_force_vertical
-                ])
+            cars = decode_cars(packet, type(packet))[[
+                "world_position_x", "world_position_y", "world_position_z",
+                "world_velocity_x", "world_velocity_y", "world_velocity_z",
+                "g_force_lateral", "g_force_longitudinal", "g_force_vertical"
+            ]]
+            for i, row in enumerate(cars.tolist()):
+                self.logger.write_to_csv(i, "motion", [timestamp, *row])
 
         # ✅ 5. LAP DATA (Per Driver)
         elif isinstance(packet, PacketLapData):
-            for i, player in enumerate(packet.lap_data):
-                self.logger.write_to_csv(i, "lap", [
-                    timestamp, player.current_lap_time_in_ms, player.sector1_time_in_ms,
-                    player.sector2_time_in_ms, player.current_lap_invalid
-                ])
+            cars = decode_cars(packet, type(packet))[[
+                "current_lap_time_in_ms", "sector1_time_in_ms", "sector2_time_in_ms", "current_lap_invalid"
+            ]]
+            for i, row in enumerate(cars.tolist()):
+                self.logger.write_to_csv(i, "lap", [timestamp, *row])
 
         # ✅ 6. CAR TELEMETRY DATA (Per Driver)
         elif isinstance(packet, PacketCarTelemetryData):
-            for i, player in enumerate(packet.car_telemetry_data):
+            cars = decode_cars(packet, type(packet))
+            rows = cars[["speed", "throttle", "brake", "gear", "engine_rpm"]].tolist()
+            drs = cars["drs"].tolist()
+            tyre_temperatures = cars["tyres_surface_temperature"].tolist()
+            for i, row in enumerate(rows):
                 self.logger.write_to_csv(i, "car_telemetry", [
-                    timestamp, player.speed, player.throttle, player.brake, player.gear,
-                    player.engine_rpm, "Active" if player.drs else "Inactive",
-                    *player.tyres_surface_temperature
+                    timestamp, *row, "Active" if drs[i] else "Inactive", *tyre_temperatures[i]
                 ])
 
         # ✅ 7. CAR STATUS DATA (Per Driver)
         elif isinstance(packet, PacketCarStatusData):
-            for i, player in enumerate(packet.car_status_data):
-                self.logger.write_to_csv(i, "car_status", [
-                    timestamp, player.fuel_remaining_laps, player.ers_store_energy,
-                    player.drs_allowed, player.tyres_age_laps
-                ])
+            cars = decode_cars(packet, type(packet))[[
+                "fuel_remaining_laps", "ers_store_energy", "drs_allowed", "tyres_age_laps"
+            ]]
+            for i, row in enumerate(cars.tolist()):
+                self.logger.write_to_csv(i, "car_status", [timestamp, *row])
 
         # ✅ 8. CAR DAMAGE DATA (Per Driver)
         elif isinstance(packet, PacketCarDamageData):
-            for i, player in enumerate(packet.car_damage_data):
-                self.logger.write_to_csv(i, "car_damage", [
-                    timestamp, player.tyres_wear[0], player.tyres_wear[1], player.tyres_wear[2], player.tyres_wear[3],
-                    player.brakes_damage[0], player.brakes_damage[1], player.brakes_damage[2], player.brakes_damage[3],
-                    player.gearbox_damage, player.engined_damage  
-                ])
+            cars = decode_cars(packet, type(packet))
+            tyres_wear = cars["tyres_wear"].tolist()
+            brakes_damage = cars["brakes_damage"].tolist()
+            rows = cars[["gearbox_damage", "engined_damage"]].tolist()
+            for i, row in enumerate(rows):
+                self.logger.write_to_csv(i, "car_damage", [timestamp, *tyres_wear[i], *brakes_damage[i], *row])
 
 class TelemetryListenerManager:
     """Handles the telemetry listener and manages packet processing and cleanup."""
 
-    def __init__(self, host='127.0.0.1', port=20777):
+    def __init__(self, host='127.0.0.1', port=20777, recv_buffer_size=8 * 1024 * 1024, batch_size=256,
+                 stats_log_interval=30.0):
         self.host = host
         self.port = port
         self.listener = TelemetryListener(host, port)
+        # A larger kernel buffer absorbs bursts while CSV writes hold up the listener thread
+        self.listener.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer_size)
+        self.listener.socket.setblocking(False)
+        self.batch_size = batch_size
+        self.stats_log_interval = stats_log_interval
+        self.received = {}  # Packet class name -> datagrams received
+        self.unsupported = 0
         self.logger = TelemetryLogger()
         self.processor = TelemetryProcessor(self.logger)
         self.run_event = threading.Event()
@@ -190,19 +210,55 @@ class TelemetryListenerManager:
         print(f"📡 Listening for F1 22 telemetry data on {self.host}:{self.port}...")
         logging.info("Telemetry listener started.")
 
+        last_stats_log = time.monotonic()
         while self.run_event.is_set():
             try:
-                packet = self.listener.get()
-                if packet:
+                for packet in self.recv_batch():
                     self.processor.process_packet(packet)
-            except TimeoutError:
-                continue
             except Exception as e:
                 logging.error(f"Error in listener: {e}")
                 break
 
+            if time.monotonic() - last_stats_log >= self.stats_log_interval:
+                last_stats_log = time.monotonic()
+                self.log_stats()
+
+        self.log_stats()
         print("🛑 Stopping telemetry listener...")
 
+    def recv_batch(self, timeout=0.5):
+        """Waits up to `timeout` for data, then unpacks every queued datagram (at most `batch_size`)."""
+        sock = self.listener.socket
+        if not select.select([sock], [], [], timeout)[0]:
+            return []
+
+        packets = []
+        for _ in range(self.batch_size):
+            try:
+                data = sock.recv(2048)
+            except BlockingIOError:
+                break
+
+            if len(data) < ctypes.sizeof(PacketHeader):
+                self.unsupported += 1
+                continue
+            header = PacketHeader.from_buffer_copy(data)
+            packet_class = HEADER_FIELD_TO_PACKET_TYPE.get(
+                (header.packet_format, header.packet_version, header.packet_id))
+            if packet_class is None or len(data) < ctypes.sizeof(packet_class):
+                self.unsupported += 1
+                continue
+
+            name = packet_class.__name__
+            self.received[name] = self.received.get(name, 0) + 1
+            packets.append(packet_class.unpack(data))
+        return packets
+
+    def log_stats(self):
+        """Logs how many datagrams were received per packet type and how many were not F1 22 packets."""
+        logging.info(f"Received {sum(self.received.values())} packets ({self.unsupported} unsupported): "
+                     f"{self.received}")
+
     def start(self):
         """Starts the telemetry listener in a separate thread."""
         self.listener_thread_instance = threading.Thread(target=self.listener_thread)
@@ -243,7 +299,13 @@ class TelemetryListenerManager:
         
 def main():
     """Main function to start telemetry listener and handle shutdown."""
-    telemetry_manager = TelemetryListenerManager()
+    parser = argparse.ArgumentParser(description="Log F1 22 telemetry to per-driver CSV files.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=20777,
+                        help="UDP port to listen on, e.g. a relay port when sharing the game stream.")
+    args = parser.parse_args()
+
+    telemetry_manager = TelemetryListenerManager(host=args.host, port=args.port)
 
     telemetry_manager.start()  # Start the telemetry listener
 
@@ -0,0 +1,301 @@
+import asyncio
+import datetime
+import signal
+import socket
+import structlog
+from decoders.registry import MIN_HEADER_SIZE
+from dispatch.packet_dispatcher import PacketDispatcher
+from ingest.batched_udp_source import IngestStats
+from listener import PARSER_MAPPING
+from recordWriter.record_writer import open_writer
+from recordWriter.session_writer import session_clock_for
+from raceState.race_state import RaceState
+from eventEngine.event_engine import EventEngine
+from gapEngine.gap_engine import GapEngine
+from miniSectors.mini_sector_index import MiniSectorIndex
+from tyreModel.tyre_degradation import TyreDegradationModel
+from engineFeed.engine_feed import EngineSet
+from changeFilter.change_filter import change_filter_for
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+
+class TelemetryDatagramProtocol(asyncio.DatagramProtocol):
+    """Feeds every datagram received on the telemetry socket into the pipeline."""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def datagram_received(self, data, addr):
+        self.pipeline.feed(data)
+
+    def error_received(self, exc):
+        log.error(f"UDP receive error: {exc}")
+
+
+class QueueSink:
+    """Async sink that hands parsed records to an in-process consumer, e.g. commentary or HTTP."""
+
+    def __init__(self, maxsize=1000):
+        """
+        Args:
+            maxsize (int): Records buffered before the oldest is discarded for a slow consumer.
+        """
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    async def write(self, packet_type, record):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait((packet_type, record))
+
+    async def get(self):
+        """Returns the next (packet_type, record) tuple."""
+        return await self.queue.get()
+
+
+class AsyncTelemetryPipeline:
+    """
+    asyncio counterpart of `MainTelemetryListener` and its `Listener` threads.
+
+    A `DatagramProtocol` receives and dispatches packets, one consumer task per packet type
+    runs the same parsers, and parsed records go to the JSON files and any async sinks, all
+    on a single event loop.
+    """
+
+    def __init__(self, packet_types=None, player_indexes=None, ip='127.0.0.1', port=20777,
+                 decoder="ctypes", sinks=None, write_json=True, queue_size=1000,
+                 recv_buffer_size=8 * 1024 * 1024, drain_timeout=5.0, output_format="json", writer_options=None,
+                 dedupe=None, parser_options=None, engines=None, pit_strategy=None):
+        """
+        Configures the pipeline; nothing is bound until `run()`.
+
+        Args:
+            packet_types (list, optional): Packet types to process.
+            player_indexes (list, optional): Player indexes to extract data for.
+            ip (str): Host to bind the telemetry socket to.
+            port (int): UDP port to bind the telemetry socket to.
+            decoder (str): "ctypes" or "numpy", see `PacketDispatcher`.
+            sinks (list, optional): Objects with `async write(packet_type, record)` and optionally
+                `async close()`, called with every parsed record.
+            write_json (bool): Also write `{packet_type}_{datetime}` record files like `Listener`.
+            queue_size (int): Packets buffered per type; the oldest is dropped when full.
+            recv_buffer_size (int): Kernel receive buffer requested for the telemetry socket.
+            drain_timeout (float): Seconds allowed on shutdown to process packets still queued.
+            output_format (str | list): Format(s) of the record files, see `open_writer`.
+            writer_options (dict, optional): Writer options passed to each `open_writer`, including
+                session partitioning and rotation, see `SessionWriter`.
+            dedupe (bool | dict, optional): Drop records that repeat earlier ones, before the files and
+                the sinks, see `change_filter_for`.
+            parser_options (dict, optional): packet_type -> keyword arguments for its parser, e.g.
+                {"sessionHistory": {"incremental": True}}.
+            engines (iterable, optional): Analytics engines fed with every datagram, as names from
+                `ENGINES` or objects with `feed(data)`, see `EngineSet`. With "event_engine", events go to
+                the sinks as packet type "raceEvent" and, with `write_json`, to `raceEvents_<date>.ndjson`.
+            pit_strategy (bool | dict, optional): Rank every car's pit stop strategies once per lap with
+                a `PitStrategyPlanner`; a dict holds its options. Strategy calls go to the sinks as packet
+                type "strategyCall" and, with `write_json`, to `strategyCalls_<date>.ndjson`.
+        """
+        self.packet_types = packet_types or ["carDamage", "carTelemetry", "session"]
+        self.player_indexes = player_indexes
+        self.ip = ip
+        self.port = port
+        self.sinks = sinks or []
+        self.write_json = write_json
+        self.queue_size = queue_size
+        self.recv_buffer_size = recv_buffer_size
+        self.drain_timeout = drain_timeout
+        self.output_format = output_format
+        self.session_clock = session_clock_for(writer_options)  # Player's lap for `rotate_laps`
+        self.writer_options = {**(writer_options or {}), **({"session_clock": self.session_clock}
+                                                             if self.session_clock else {})}
+        self.dedupe = dedupe
+        self.parser_options = parser_options or {}
+        self.engines = EngineSet(engines, pit_strategy)
+        self.race_state = self.engines.find(RaceState)
+        self.event_engine = self.engines.find(EventEngine)
+        self.gap_engine = self.engines.find(GapEngine)
+        self.mini_sectors = self.engines.find(MiniSectorIndex)
+        self.tyre_model = self.engines.find(TyreDegradationModel)
+        self.pit_strategy = self.engines.pit_strategy
+        self.strategy_writer = None
+        self.event_writer = None
+
+        self.dispatcher = PacketDispatcher(self.packet_types, player_indexes, decoder)
+        self.stats = IngestStats()
+        self.overflowed = {packet_type: 0 for packet_type in self.packet_types}
+        self.session_date = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+        self.queues = {}
+        self.parsers = {}
+        self.writers = {}
+        self.change_filters = {}
+        self.loop = None
+        self.stop_event = None
+
+    def feed(self, data):
+        """
+        Accounts for, decodes and queues one raw datagram. Must run on the pipeline's loop.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+        """
+        if len(data) < MIN_HEADER_SIZE:
+            self.stats.short += 1
+            return
+
+        self.stats.record(data)
+        if self.session_clock:
+            self.session_clock.observe(data)  # Before the packet can reach a writer
+        for engine in self.engines:
+            engine.feed(data)
+        decoded = self.dispatcher.decode(data)
+        if decoded is None:
+            return
+
+        packet_type, packet = decoded
+        queue = self.queues[packet_type]
+        if queue.full():
+            queue.get_nowait()
+            queue.task_done()
+            self.overflowed[packet_type] += 1
+        queue.put_nowait(packet)
+
+    async def _consume(self, packet_type):
+        """Parses queued packets of one type and hands the records to the outputs."""
+        queue = self.queues[packet_type]
+        parser = self.parsers[packet_type]
+        writer = self.writers[packet_type]
+        change_filter = self.change_filters[packet_type]
+        partitioned = getattr(writer, "partitioned", False)  # A `SessionWriter` takes each record's session
+
+        while True:
+            try:
+                packet = await asyncio.wait_for(queue.get(), writer.time_to_flush() if writer else None)
+            except asyncio.TimeoutError:
+                writer.flush()  # Flush interval passed without new packets
+                continue
+            try:
+                record = parser.parse(packet, self.player_indexes)
+                if change_filter:
+                    record = change_filter.filter(record)
+                if record:
+                    if self.write_json:
+                        parser.save_to_file(record, parser.session_uid(packet) if partitioned else None)
+                    for sink in self.sinks:
+                        await sink.write(packet_type, record)
+            except Exception as e:
+                log.error(f"Error processing {packet_type}: {e}")
+            finally:
+                queue.task_done()
+
+    def _publish_event(self, event):
+        """Hands a race event to the async sinks; `feed()` runs on the loop, so tasks can be created."""
+        record = event.to_dict()
+        for sink in self.sinks:
+            self.loop.create_task(sink.write("raceEvent", record))
+
+    def _publish_strategy(self, call):
+        """Hands a strategy call to the async sinks; runs in the planner's thread, so it goes through the loop."""
+        for sink in self.sinks:
+            self.loop.call_soon_threadsafe(self.loop.create_task, sink.write("strategyCall", call))
+
+    async def run(self):
+        """Receives and processes telemetry until `stop()` is called or SIGINT/SIGTERM arrives."""
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+
+        for packet_type in self.packet_types:
+            parser_class = PARSER_MAPPING.get(packet_type)
+            if parser_class is None:
+                continue
+            writer = None
+            if self.write_json:
+                writer = open_writer(packet_type, self.session_date, parser_class, self.output_format,
+                                     self.writer_options, self.parser_options.get(packet_type))
+            self.writers[packet_type] = writer
+            self.parsers[packet_type] = parser_class(writer, **self.parser_options.get(packet_type, {}))
+            self.change_filters[packet_type] = change_filter_for(packet_type, parser_class, self.dedupe)
+            self.queues[packet_type] = asyncio.Queue(maxsize=self.queue_size)
+
+        if self.event_engine:
+            if self.write_json:
+                self.event_writer = open_writer("raceEvents", self.session_date, None, "ndjson", {"flush_interval": 0},
+                                                directory=self.writer_options.get("output_dir", ""))
+                self.event_engine.subscribe(lambda event: self.event_writer.write([event.to_dict()]))
+            self.event_engine.subscribe(self._publish_event)
+
+        if self.pit_strategy:
+            if self.write_json:
+                self.strategy_writer = open_writer("strategyCalls", self.session_date, None, "ndjson",
+                                                   {"flush_interval": 0},
+                                                   directory=self.writer_options.get("output_dir", ""))
+                self.pit_strategy.subscribe(lambda call: self.strategy_writer.write([call]))
+            self.pit_strategy.subscribe(self._publish_strategy)
+            self.pit_strategy.start()
+
+        transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: TelemetryDatagramProtocol(self), local_addr=(self.ip, self.port)
+        )
+        transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.recv_buffer_size)
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self.loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not supported on Windows or outside the main thread
+
+        consumers = [asyncio.create_task(self._consume(packet_type)) for packet_type in self.queues]
+        log.info(f"Async pipeline listening on {self.ip}:{self.port} for packets: {list(self.queues)}")
+
+        try:
+            await self.stop_event.wait()
+        finally:
+            transport.close()
+            await self._shutdown(consumers)
+
+    async def _shutdown(self, consumers):
+        """Drains the queues within `drain_timeout`, then stops consumers and closes outputs."""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self.queues.values())),
+                                   timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning("Shutdown drain timed out, discarding queued packets.",
+                        discarded={packet_type: queue.qsize() for packet_type, queue in self.queues.items()})
+
+        for consumer in consumers:
+            consumer.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+
+        if self.pit_strategy:
+            await self.loop.run_in_executor(None, self.pit_strategy.stop)  # Joins the planner and its processes
+            await asyncio.sleep(0)  # Let the last strategy calls reach the sinks
+
+        for sink in self.sinks:
+            close = getattr(sink, "close", None)
+            if close:
+                await close()
+
+        for packet_type, writer in self.writers.items():
+            if writer:
+                writer.close()
+        if self.event_writer:
+            self.event_writer.close()
+        if self.strategy_writer:
+            self.strategy_writer.close()
+
+        log.info("Async pipeline stopped.", overflowed=self.overflowed, **self.stats.report(),
+                 **({"race_events": self.event_engine.stats()} if self.event_engine else {}))
+
+    def stop(self):
+        """Requests shutdown; safe to call from any thread."""
+        if self.loop is None or self.stop_event is None:
+            return
+        self.loop.call_soon_threadsafe(self.stop_event.set)
+
+
+if __name__ == "__main__":
+    pipeline = AsyncTelemetryPipeline()
+    asyncio.run(pipeline.run())
@@ -0,0 +1,395 @@
+import argparse
+import bisect
+import mmap
+import struct
+import time
+from array import array
+import structlog
+from f1_22_telemetry.listener import TelemetryListener
+from decoders.registry import header_fields, decode_datagram, HEADER_LAYOUTS, MIN_HEADER_SIZE
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+# File layout:
+#   file header | record* | index entry* | trailer
+# Each record is a receive timestamp and payload length followed by the raw datagram.
+# The index and trailer are written on close; a capture without them (e.g. after a
+# crash) is still readable, the reader simply rebuilds the index by scanning records.
+CAPTURE_MAGIC = b"F1RAWCAP"
+INDEX_MAGIC = b"F1CAPIDX"
+CAPTURE_VERSION = 1
+
+_FILE_HEADER = struct.Struct("<8sHH")       # magic, version, reserved
+_RECORD_HEADER = struct.Struct("<dH")       # receive time (unix seconds), payload length
+_INDEX_ENTRY = struct.Struct("<QfIB")       # record offset, session_time, frame_identifier, packet_id
+_TRAILER = struct.Struct("<QQ8s")           # index offset, index entry count, magic
+
+
+class RawCaptureWriter:
+    """Appends raw telemetry datagrams and their receive timestamps to a binary capture file."""
+
+    def __init__(self, path):
+        """
+        Creates a new capture file.
+
+        Args:
+            path (str): Destination file; an existing file is overwritten.
+        """
+        self.path = path
+        self.file_handle = open(path, "wb")
+        self.file_handle.write(_FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, 0))
+        self.offset = _FILE_HEADER.size
+        self.index = bytearray()
+        self.count = 0
+        self.closed = False
+
+    def write(self, data, recv_time=None):
+        """
+        Appends one datagram to the capture.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+            recv_time (float, optional): Receive time in unix seconds. Defaults to now.
+        """
+        fields = header_fields(data)
+        if fields is None:
+            return  # Unsupported packet_format or shorter than its PacketHeader
+
+        if recv_time is None:
+            recv_time = time.time()
+
+        packet_id, _, session_time, frame_identifier = fields
+
+        self.file_handle.write(_RECORD_HEADER.pack(recv_time, len(data)))
+        self.file_handle.write(data)
+        self.index += _INDEX_ENTRY.pack(self.offset, session_time, frame_identifier, packet_id)
+        self.offset += _RECORD_HEADER.size + len(data)
+        self.count += 1
+
+    def close(self):
+        """Writes the index and trailer, then closes the file."""
+        if self.closed:
+            return
+
+        self.closed = True
+        try:
+            self.file_handle.write(self.index)
+            self.file_handle.write(_TRAILER.pack(self.offset, self.count, INDEX_MAGIC))
+            self.file_handle.close()
+            log.info(f"Capture {self.path} closed with {self.count} packets.")
+        except Exception as e:
+            log.error(f"Error closing capture {self.path}: {e}")
+
+
+class RawCaptureReader:
+    """Memory-mapped, indexed read access to a capture written by `RawCaptureWriter`."""
+
+    def __init__(self, path):
+        """
+        Opens and indexes a capture file.
+
+        Args:
+            path (str): Capture file to open.
+        """
+        self.path = path
+        self.file_handle = open(path, "rb")
+        self.mm = mmap.mmap(self.file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _ = _FILE_HEADER.unpack_from(self.mm, 0)
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {CAPTURE_VERSION} telemetry capture.")
+
+        self.offsets = array("Q")
+        self.session_times = array("d")
+        self.frame_identifiers = array("I")
+        self.packet_ids = array("B")
+        self.session_uids = None  # Read from the record headers on the first lookup
+        self.runs = {}  # Index name -> [(start, end, session_uid)] of its sorted runs
+
+        if not self._load_index():
+            self._scan_records()
+
+    def _load_index(self):
+        """Reads the index written on close. Returns False if the capture has no trailer."""
+        size = len(self.mm)
+        if size < _FILE_HEADER.size + _TRAILER.size:
+            return False
+
+        index_offset, count, magic = _TRAILER.unpack_from(self.mm, size - _TRAILER.size)
+        if magic != INDEX_MAGIC or index_offset + count * _INDEX_ENTRY.size != size - _TRAILER.size:
+            return False
+
+        for offset, session_time, frame_identifier, packet_id in _INDEX_ENTRY.iter_unpack(
+                self.mm[index_offset:size - _TRAILER.size]):
+            self._append_index(offset, session_time, frame_identifier, packet_id)
+
+        self.data_end = index_offset
+        return True
+
+    def _scan_records(self):
+        """Rebuilds the index from the records of an unterminated capture."""
+        log.info(f"Capture {self.path} has no index, scanning records.")
+        size = len(self.mm)
+        offset = _FILE_HEADER.size
+
+        while offset + _RECORD_HEADER.size <= size:
+            _, length = _RECORD_HEADER.unpack_from(self.mm, offset)
+            start = offset + _RECORD_HEADER.size
+            if length < MIN_HEADER_SIZE or start + length > size:
+                break  # Truncated final record
+
+            packet_id, _, session_time, frame_identifier = header_fields(self.mm[start:start + length])
+            self._append_index(offset, session_time, frame_identifier, packet_id)
+            offset = start + length
+
+        self.data_end = offset
+
+    def _append_index(self, offset, session_time, frame_identifier, packet_id):
+        self.offsets.append(offset)
+        self.session_times.append(session_time)
+        self.frame_identifiers.append(frame_identifier)
+        self.packet_ids.append(packet_id)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def record(self, position):
+        """
+        Returns a single record.
+
+        Args:
+            position (int): Record number in capture order.
+
+        Returns:
+            tuple: (recv_time, datagram bytes)
+        """
+        offset = self.offsets[position]
+        recv_time, length = _RECORD_HEADER.unpack_from(self.mm, offset)
+        start = offset + _RECORD_HEADER.size
+        return recv_time, self.mm[start:start + length]
+
+    def recv_time(self, position):
+        """Returns the receive timestamp of a record without copying its payload."""
+        return _RECORD_HEADER.unpack_from(self.mm, self.offsets[position])[0]
+
+    def _load_session_uids(self):
+        """Reads the session_uid of every record from its PacketHeader; the index does not store it."""
+        self.session_uids = array("Q")
+        for offset in self.offsets:
+            start = offset + _RECORD_HEADER.size
+            layout = HEADER_LAYOUTS[self.mm[start] | self.mm[start + 1] << 8]
+            self.session_uids.append(layout[1].unpack_from(self.mm, start)[1])
+
+    def _sorted_runs(self, name):
+        """
+        Splits the capture into runs of one session in which the index `name` never decreases.
+
+        A capture can span several sessions, restarts and flashbacks, so `session_times` and
+        `frame_identifiers` are only sorted within such a run.
+
+        Returns:
+            list: (start, end, session_uid) of every run, in capture order.
+        """
+        runs = self.runs.get(name)
+        if runs is not None:
+            return runs
+        if self.session_uids is None:
+            self._load_session_uids()
+
+        values, session_uids = getattr(self, name), self.session_uids
+        runs = []
+        start = 0
+        for position in range(1, len(values)):
+            if values[position] < values[position - 1] or session_uids[position] != session_uids[start]:
+                runs.append((start, position, session_uids[start]))
+                start = position
+        if values:
+            runs.append((start, len(values), session_uids[start]))
+        self.runs[name] = runs
+        return runs
+
+    def _find(self, name, value, session_uid):
+        """Binary searches the first sorted run of `session_uid` (any session if None) that reaches `value`."""
+        values = getattr(self, name)
+        for start, end, run_session_uid in self._sorted_runs(name):
+            if (session_uid is None or run_session_uid == session_uid) and values[end - 1] >= value:
+                return bisect.bisect_left(values, value, start, end)
+        return len(self)
+
+    def find_session_time(self, session_time, session_uid=None):
+        """
+        Returns the first record position at or after `session_time`.
+
+        Args:
+            session_time (float): Session time to look for.
+            session_uid (int, optional): Only search this session. Defaults to the first run of
+                any session that reaches `session_time`.
+
+        Returns:
+            int: The position, or `len(self)` if no record qualifies.
+        """
+        return self._find("session_times", session_time, session_uid)
+
+    def find_frame(self, frame_identifier, session_uid=None):
+        """Returns the first record position at or after `frame_identifier`, like `find_session_time()`."""
+        return self._find("frame_identifiers", frame_identifier, session_uid)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.record(position)
+
+    def close(self):
+        """Releases the memory map and file handle."""
+        try:
+            self.mm.close()
+            self.file_handle.close()
+        except Exception as e:
+            log.error(f"Error closing capture {self.path}: {e}")
+
+
+class ReplaySource:
+    """
+    Replays a capture as a drop-in replacement for `TelemetryListener`.
+
+    `speed` of 1.0 replays in real time, N replays N times faster and None (or 0)
+    replays as fast as the consumer can take packets.
+    """
+
+    def __init__(self, path, speed=1.0, start_session_time=None, start_frame=None, start_session_uid=None):
+        """
+        Opens a capture for replay.
+
+        Args:
+            path (str): Capture file to replay.
+            speed (float, optional): Replay speed multiplier. None or 0 for maximum speed.
+            start_session_time (float, optional): Skip to the first packet at or after this session time.
+            start_frame (int, optional): Skip to the first packet at or after this frame identifier.
+            start_session_uid (int, optional): Session `start_session_time` and `start_frame` refer to,
+                for captures that hold several sessions.
+        """
+        self.reader = RawCaptureReader(path)
+        self.speed = speed or None
+        self.position = 0
+
+        if start_session_time is not None:
+            self.position = self.reader.find_session_time(start_session_time, start_session_uid)
+        elif start_frame is not None:
+            self.position = self.reader.find_frame(start_frame, start_session_uid)
+
+        self.first_recv_time = None
+        self.wall_start = None
+
+    def recv(self):
+        """
+        Returns the next raw datagram, pacing playback to the requested speed.
+
+        Raises:
+            EOFError: When the capture is exhausted.
+        """
+        if self.position >= len(self.reader):
+            raise EOFError(f"End of capture {self.reader.path}")
+
+        recv_time, data = self.reader.record(self.position)
+        self.position += 1
+
+        if self.speed is not None:
+            if self.first_recv_time is None:
+                self.first_recv_time = recv_time
+                self.wall_start = time.perf_counter()
+            else:
+                delay = (recv_time - self.first_recv_time) / self.speed - (time.perf_counter() - self.wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+
+        return data
+
+    def get(self):
+        """Returns the next decoded packet, mirroring `TelemetryListener.get()`."""
+        return decode_datagram(self.recv())
+
+    def close(self):
+        self.reader.close()
+
+
+class CapturingTelemetryListener(TelemetryListener):
+    """`TelemetryListener` that records every received datagram to a capture file."""
+
+    def __init__(self, host=None, port=None, capture_path=None):
+        """
+        Binds the telemetry socket and opens the capture file.
+
+        Args:
+            host (str, optional): Host to bind to.
+            port (int, optional): UDP port to bind to.
+            capture_path (str): Destination capture file.
+        """
+        super().__init__(host=host, port=port)
+        self.writer = RawCaptureWriter(capture_path)
+
+    def recv(self):
+        """Receives one raw datagram and appends it to the capture."""
+        data = self.socket.recv(2048)
+        self.writer.write(data)
+        return data
+
+    def get(self):
+        return decode_datagram(self.recv())
+
+    def close(self):
+        self.writer.close()
+        self.socket.close()
+
+
+def record(path, host="127.0.0.1", port=20777):
+    """Captures raw telemetry until interrupted."""
+    listener = CapturingTelemetryListener(host=host, port=port, capture_path=path)
+    log.info(f"Capturing {host}:{port} to {path}. Press Ctrl+C to stop.")
+    try:
+        while True:
+            listener.recv()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+
+
+def info(path):
+    """Prints a short summary of a capture."""
+    reader = RawCaptureReader(path)
+    try:
+        if not len(reader):
+            print(f"{path}: empty capture")
+            return
+
+        counts = {}
+        for packet_id in reader.packet_ids:
+            counts[packet_id] = counts.get(packet_id, 0) + 1
+
+        duration = reader.recv_time(len(reader) - 1) - reader.recv_time(0)
+        print(f"{path}: {len(reader)} packets over {duration:.1f}s wall time, "
+              f"session time {reader.session_times[0]:.3f} -> {reader.session_times[-1]:.3f}")
+        for packet_id in sorted(counts):
+            print(f"  packet_id {packet_id:2d}: {counts[packet_id]}")
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or inspect raw F1 22 telemetry captures.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Capture live telemetry to a file.")
+    record_parser.add_argument("path")
+    record_parser.add_argument("--host", default="127.0.0.1")
+    record_parser.add_argument("--port", type=int, default=20777)
+
+    info_parser = subparsers.add_parser("info", help="Summarize a capture file.")
+    info_parser.add_argument("path")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.path, args.host, args.port)
+    else:
+        info(args.path)
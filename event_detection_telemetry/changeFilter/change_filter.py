@@ -0,0 +1,131 @@
+# Packet types the game re-sends every few seconds with mostly identical content
+DEDUPE_PACKET_TYPES = ("carSetup", "participants", "session", "finalClassification", "sessionHistory")
+
+
+class ChangeFilter:
+    """
+    Change detection between a parser and its outputs, for slowly-changing packet types.
+
+    A record is split into units: one per car (`players`, or the `cars_key` list), or the
+    whole packet for `record_key` parsers. Each unit keeps a hash per field of what was last
+    emitted, and a record is passed on only with the units that changed, or whose keyframe
+    is due: every `keyframe_interval` seconds of session time a unit is emitted in full even
+    if nothing changed, so a reader joining late has the complete state within that interval.
+
+    The parser's `volatile_fields` (e.g. the session clock) are left out of the hashes: they
+    alone never make a unit changed, and they are written only with keyframes.
+
+    With `delta`, changed units carry only their changed fields and the record gets
+    `"delta": true`. A delta record is meant to be merged into the state built from earlier
+    records. `cars_key` lists become dicts keyed by car index in delta records.
+    """
+
+    def __init__(self, parser_class, keyframe_interval=10.0, delta=False):
+        """
+        Args:
+            parser_class (type): The `TableParser` subclass whose records are filtered.
+            keyframe_interval (float): Seconds of session time between full emissions of a unit.
+            delta (bool): Emit only the changed fields of a unit instead of the whole unit.
+        """
+        self.cars_key = parser_class.cars_key
+        self.record_key = parser_class.record_key
+        self.volatile = frozenset(parser_class.volatile_fields)
+        self.keyframe_interval = keyframe_interval
+        self.delta = delta
+        self.units = {}  # unit key -> (session time of the last full emission, {field: hash})
+
+        self.seen = 0
+        self.emitted = 0
+        self.dropped = 0
+
+    def _units(self, record):
+        """Returns {unit key: fields} for a record."""
+        if self.cars_key:
+            return dict(enumerate(record[self.cars_key]))
+        if self.record_key:
+            return {None: record[self.record_key]}
+        if "players" in record:
+            return record["players"]
+        return {None: {key: value for key, value in record.items() if key != "timestamp"}}
+
+    def filter(self, record):
+        """
+        Args:
+            record (dict): A parsed record, or None.
+
+        Returns:
+            dict: The record reduced to its changed units (and fields, with `delta`), or None
+                if nothing changed and no keyframe is due.
+        """
+        if not record:
+            return record
+        self.seen += 1
+        timestamp = record.get("timestamp")
+
+        changed = {}
+        for key, fields in self._units(record).items():
+            hashes = {name: hash(repr(value)) for name, value in fields.items() if name not in self.volatile}
+            keyframe_time, previous = self.units.get(key, (None, None))
+
+            keyframe = (keyframe_time is None or timestamp is None or timestamp < keyframe_time  # New session
+                        or timestamp - keyframe_time >= self.keyframe_interval)
+            if keyframe:
+                changed[key] = fields
+                self.units[key] = (timestamp, hashes)
+            elif hashes != previous:
+                if self.delta:
+                    changed[key] = {name: fields[name] for name, value in hashes.items() if previous.get(name) != value}
+                else:
+                    changed[key] = {name: value for name, value in fields.items() if name not in self.volatile}
+                self.units[key] = (keyframe_time, hashes)
+
+        if not changed:
+            self.dropped += 1
+            return None
+        self.emitted += 1
+        return self._rebuild(record, changed)
+
+    def _rebuild(self, record, changed):
+        """Returns the record holding only the changed units."""
+        record = dict(record)
+        if self.cars_key:
+            record[self.cars_key] = changed if self.delta else record[self.cars_key]  # Cars are kept by position
+        elif self.record_key:
+            record[self.record_key] = changed[None]
+        elif "players" in record:
+            record["players"] = changed
+        else:
+            record.update(changed[None])
+
+        if self.delta:
+            record["delta"] = True
+        return record
+
+    def stats(self):
+        """
+        Returns:
+            dict: Records seen, emitted and dropped as unchanged.
+        """
+        return {"seen": self.seen, "emitted": self.emitted, "dropped": self.dropped}
+
+
+def change_filter_for(packet_type, parser_class, dedupe):
+    """
+    Creates the `ChangeFilter` of one packet type from a `dedupe` setting.
+
+    Args:
+        packet_type (str): The type of telemetry packet.
+        parser_class (type): Parser of the packet type.
+        dedupe (bool | dict): None/False for no filtering, True to filter `DEDUPE_PACKET_TYPES`
+            with the default options, or `ChangeFilter` options plus an optional "packet_types"
+            list, e.g. {"keyframe_interval": 30, "delta": True}.
+
+    Returns:
+        ChangeFilter: The filter, or None if the packet type is not filtered.
+    """
+    if not dedupe or parser_class is None:
+        return None
+    options = dict(dedupe) if isinstance(dedupe, dict) else {}
+    if packet_type not in options.pop("packet_types", DEDUPE_PACKET_TYPES):
+        return None
+    return ChangeFilter(parser_class, **options)
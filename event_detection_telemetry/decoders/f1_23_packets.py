@@ -0,0 +1,211 @@
+"""
+F1 23 packet layouts, written against the F1 23 UDP specification.
+
+Fields keep the names `f1_22_telemetry` uses for the same data (including its spellings,
+e.g. `engined_damage`), so parsers read F1 22 and F1 23 packets through one set of
+attribute names. Fields new in F1 23 are appended under their own names. Structures whose
+layout did not change are reused from `f1_22_telemetry`.
+
+Differences from F1 22 handled here:
+  - PacketHeader: `game_year` and `overall_frame_identifier` added (29 bytes, packet_id at offset 6)
+  - Motion: the player-only block moved to the Motion Ex packet (id 13), which is not decoded
+  - Session: unit settings and safety car / red flag period counts appended
+  - LapData: sector minutes and deltas to the car in front and the leader added,
+    `warnings` is the total and `corner_cutting_warnings` is separate
+  - ParticipantData: `show_online_names` and `platform` appended
+  - CarStatusData: `engine_power_ice` and `engine_power_mguk` added
+  - LapHistoryData: sector minutes added
+"""
+
+import ctypes
+from f1_22_telemetry import packets as f1_22
+from f1_22_telemetry.packets import (
+    Packet, CarMotionData, EventDataDetails, CarSetupData,
+    FinalClassificationData, CarDamageData, TyreStintHistoryData
+)
+
+
+class PacketHeader(Packet):
+    _fields_ = [
+        ("packet_format", ctypes.c_uint16),  # 2023
+        ("game_year", ctypes.c_uint8),  # Game year - last two digits e.g. 23
+        ("game_major_version", ctypes.c_uint8),  # Game major version - "X.00"
+        ("game_minor_version", ctypes.c_uint8),  # Game minor version - "1.XX"
+        ("packet_version", ctypes.c_uint8),  # Version of this packet type, all start from 1
+        ("packet_id", ctypes.c_uint8),  # Identifier for the packet type
+        ("session_uid", ctypes.c_uint64),  # Unique identifier for the session
+        ("session_time", ctypes.c_float),  # Session timestamp
+        ("frame_identifier", ctypes.c_uint32),  # Identifier for the frame the data was retrieved on
+        ("overall_frame_identifier", ctypes.c_uint32),  # Overall frame identifier, doesn't go back after flashbacks
+        ("player_car_index", ctypes.c_uint8),  # Index of player's car in the array
+        ("secondary_player_car_index", ctypes.c_uint8),  # Index of secondary player's car, 255 if none
+    ]
+
+
+def _with_header(packet_class):
+    """Returns the F1 22 fields of a packet class with the F1 23 header in place of the F1 22 one."""
+    return [("header", PacketHeader)] + packet_class._fields_[1:]
+
+
+class PacketMotionData(Packet):
+    _fields_ = [
+        ("header", PacketHeader),
+        ("car_motion_data", CarMotionData * 22),  # Data for all cars on track
+    ]
+
+
+class PacketSessionData(Packet):
+    _fields_ = _with_header(f1_22.PacketSessionData) + [
+        ("speed_units_lead_player", ctypes.c_uint8),  # 0 = MPH, 1 = KPH
+        ("temperature_units_lead_player", ctypes.c_uint8),  # 0 = Celsius, 1 = Fahrenheit
+        ("speed_units_secondary_player", ctypes.c_uint8),  # 0 = MPH, 1 = KPH
+        ("temperature_units_secondary_player", ctypes.c_uint8),  # 0 = Celsius, 1 = Fahrenheit
+        ("num_safety_car_periods", ctypes.c_uint8),  # Number of safety cars called during the session
+        ("num_virtual_safety_car_periods", ctypes.c_uint8),  # Number of virtual safety cars called
+        ("num_red_flag_periods", ctypes.c_uint8),  # Number of red flags called during the session
+    ]
+
+
+class LapData(Packet):
+    _fields_ = [
+        ("last_lap_time_in_ms", ctypes.c_uint32),  # Last lap time in milliseconds
+        ("current_lap_time_in_ms", ctypes.c_uint32),  # Current time around the lap in milliseconds
+        ("sector1_time_in_ms", ctypes.c_uint16),  # Sector 1 time, milliseconds part
+        ("sector1_time_minutes", ctypes.c_uint8),  # Sector 1 whole minute part
+        ("sector2_time_in_ms", ctypes.c_uint16),  # Sector 2 time, milliseconds part
+        ("sector2_time_minutes", ctypes.c_uint8),  # Sector 2 whole minute part
+        ("delta_to_car_in_front_in_ms", ctypes.c_uint16),  # Time delta to car in front in milliseconds
+        ("delta_to_race_leader_in_ms", ctypes.c_uint16),  # Time delta to race leader in milliseconds
+        ("lap_distance", ctypes.c_float),  # Distance vehicle is around current lap in metres
+        ("total_distance", ctypes.c_float),  # Total distance travelled in session in metres
+        ("safety_car_delta", ctypes.c_float),  # Delta in seconds for safety car
+        ("car_position", ctypes.c_uint8),  # Car race position
+        ("current_lap_num", ctypes.c_uint8),  # Current lap number
+        ("pit_status", ctypes.c_uint8),  # 0 = none, 1 = pitting, 2 = in pit area
+        ("num_pit_stops", ctypes.c_uint8),  # Number of pit stops taken in this race
+        ("sector", ctypes.c_uint8),  # 0 = sector1, 1 = sector2, 2 = sector3
+        ("current_lap_invalid", ctypes.c_uint8),  # Current lap invalid - 0 = valid, 1 = invalid
+        ("penalties", ctypes.c_uint8),  # Accumulated time penalties in seconds to be added
+        ("warnings", ctypes.c_uint8),  # Accumulated number of warnings issued (F1 23 "total warnings")
+        ("corner_cutting_warnings", ctypes.c_uint8),  # Accumulated number of corner cutting warnings issued
+        ("num_unserved_drive_through_pens", ctypes.c_uint8),  # Num drive through pens left to serve
+        ("num_unserved_stop_go_pens", ctypes.c_uint8),  # Num stop go pens left to serve
+        ("grid_position", ctypes.c_uint8),  # Grid position the vehicle started the race in
+        ("driver_status", ctypes.c_uint8),  # Status of driver - 0 = in garage, 1 = flying lap, ...
+        ("result_status", ctypes.c_uint8),  # Result status - 0 = invalid, 1 = inactive, 2 = active, ...
+        ("pit_lane_timer_active", ctypes.c_uint8),  # Pit lane timing, 0 = inactive, 1 = active
+        ("pit_lane_time_in_lane_in_ms", ctypes.c_uint16),  # If active, the current time spent in the pit lane in ms
+        ("pit_stop_timer_in_ms", ctypes.c_uint16),  # Time of the actual pit stop in ms
+        ("pit_stop_should_serve_pen", ctypes.c_uint8),  # Whether the car should serve a penalty at this stop
+    ]
+
+
+class PacketLapData(Packet):
+    _fields_ = [
+        ("header", PacketHeader),
+        ("lap_data", LapData * 22),  # Lap data for all cars on track
+        ("time_trial_pb_car_idx", ctypes.c_uint8),
+        ("time_trial_rival_car_idx", ctypes.c_uint8),
+    ]
+
+
+class PacketEventData(Packet):
+    _fields_ = [
+        ("header", PacketHeader),
+        ("event_string_code", ctypes.c_uint8 * 4),  # Event string code
+        ("event_details", EventDataDetails),  # Event details, interpreted per event type
+    ]
+
+
+class ParticipantData(Packet):
+    _fields_ = f1_22.ParticipantData._fields_ + [
+        ("show_online_names", ctypes.c_uint8),  # The player's show online names setting, 0 = off, 1 = on
+        ("platform", ctypes.c_uint8),  # 1 = Steam, 3 = PlayStation, 4 = Xbox, 6 = Origin, 255 = unknown
+    ]
+
+
+class PacketParticipantsData(Packet):
+    _fields_ = [
+        ("header", PacketHeader),
+        ("num_active_cars", ctypes.c_uint8),  # Number of active cars in the data
+        ("participants", ParticipantData * 22),
+    ]
+
+
+class PacketCarSetupData(Packet):
+    _fields_ = [
+        ("header", PacketHeader),
+        ("car_setups", CarSetupData * 22),
+    ]
+
+
+class PacketCarTelemetryData(Packet):
+    _fields_ = _with_header(f1_22.PacketCarTelemetryData)
+
+
+_ERS_FIELDS = [name for name, _ in f1_22.CarStatusData._fields_].index("ers_store_energy")
+
+
+class CarStatusData(Packet):
+    _fields_ = f1_22.CarStatusData._fields_[:_ERS_FIELDS] + [
+        ("engine_power_ice", ctypes.c_float),  # Engine power output of ICE (W)
+        ("engine_power_mguk", ctypes.c_float),  # Engine power output of MGU-K (W)
+    ] + f1_22.CarStatusData._fields_[_ERS_FIELDS:]
+
+
+class PacketCarStatusData(Packet):
+    _fields_ = [
+        ("header", PacketHeader),
+        ("car_status_data", CarStatusData * 22),
+    ]
+
+
+class PacketFinalClassificationData(Packet):
+    _fields_ = [
+        ("header", PacketHeader),
+        ("num_cars", ctypes.c_uint8),  # Number of cars in the final classification
+        ("classification_data", FinalClassificationData * 22),
+    ]
+
+
+class PacketCarDamageData(Packet):
+    _fields_ = [
+        ("header", PacketHeader),
+        ("car_damage_data", CarDamageData * 22),
+    ]
+
+
+class LapHistoryData(Packet):
+    _fields_ = [
+        ("lap_time_in_ms", ctypes.c_uint32),  # Lap time in milliseconds
+        ("sector1_time_in_ms", ctypes.c_uint16),  # Sector 1 milliseconds part
+        ("sector1_time_minutes", ctypes.c_uint8),  # Sector 1 whole minute part
+        ("sector2_time_in_ms", ctypes.c_uint16),  # Sector 2 milliseconds part
+        ("sector2_time_minutes", ctypes.c_uint8),  # Sector 2 whole minute part
+        ("sector3_time_in_ms", ctypes.c_uint16),  # Sector 3 milliseconds part
+        ("sector3_time_minutes", ctypes.c_uint8),  # Sector 3 whole minute part
+        ("lap_valid_bit_flags", ctypes.c_uint8),  # 0x01 lap valid, 0x02/0x04/0x08 sector 1/2/3 valid
+    ]
+
+
+class PacketSessionHistoryData(Packet):
+    _fields_ = _with_header(f1_22.PacketSessionHistoryData)[:-2] + [
+        ("lap_history_data", LapHistoryData * 100),  # 100 laps of data max
+        ("tyre_stints_history_data", TyreStintHistoryData * 8),
+    ]
+
+
+# (packet_format, packet_version, packet_id) -> packet class, like HEADER_FIELD_TO_PACKET_TYPE
+HEADER_FIELD_TO_PACKET_TYPE = {
+    (2023, 1, 0): PacketMotionData,
+    (2023, 1, 1): PacketSessionData,
+    (2023, 1, 2): PacketLapData,
+    (2023, 1, 3): PacketEventData,
+    (2023, 1, 4): PacketParticipantsData,
+    (2023, 1, 5): PacketCarSetupData,
+    (2023, 1, 6): PacketCarTelemetryData,
+    (2023, 1, 7): PacketCarStatusData,
+    (2023, 1, 8): PacketFinalClassificationData,
+    (2023, 1, 10): PacketCarDamageData,
+    (2023, 1, 11): PacketSessionHistoryData,
+}
@@ -0,0 +1,93 @@
+import struct
+from f1_22_telemetry.packets import HEADER_FIELD_TO_PACKET_TYPE as F1_22_PACKET_TYPES
+from decoders.f1_23_packets import HEADER_FIELD_TO_PACKET_TYPE as F1_23_PACKET_TYPES
+
+# Header layout per packet_format, read without decoding the packet:
+# offset of packet_id, (packet_id, session_uid, session_time, frame_identifier), header size
+HEADER_LAYOUTS = {
+    2022: (5, struct.Struct("<5xBQfI"), 24),
+    2023: (6, struct.Struct("<6xBQfI"), 29),
+}
+
+MIN_HEADER_SIZE = min(size for _, _, size in HEADER_LAYOUTS.values())
+
+# (packet_format, packet_id) -> packet class, for every supported game year
+PACKET_CLASSES = {
+    (packet_format, packet_id): packet_class
+    for packet_types in (F1_22_PACKET_TYPES, F1_23_PACKET_TYPES)
+    for (packet_format, _, packet_id), packet_class in packet_types.items()
+}
+
+# packet_id offset by packet_format, flattened for the per-datagram lookups below
+_PACKET_ID_OFFSETS = {packet_format: layout[0] for packet_format, layout in HEADER_LAYOUTS.items()}
+
+
+def packet_format_of(data):
+    """Returns the packet_format (game year) of a raw datagram."""
+    return data[0] | data[1] << 8
+
+
+def packet_id_of(data):
+    """
+    Returns the packet id of a raw datagram from its format's header layout.
+
+    Args:
+        data (bytes): The raw UDP datagram.
+
+    Returns:
+        int: The packet id, or None for an unsupported packet_format or a short datagram.
+    """
+    offset = _PACKET_ID_OFFSETS.get(data[0] | data[1] << 8)
+    if offset is None or len(data) <= offset:
+        return None
+    return data[offset]
+
+
+def header_fields(data):
+    """
+    Reads the sequencing fields of a datagram's header.
+
+    Args:
+        data (bytes | memoryview): The raw UDP datagram.
+
+    Returns:
+        tuple: (packet_id, session_uid, session_time, frame_identifier), or None for an
+            unsupported packet_format or a datagram shorter than its header.
+    """
+    layout = HEADER_LAYOUTS.get(data[0] | data[1] << 8)
+    if layout is None or len(data) < layout[2]:
+        return None
+    return layout[1].unpack_from(data)
+
+
+def packet_class_of(data):
+    """Returns the packet class for a raw datagram, or None if its format or id is not supported."""
+    packet_id = packet_id_of(data)
+    if packet_id is None:
+        return None
+    return PACKET_CLASSES.get((data[0] | data[1] << 8, packet_id))
+
+
+def classes_for(packet_id):
+    """Returns the packet classes of every supported game year for one packet id."""
+    return tuple(packet_class for (_, class_packet_id), packet_class in PACKET_CLASSES.items()
+                 if class_packet_id == packet_id)
+
+
+def decode_datagram(data):
+    """
+    Decodes a raw datagram with the packet class registered for its format and id.
+
+    Args:
+        data (bytes): The raw UDP datagram.
+
+    Returns:
+        Packet: The decoded ctypes packet.
+
+    Raises:
+        KeyError: If the packet_format or packet id is not supported.
+    """
+    packet_class = packet_class_of(data)
+    if packet_class is None:
+        raise KeyError(f"Unsupported packet: format {packet_format_of(data)}, id {packet_id_of(data)}")
+    return packet_class.unpack(data)
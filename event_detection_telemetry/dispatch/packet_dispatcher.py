@@ -0,0 +1,114 @@
+import ctypes
+import structlog
+from decoders.registry import HEADER_LAYOUTS, MIN_HEADER_SIZE, PACKET_CLASSES
+from packetQueue.packet_queue import PacketQueue
+from vectorized.numpy_decoder import NumpyPacket
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+# Packet ids from the F1 22 UDP specification, keyed by pipeline packet type
+PACKET_TYPE_IDS = {
+    "motion": 0,
+    "session": 1,
+    "lap": 2,
+    "event": 3,
+    "participants": 4,
+    "carSetup": 5,
+    "carTelemetry": 6,
+    "carStatus": 7,
+    "finalClassification": 8,
+    "carDamage": 10,
+    "sessionHistory": 11,
+}
+
+
+class PacketDispatcher:
+    """
+    Routes raw datagrams to their packet queues using only the PacketHeader.
+
+    One routing table per supported packet_format (F1 22, F1 23) is built once from the
+    decoder registry. Per datagram, the format selects the table and the packet id position,
+    and the packet id selects the packet type and class, so mixed game years are decoded
+    without any per-packet version checks. Unsubscribed packets are dropped before any
+    ctypes decoding and subscribed ones are decoded exactly once.
+    """
+
+    def __init__(self, packet_types, player_indexes=None, decoder="ctypes"):
+        """
+        Builds the packet id routing tables.
+
+        Args:
+            packet_types (list): Packet types to route; all others are skipped.
+            player_indexes (list, optional): Player indexes forwarded with every packet.
+            decoder (str): "ctypes" to queue decoded packet structs, or "numpy" to queue
+                zero-copy `NumpyPacket` views that expose all-car column arrays.
+        """
+        if decoder not in ("ctypes", "numpy"):
+            raise ValueError(f"Unknown decoder {decoder}, expected 'ctypes' or 'numpy'.")
+
+        self.player_indexes = player_indexes
+        self.decoder = decoder
+        # packet_format -> (packet_id offset, packet_id -> (packet_type, packet_class, packet size))
+        self.routes = {packet_format: (layout[0], [None] * 256) for packet_format, layout in HEADER_LAYOUTS.items()}
+        self.skipped = 0
+        self.unsupported = 0
+
+        for packet_type in packet_types:
+            packet_id = PACKET_TYPE_IDS.get(packet_type)
+            if packet_id is None:
+                log.warning(f"Unknown packet type {packet_type}, it will not be dispatched.")
+                continue
+
+            for packet_format, (_, routes) in self.routes.items():
+                packet_class = PACKET_CLASSES.get((packet_format, packet_id))
+                if packet_class is not None:
+                    routes[packet_id] = (packet_type, packet_class, ctypes.sizeof(packet_class))
+
+    def decode(self, data):
+        """
+        Decodes a datagram if its packet type is subscribed.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+
+        Returns:
+            tuple: (packet_type, packet), or None if the datagram was skipped.
+        """
+        format_routes = self.routes.get(data[0] | data[1] << 8) if len(data) >= MIN_HEADER_SIZE else None
+        if format_routes is None:
+            self.unsupported += 1
+            return None
+
+        id_offset, routes = format_routes
+        route = routes[data[id_offset]]
+        if route is None:
+            self.skipped += 1
+            return None
+
+        packet_type, packet_class, packet_size = route
+        if len(data) < packet_size:
+            self.unsupported += 1  # Truncated datagram
+            return None
+
+        if self.decoder == "numpy":
+            return packet_type, NumpyPacket(data, packet_class)
+        return packet_type, packet_class.unpack(data)
+
+    def dispatch(self, data):
+        """
+        Decodes a subscribed datagram and queues it for its listener.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+
+        Returns:
+            str: The packet type the datagram was queued under, or None if it was skipped.
+        """
+        decoded = self.decode(data)
+        if decoded is None:
+            return None
+
+        packet_type, packet = decoded
+        PacketQueue.put(packet_type, (packet, self.player_indexes))
+        return packet_type
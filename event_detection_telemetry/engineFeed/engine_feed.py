@@ -0,0 +1,104 @@
+import time
+import structlog
+from raceState.race_state import RaceState
+from eventEngine.event_engine import EventEngine
+from gapEngine.gap_engine import GapEngine
+from miniSectors.mini_sector_index import MiniSectorIndex
+from tyreModel.tyre_degradation import TyreDegradationModel
+from pitStrategy.pit_strategy import PitStrategyPlanner
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+# Engine name -> class created for it, e.g. `engines=["race_state", "event_engine"]`
+ENGINES = {
+    "race_state": RaceState,
+    "event_engine": EventEngine,
+    "gap_engine": GapEngine,
+    "mini_sectors": MiniSectorIndex,
+    "tyre_model": TyreDegradationModel,
+}
+
+
+class GuardedEngine:
+    """
+    Feeds datagrams to one analytics engine and keeps its failures away from the receiver.
+
+    An exception raised by the engine's `feed()` is counted and logged, at most once every
+    `log_interval` seconds with the errors since the last line, and the datagram is skipped,
+    so a bad packet or a bug in one engine cannot stop the capture or the other engines.
+    """
+
+    def __init__(self, engine, name=None, log_interval=10.0):
+        """
+        Args:
+            engine (object): Any object with `feed(data)`.
+            name (str, optional): Name used in logs. Defaults to the engine's class name.
+            log_interval (float): Minimum seconds between error log lines.
+        """
+        self.engine = engine
+        self.name = name or type(engine).__name__
+        self.log_interval = log_interval
+        self.errors = 0
+        self.unlogged = 0
+        self.last_log = None
+
+    def feed(self, data):
+        try:
+            self.engine.feed(data)
+        except Exception as e:
+            self.errors += 1
+            self.unlogged += 1
+            now = time.monotonic()
+            if self.last_log is None or now - self.last_log >= self.log_interval:
+                log.error(f"{self.name} failed on a datagram: {e!r}", errors=self.unlogged, total_errors=self.errors)
+                self.unlogged = 0
+                self.last_log = now
+
+
+class EngineSet:
+    """
+    The analytics engines a pipeline feeds with every datagram, built once from its options.
+
+    Iterating yields each engine wrapped in a `GuardedEngine`, in the order given; `find()`
+    returns an engine by class, for the pipeline attributes and the pit strategy planner.
+    """
+
+    def __init__(self, engines=None, pit_strategy=None):
+        """
+        Args:
+            engines (iterable, optional): Names from `ENGINES`, created with their defaults, or any
+                objects with `feed(data)`, e.g. ["race_state", GapEngine(marker_spacing=25), my_engine].
+            pit_strategy (bool | dict, optional): Also create a `PitStrategyPlanner`; a dict holds its
+                options. The race state, gap engine and tyre model it reads are added if not given.
+        """
+        self.engines = []
+        for engine in engines or ():
+            if isinstance(engine, str):
+                if engine not in ENGINES:
+                    raise ValueError(f"Unknown engine {engine}, expected one of {tuple(ENGINES)}.")
+                engine = ENGINES[engine]()
+            self.engines.append(engine)
+
+        self.pit_strategy = None
+        if pit_strategy:
+            race_state, gap_engine, tyre_model = (self.find(engine_class) or self._add(engine_class())
+                                                  for engine_class in (RaceState, GapEngine, TyreDegradationModel))
+            self.pit_strategy = PitStrategyPlanner(race_state, gap_engine, tyre_model,
+                                                   **(pit_strategy if isinstance(pit_strategy, dict) else {}))
+
+        self.guarded = [GuardedEngine(engine) for engine in self.engines]
+
+    def _add(self, engine):
+        self.engines.append(engine)
+        return engine
+
+    def find(self, engine_class):
+        """Returns the first engine that is an `engine_class`, or None."""
+        return next((engine for engine in self.engines if isinstance(engine, engine_class)), None)
+
+    def __iter__(self):
+        return iter(self.guarded)
+
+    def __len__(self):
+        return len(self.engines)
@@ -1,112 +1,83 @@
-import json
-import structlog
-from f1_22_telemetry.packets import PacketEventData
+from parserEngine.table_parser import TableParser, Nested
 
-# Initialize structured logging
-log = structlog.get_logger()
 
-class EventDataParser:
+class EventDataParser(TableParser):
     """Handles parsing and storing F1 22 Event Data."""
 
-    def __init__(self, file_handle):
-        """
-        Initializes the EventDataParser.
-
-        Args:
-            file_handle (file object): Open file handle to write parsed data.
-        """
-        self.file_handle = file_handle
+    packet_id = 3
+    packet_type = "EventData"
+    label = "Event Data"
+    fields = [
+        ("header", Nested([
+            "frame_identifier",
+            "game_major_version",
+            "game_minor_version",
+            "packet_format",
+            "packet_id",
+            "packet_version",
+            "player_car_index",
+            "secondary_player_car_index",
+            "session_time",
+            "session_uid",
+        ])),
+        ("event_string_code", lambda code: "".join(map(chr, code))),  # Convert byte array to string
+        ("event_details", Nested([
+            ("buttons", Nested(["button_status"])),
+            ("drive_through_penalty_served", Nested(["vehicle_idx"])),
+            ("fastest_lap", Nested(["lap_time", "vehicle_idx"])),
+            ("flashback", Nested(["flashback_frame_identifier", "flashback_session_time"])),
+            ("penalty", Nested([
+                "infringement_type",
+                "lap_num",
+                "other_vehicle_idx",
+                "penalty_type",
+                "places_gained",
+                "time",
+                "vehicle_idx",
+            ])),
+            ("race_winner", Nested(["vehicle_idx"])),
+            ("retirement", Nested(["vehicle_idx"])),
+            ("speed_trap", Nested([
+                "fastest_speed_in_session",
+                "fastest_vehicle_idx_in_sSession",
+                "is_driver_fastest_in_session",
+                "overall_fastest_in_session",
+                "speed",
+                "vehicle_idx",
+            ])),
+            ("start_lights", Nested(["num_lights"])),
+            ("stop_go_penalty_served", Nested(["vehicle_idx"])),
+            ("team_mate_in_pits", Nested(["vehicle_idx"])),
+        ])),
+    ]
 
-    def parse(self, packet: PacketEventData, player_indexes=None) -> dict:
+    def parse(self, packet, player_indexes=None) -> dict:
         """
-        Parses the Event Data packet and extracts all relevant fields in a flattened format.
+        Parses the Event Data packet; the record carries the full header instead of a timestamp.
 
         Args:
-            packet (PacketEventData): The raw event telemetry packet.
+            packet (PacketEventData | NumpyPacket): The raw event telemetry packet.
 
         Returns:
             dict: Parsed JSON data containing session-wide event details.
         """
-        # Extract header information
-        try:
-            parsed_data = {
-                "header": {
-                                "frame_identifier": packet.header.frame_identifier,
-                                "game_major_version": packet.header.game_major_version,
-                                "game_minor_version": packet.header.game_minor_version,
-                                "packet_format": packet.header.packet_format,
-                                "packet_id": packet.header.packet_id,
-                                "packet_version": packet.header.packet_version,
-                                "player_car_index": packet.header.player_car_index,
-                                "secondary_player_car_index": packet.header.secondary_player_car_index,
-                                "session_time": packet.header.session_time,
-                                "session_uid": packet.header.session_uid,
-                            },
-                "packet_type": "EventData",
-                "event_string_code": "".join(map(chr, packet.event_string_code)),  # Convert byte array to string
-                # "event_details": packet.event_details.buttons.button_status
-                "event_details": {
-                            "event_details": {
-                                "buttons": {"button_status": packet.event_details.buttons.button_status},
-                                "drive_through_penalty_served": {"vehicle_idx": packet.event_details.drive_through_penalty_served.vehicle_idx},
-                                "fastest_lap": {"lap_time": packet.event_details.fastest_lap.lap_time, "vehicle_idx": packet.event_details.fastest_lap.vehicle_idx},
-                                "flashback": {
-                                    "flashback_frame_identifier":  packet.event_details.flashback.flashback_frame_identifier,
-                                    "flashback_session_time": packet.event_details.flashback.flashback_session_time,
-                                },
-                                "penalty": {
-                                    "infringement_type": packet.event_details.penalty.infringement_type,
-                                    "lap_num": packet.event_details.penalty.lap_num,
-                                    "other_vehicle_idx": packet.event_details.penalty.other_vehicle_idx,
-                                    "penalty_type": packet.event_details.penalty.penalty_type,
-                                    "places_gained": packet.event_details.penalty.places_gained,
-                                    "time": packet.event_details.penalty.time,
-                                    "vehicle_idx": packet.event_details.penalty.vehicle_idx,
-                                },
-                                "race_winner": {"vehicle_idx": packet.event_details.race_winner.vehicle_idx},
-                                "retirement": {"vehicle_idx": packet.event_details.retirement.vehicle_idx},
-                                "speed_trap": {
-                                    "fastest_speed_in_session": packet.event_details.speed_trap.fastest_speed_in_session,
-                                    "fastest_vehicle_idx_in_sSession": packet.event_details.speed_trap.fastest_vehicle_idx_in_sSession,
-                                    "is_driver_fastest_in_session": packet.event_details.speed_trap.is_driver_fastest_in_session,
-                                    "overall_fastest_in_session": packet.event_details.speed_trap.overall_fastest_in_session,
-                                    "speed": packet.event_details.speed_trap.speed,
-                                    "vehicle_idx": packet.event_details.speed_trap.vehicle_idx,
-                                },
-                                "start_lights": {"num_lights": packet.event_details.start_lights.num_lights},
-                                "stop_go_penalty_served": {"vehicle_idx": packet.event_details.stop_go_penalty_served.vehicle_idx},
-                                "team_mate_in_pits": {"vehicle_idx": packet.event_details.team_mate_in_pits.vehicle_idx},
-                            }
-                        }
-            }       
-
-        except AttributeError as e:
-            log.error(f"Error extracting event details: {e}")
-
-        return parsed_data
-
-    def save_to_file(self, data: dict):
-        """
-        Writes parsed data to an **open** file handle.
+        layout, buffer = self.resolve(packet)
+        if layout is None:
+            return None
 
-        Args:
-            data (dict): The parsed event telemetry data to be saved.
-        """
-        try:
-            if data:
-                json.dump(data, self.file_handle, indent=4)  # Proper JSON formatting
-                self.file_handle.write("\n")  # Ensure each entry is on a new line
-                self.file_handle.flush()  # Flush immediately for real-time updates
-                log.info("Event Data successfully written to file.")
-        except Exception as e:
-            log.error(f"Failed to write Event Data: {e}")
+        event = layout.extract(buffer, 0)
+        return {
+            "header": event["header"],
+            "packet_type": self.packet_type,
+            "event_string_code": event["event_string_code"],
+            "event_details": {"event_details": event["event_details"]},
+        }
 
-    def close_file(self):
-        """
-        Closes the file handle to ensure proper saving.
-        """
-        try:
-            self.file_handle.close()
-            log.info("Event Data file handle successfully closed.")
-        except Exception as e:
-            log.error(f"Error closing Event Data file: {e}")
+    def rows(self, record):
+        """Returns the event as one row, timestamped with the header's session time."""
+        return [{
+            "timestamp": record["header"]["session_time"],
+            "header": record["header"],
+            "event_string_code": record["event_string_code"],
+            "event_details": record["event_details"]["event_details"],
+        }]
@@ -0,0 +1,404 @@
+import numpy as np
+
+# F1 22 `result_status` values of a car that is out of the session
+RETIRED_RESULT_STATUS = {4: "did_not_finish", 5: "disqualified", 6: "not_classified", 7: "retired"}
+ACTIVE_RESULT_STATUS = 2
+IN_GARAGE_DRIVER_STATUS = 0
+
+
+class RaceEvent:
+    """
+    A race event found by a detector.
+
+    Attributes:
+        event_type (str): e.g. "position_change", "pit_entry", "fastest_lap".
+        session_time (float): Session time of the packet that triggered the event.
+        frame_identifier (int): Frame of that packet.
+        car_indexes (tuple): Cars involved, the main car first.
+        details (dict): Event-specific values, e.g. {"from": 3, "to": 2, "lap": 12}.
+    """
+
+    __slots__ = ("event_type", "session_time", "frame_identifier", "car_indexes", "details")
+
+    def __init__(self, event_type, session_time, frame_identifier, car_indexes, details=None):
+        self.event_type = event_type
+        self.session_time = session_time
+        self.frame_identifier = frame_identifier
+        self.car_indexes = tuple(car_indexes)
+        self.details = details or {}
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The event as a JSON-ready record.
+        """
+        return {
+            "event_type": self.event_type,
+            "session_time": self.session_time,
+            "frame_identifier": self.frame_identifier,
+            "car_indexes": list(self.car_indexes),
+            "details": self.details,
+        }
+
+    def __repr__(self):
+        return f"RaceEvent({self.event_type!r}, {self.session_time:.3f}, cars={self.car_indexes}, {self.details})"
+
+
+class Detector:
+    """
+    Base of the stateful detectors run by `EventEngine`.
+
+    A detector sees every packet of its `packet_types` as a zero-copy `NumpyPacket`, keeps
+    whatever it needs from the previous packets, and returns the events the new packet
+    triggers. Work per packet must be constant per car, so detectors compare against stored
+    values instead of searching history.
+
+    Subclasses set:
+        name (str): Registry name, see `DETECTORS`.
+        packet_types (tuple): Packet types the detector is fed.
+    """
+
+    name = None
+    packet_types = ()
+
+    def reset(self):
+        """Forgets all state; called when a new session starts."""
+
+    def update(self, packet_type, packet, session_time, frame_identifier):
+        """
+        Args:
+            packet_type (str): Type of the packet, e.g. "lap".
+            packet (NumpyPacket): The packet; `packet.cars` holds the per-car array.
+            session_time (float): The packet's session time.
+            frame_identifier (int): The packet's frame.
+
+        Returns:
+            list: `RaceEvent`s triggered by the packet; empty if none.
+        """
+        raise NotImplementedError
+
+
+class _LapColumnsDetector(Detector):
+    """Detector comparing Lap Data columns of every car with their values in the previous packet."""
+
+    packet_types = ("lap",)
+    columns = ()
+
+    def __init__(self):
+        self.previous = None  # column -> list of the previous packet's values
+
+    def reset(self):
+        self.previous = None
+
+    def update(self, packet_type, packet, session_time, frame_identifier):
+        cars = packet.cars
+        current = {column: cars[column].tolist() for column in self.columns}
+        previous, self.previous = self.previous, current
+        if previous is None:
+            self.first(current)
+            return []
+        return self.compare(previous, current, session_time, frame_identifier)
+
+    def first(self, current):
+        """Takes the state of the first packet of a session, which triggers no events."""
+
+    def compare(self, previous, current, session_time, frame_identifier):
+        raise NotImplementedError
+
+
+class _LapArraysDetector(Detector):
+    """
+    Detector comparing Lap Data columns of all cars, as NumPy arrays, with the previous packet's.
+
+    Packets in which `car_position` did not change cost one vectorized comparison.
+    """
+
+    packet_types = ("lap",)
+    columns = ()
+
+    def __init__(self):
+        self.previous = None  # column -> copy of the previous packet's array
+
+    def reset(self):
+        self.previous = None
+
+    def update(self, packet_type, packet, session_time, frame_identifier):
+        cars = packet.cars
+        current = {column: cars[column].copy() for column in self.columns}
+        previous, self.previous = self.previous, current
+        if previous is None or np.array_equal(previous["car_position"], current["car_position"]):
+            return []
+        return self.compare(previous, current, session_time, frame_identifier)
+
+    def compare(self, previous, current, session_time, frame_identifier):
+        raise NotImplementedError
+
+
+class PositionChangeDetector(_LapArraysDetector):
+    """Emits "position_change" when a car's race position changes."""
+
+    name = "position_change"
+    columns = ("car_position", "current_lap_num", "result_status")
+
+    def compare(self, previous, current, session_time, frame_identifier):
+        before, after = previous["car_position"], current["car_position"]
+        changed = np.flatnonzero((before != after) & (before > 0) & (after > 0) & (current["result_status"] > 0))
+        return [RaceEvent(self.name, session_time, frame_identifier, (idx,), {
+            "from": int(before[idx]), "to": int(after[idx]), "lap": int(current["current_lap_num"][idx]),
+        }) for idx in changed.tolist()]
+
+
+class OvertakeDetector(_LapArraysDetector):
+    """
+    Emits "overtake" for every pair of cars that swapped places on track.
+
+    A pair swapped when the car that was behind in the previous packet is ahead now; all
+    pairs are compared at once as a 22 x 22 matrix. A swap only counts when both cars are
+    active, out of the garage and outside the pit lane in both packets, so positions gained
+    from a pit stop or a retirement are not overtakes.
+    """
+
+    name = "overtake"
+    columns = ("car_position", "pit_status", "driver_status", "result_status", "current_lap_num", "lap_distance")
+
+    def compare(self, previous, current, session_time, frame_identifier):
+        before, after = previous["car_position"], current["car_position"]
+        racing = ((before > 0) & (after > 0)
+                  & (previous["pit_status"] == 0) & (current["pit_status"] == 0)
+                  & (previous["driver_status"] != IN_GARAGE_DRIVER_STATUS)
+                  & (current["driver_status"] != IN_GARAGE_DRIVER_STATUS)
+                  & (previous["result_status"] == ACTIVE_RESULT_STATUS)
+                  & (current["result_status"] == ACTIVE_RESULT_STATUS))
+        # swapped[attacker, victim]: the attacker was behind the victim and is now ahead of it
+        swapped = ((before[:, None] > before[None, :]) & (after[:, None] < after[None, :])
+                   & racing[:, None] & racing[None, :])
+        attackers, victims = np.nonzero(swapped)
+        events = []
+        for attacker, victim in zip(attackers.tolist(), victims.tolist()):
+            events.append(RaceEvent(self.name, session_time, frame_identifier, (attacker, victim), {
+                "attacker": attacker,
+                "victim": victim,
+                "position": int(after[attacker]),
+                "lap": int(current["current_lap_num"][attacker]),
+                "lap_distance": round(float(current["lap_distance"][attacker]), 1),
+            }))
+        return events
+
+
+class PitDetector(_LapColumnsDetector):
+    """Emits "pit_entry" when a car enters the pit lane and "pit_exit" when it leaves it."""
+
+    name = "pit"
+    columns = ("pit_status", "num_pit_stops", "current_lap_num", "car_position")
+
+    def compare(self, previous, current, session_time, frame_identifier):
+        events = []
+        for idx, (before, after) in enumerate(zip(previous["pit_status"], current["pit_status"])):
+            if bool(before) == bool(after):  # 0: on track, 1: pitting, 2: in the pit area
+                continue
+            events.append(RaceEvent("pit_entry" if after else "pit_exit", session_time, frame_identifier, (idx,), {
+                "lap": current["current_lap_num"][idx],
+                "position": current["car_position"][idx],
+                "num_pit_stops": current["num_pit_stops"][idx],
+            }))
+        return events
+
+
+class RetirementDetector(_LapColumnsDetector):
+    """Emits "dnf" when a car retires, is disqualified or is not classified."""
+
+    name = "dnf"
+    columns = ("result_status", "current_lap_num", "car_position")
+
+    def compare(self, previous, current, session_time, frame_identifier):
+        events = []
+        for idx, (before, after) in enumerate(zip(previous["result_status"], current["result_status"])):
+            if after != before and after in RETIRED_RESULT_STATUS and before not in RETIRED_RESULT_STATUS:
+                events.append(RaceEvent(self.name, session_time, frame_identifier, (idx,), {
+                    "result_status": RETIRED_RESULT_STATUS[after],
+                    "lap": current["current_lap_num"][idx],
+                    "position": current["car_position"][idx],
+                }))
+        return events
+
+
+class FastestLapDetector(_LapColumnsDetector):
+    """
+    Emits "fastest_lap" when a car completes a lap faster than any earlier lap of the session.
+
+    Lap Data only carries each car's last lap, so when the stream is joined after cars have
+    completed laps, the session's best lap is not known yet. It is then provisional: seeded
+    from the best lap in each car's Session History, lowered by the laps completed meanwhile,
+    and events are held until every active car past its first lap has either sent its Session
+    History or completed a lap. Held events that a seeded lap beats are dropped; the others
+    are emitted, in order, by the packet that settles the best lap.
+    """
+
+    name = "fastest_lap"
+    packet_types = ("lap", "sessionHistory")
+    columns = ("last_lap_time_in_ms", "current_lap_num", "result_status")
+
+    def __init__(self):
+        super().__init__()
+        self.best = None  # (lap time in ms, car index)
+        self.seeded = set()  # Cars whose Session History best lap was taken
+        self.pending = None  # Cars whose earlier laps are unknown; empty once the best lap is settled
+        self.held = []  # Events found while the best lap was provisional
+
+    def reset(self):
+        super().reset()
+        self.best = None
+        self.seeded = set()
+        self.pending = None
+        self.held = []
+
+    def update(self, packet_type, packet, session_time, frame_identifier):
+        if packet_type == "sessionHistory":
+            return self.seed(packet)
+        return super().update(packet_type, packet, session_time, frame_identifier)
+
+    def seed(self, packet):
+        """Takes a car's best lap from its Session History while the session's best is provisional."""
+        if self.pending is not None and not self.pending:
+            return []
+        car_idx = int(packet.car_idx)
+        self.seeded.add(car_idx)
+        lap_num = int(packet.best_lap_time_lap_num)
+        lap_time = int(packet.lap_history_data[lap_num - 1].lap_time_in_ms) if 0 < lap_num <= packet.num_laps else 0
+        if lap_time:
+            if self.best is None or lap_time < self.best[0]:
+                self.best = (lap_time, car_idx)
+            held, self.held = self.held, []
+            for event in held:
+                if event.car_indexes == (car_idx,) and event.details["lap"] == lap_num:
+                    self.held.append(event)  # The seeded lap is this event's own
+                elif event.details["lap_time_in_ms"] < lap_time:
+                    previous = event.details["previous_best_in_ms"]
+                    if previous is None or lap_time < previous:
+                        event.details.update(previous_best_in_ms=lap_time, previous_holder=car_idx)
+                    self.held.append(event)
+        if self.pending is None:
+            return []
+        self.pending.discard(car_idx)
+        return self._release()
+
+    def first(self, current):
+        lap_times = [(time, idx) for idx, time in enumerate(current["last_lap_time_in_ms"]) if time]
+        if self.best:
+            lap_times.append(self.best)
+        self.best = min(lap_times) if lap_times else None
+        laps_and_status = zip(current["current_lap_num"], current["result_status"])
+        self.pending = {idx for idx, (lap, status) in enumerate(laps_and_status)
+                        if lap > 1 and status == ACTIVE_RESULT_STATUS} - self.seeded
+
+    def compare(self, previous, current, session_time, frame_identifier):
+        provisional = bool(self.pending)
+        events = []
+        for idx, (before, after) in enumerate(zip(previous["last_lap_time_in_ms"], current["last_lap_time_in_ms"])):
+            if after == before or not after:
+                continue
+            if provisional:
+                self.pending.discard(idx)  # Laps from here on are all seen
+            if self.best and after >= self.best[0]:
+                continue
+            events.append(RaceEvent(self.name, session_time, frame_identifier, (idx,), {
+                "lap_time_in_ms": after,
+                "lap": current["current_lap_num"][idx] - 1,
+                "previous_best_in_ms": self.best[0] if self.best else None,
+                "previous_holder": self.best[1] if self.best else None,
+            }))
+            self.best = (after, idx)
+        if provisional:
+            self.pending.difference_update(idx for idx, status in enumerate(current["result_status"])
+                                           if status != ACTIVE_RESULT_STATUS)
+            self.held += events
+            return self._release()
+        return events
+
+    def _release(self):
+        """Returns the held events once the best lap is settled."""
+        if self.pending:
+            return []
+        held, self.held = self.held, []
+        return held
+
+
+class DamageDetector(Detector):
+    """Emits "damage" when a car's wing, floor, diffuser, sidepod, gearbox or engine damage jumps."""
+
+    name = "damage"
+    packet_types = ("carDamage",)
+    components = {
+        "front_left_wing": "front_left_wing_damage",
+        "front_right_wing": "front_right_wing_damage",
+        "rear_wing": "rear_wing_damage",
+        "floor": "floor_damage",
+        "diffuser": "diffuser_damage",
+        "sidepod": "sidepod_damage",
+        "gearbox": "gearbox_damage",
+        "engine": "engined_damage",
+    }
+
+    def __init__(self, threshold=10):
+        """
+        Args:
+            threshold (int): Rise in percentage points, within one packet, that counts as a damage event.
+        """
+        self.threshold = threshold
+        self.previous = None
+
+    def reset(self):
+        self.previous = None
+
+    def update(self, packet_type, packet, session_time, frame_identifier):
+        cars = packet.cars
+        current = {component: cars[field].tolist() for component, field in self.components.items()}
+        previous, self.previous = self.previous, current
+        if previous is None:
+            return []
+
+        events = []
+        for idx in range(len(cars)):
+            jumps = {component: {"from": previous[component][idx], "to": values[idx]}
+                     for component, values in current.items()
+                     if values[idx] - previous[component][idx] >= self.threshold}
+            if jumps:
+                events.append(RaceEvent(self.name, session_time, frame_identifier, (idx,), {"components": jumps}))
+        return events
+
+
+class PenaltyDetector(Detector):
+    """Emits "penalty" for every penalty the game hands out, and "penalty_served" for served ones."""
+
+    name = "penalty"
+    packet_types = ("event",)
+
+    def update(self, packet_type, packet, session_time, frame_identifier):
+        code = "".join(map(chr, packet.event_string_code))
+        details = packet.event_details
+        if code == "PENA":
+            penalty = details.penalty
+            other = penalty.other_vehicle_idx
+            car_indexes = (penalty.vehicle_idx,) + (() if other in (penalty.vehicle_idx, 255) else (other,))
+            return [RaceEvent(self.name, session_time, frame_identifier, car_indexes, {
+                "penalty_type": penalty.penalty_type,
+                "infringement_type": penalty.infringement_type,
+                "time": penalty.time,
+                "lap": penalty.lap_num,
+                "places_gained": penalty.places_gained,
+            })]
+        if code == "DTSV":
+            return [RaceEvent("penalty_served", session_time, frame_identifier,
+                              (details.drive_through_penalty_served.vehicle_idx,), {"penalty": "drive_through"})]
+        if code == "SGSV":
+            return [RaceEvent("penalty_served", session_time, frame_identifier,
+                              (details.stop_go_penalty_served.vehicle_idx,), {"penalty": "stop_go"})]
+        return []
+
+
+# Registry name -> detector class; `EventEngine` runs all of them by default
+DETECTORS = {
+    detector.name: detector
+    for detector in (PositionChangeDetector, OvertakeDetector, PitDetector, RetirementDetector, FastestLapDetector,
+                     DamageDetector, PenaltyDetector)
+}
@@ -0,0 +1,116 @@
+import time
+import structlog
+from decoders.registry import HEADER_LAYOUTS, PACKET_CLASSES
+from dispatch.packet_dispatcher import PACKET_TYPE_IDS
+from eventEngine.detectors import DETECTORS, Detector
+from vectorized.numpy_decoder import NumpyPacket
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+
+class EventEngine:
+    """
+    Runs a set of stateful detectors over the telemetry stream and hands their events to subscribers.
+
+    The receiver feeds every raw datagram to `feed()`. A packet that a detector subscribes to
+    is mapped onto a zero-copy `NumpyPacket` once, and each detector updates its state from
+    it with constant work per car, so events reach the subscribers within microseconds of
+    the triggering datagram. Detector state is reset when the `session_uid` changes.
+    """
+
+    def __init__(self, detectors=None, subscribers=None):
+        """
+        Args:
+            detectors (list, optional): Registry names from `DETECTORS` or `Detector` instances.
+                Defaults to every registered detector.
+            subscribers (list, optional): Callables invoked with every `RaceEvent`, in the receiver's thread.
+        """
+        self.detectors = [DETECTORS[detector]() if isinstance(detector, str) else detector
+                          for detector in (DETECTORS if detectors is None else detectors)]
+        for detector in self.detectors:
+            if not isinstance(detector, Detector):
+                raise TypeError(f"{detector!r} is not a Detector.")
+        self.subscribers = list(subscribers or [])
+        self.session_uid = None
+
+        # (packet_format, packet_id) -> (packet type, packet class, detectors fed with it)
+        self.routes = {}
+        for (packet_format, packet_id), packet_class in PACKET_CLASSES.items():
+            packet_type = next((name for name, type_id in PACKET_TYPE_IDS.items() if type_id == packet_id), None)
+            detectors = [detector for detector in self.detectors if packet_type in detector.packet_types]
+            if detectors:
+                self.routes[(packet_format, packet_id)] = (packet_type, packet_class, detectors)
+
+        self.packets = 0
+        self.events = {}
+        self.busy = 0.0  # Seconds spent in detectors and subscribers
+        self.slowest = 0.0
+
+    def subscribe(self, callback):
+        """Adds a callable invoked with every `RaceEvent`."""
+        self.subscribers.append(callback)
+
+    def feed(self, data):
+        """
+        Runs the detectors subscribed to the datagram's packet type; other packets are ignored.
+
+        Only one thread may feed the engine.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+        """
+        packet_format = data[0] | data[1] << 8
+        layout = HEADER_LAYOUTS.get(packet_format)
+        if layout is None or len(data) <= layout[0]:
+            return
+        route = self.routes.get((packet_format, data[layout[0]]))
+        if route is None:
+            return
+
+        started = time.perf_counter()
+        packet_type, packet_class, detectors = route
+        try:
+            packet = NumpyPacket(data, packet_class)
+        except ValueError:
+            return  # Shorter than its packet class
+        _, session_uid, session_time, frame_identifier = layout[1].unpack_from(data)
+        if session_uid != self.session_uid:
+            for detector in self.detectors:
+                detector.reset()
+            self.session_uid = session_uid
+
+        for detector in detectors:
+            try:
+                events = detector.update(packet_type, packet, session_time, frame_identifier)
+            except Exception as e:
+                log.error(f"Error in {detector.name} detector: {e}")
+                continue
+            for event in events:
+                self.emit(event)
+
+        self.packets += 1
+        elapsed = time.perf_counter() - started
+        self.busy += elapsed
+        self.slowest = max(self.slowest, elapsed)
+
+    def emit(self, event):
+        """Hands an event to every subscriber."""
+        self.events[event.event_type] = self.events.get(event.event_type, 0) + 1
+        for subscriber in self.subscribers:
+            try:
+                subscriber(event)
+            except Exception as e:
+                log.error(f"Error delivering {event.event_type} event: {e}")
+
+    def stats(self):
+        """
+        Returns:
+            dict: Packets examined, events by type, and mean and slowest microseconds per packet.
+        """
+        return {
+            "packets": self.packets,
+            "events": dict(self.events),
+            "mean_us": round(self.busy / self.packets * 1e6, 1) if self.packets else None,
+            "slowest_us": round(self.slowest * 1e6, 1),
+        }
@@ -0,0 +1,231 @@
+import math
+import time
+import numpy as np
+from dispatch.packet_dispatcher import PACKET_TYPE_IDS
+from eventEngine.detectors import ACTIVE_RESULT_STATUS
+from vectorized.numpy_decoder import MAX_CARS, datagram_routes, route_datagram
+
+MAX_TRACK_LENGTH = 8000  # Metres; longer than any track, so marker slots never overlap between laps
+
+
+class GapSnapshot:
+    """
+    A consistent copy of the gaps, taken by `GapEngine.snapshot()`.
+
+    Attributes:
+        session_uid (int): Session the gaps belong to.
+        session_time (float): Session time of the newest Lap Data packet applied.
+        frame_identifier (int): Frame of that packet; the snapshot's version.
+        positions (numpy.ndarray): Race position of every car; 0 if unknown.
+        gaps (numpy.ndarray): Seconds behind the leader at the car's last marker; NaN if unknown.
+        intervals (numpy.ndarray): Seconds behind the car one position ahead; NaN for the leader.
+        laps_behind (numpy.ndarray): Whole laps the car is behind the leader.
+    """
+
+    __slots__ = ("session_uid", "session_time", "frame_identifier", "positions", "gaps", "intervals", "laps_behind")
+
+    def __init__(self, session_uid, session_time, frame_identifier, positions, gaps, intervals, laps_behind):
+        self.session_uid = session_uid
+        self.session_time = session_time
+        self.frame_identifier = frame_identifier
+        self.positions = positions
+        self.gaps = gaps
+        self.intervals = intervals
+        self.laps_behind = laps_behind
+
+    def car(self, car_idx):
+        """
+        Returns:
+            dict: One car's position, gap, interval and laps behind; unknown gaps are None.
+        """
+        gap, interval = float(self.gaps[car_idx]), float(self.intervals[car_idx])
+        return {
+            "car_index": car_idx,
+            "position": int(self.positions[car_idx]),
+            "gap_to_leader": None if math.isnan(gap) else round(gap, 3),
+            "interval": None if math.isnan(interval) else round(interval, 3),
+            "laps_behind": int(self.laps_behind[car_idx]),
+        }
+
+    def standings(self):
+        """
+        Returns:
+            list: `car()` of every classified car, in race order.
+        """
+        order = np.argsort(self.positions, kind="stable")
+        return [self.car(idx) for idx in order.tolist() if self.positions[idx]]
+
+
+class GapEngine:
+    """
+    Live gaps to the leader and intervals for the whole field, from Lap Data.
+
+    The lap is divided into distance markers every `marker_spacing` metres. `feed()` records
+    the session time at which each car crosses each marker, interpolated between packets by
+    `lap_distance`, into a per-car ring table that covers `window_laps` laps. When a car
+    crosses a marker, its gap is the difference to the time the leader crossed the same marker
+    on the same lap, and its interval the difference to the car one position ahead, as on the
+    timing loops of real timing screens. The work per packet is one vectorized pass to find
+    the cars that crossed a marker plus one table update per crossing; history is never
+    rescanned.
+
+    Like `RaceState`, the engine has a single writer, the receiver, and lock-free readers:
+    `snapshot()` copies the results under a sequence counter and retries if a packet was
+    applied meanwhile.
+    """
+
+    def __init__(self, marker_spacing=50.0, window_laps=4):
+        """
+        Args:
+            marker_spacing (float): Metres between markers; smaller values update gaps more often.
+            window_laps (int): Laps of crossings kept per car; gaps of cars further behind are unknown.
+        """
+        self.marker_spacing = float(marker_spacing)
+        self.slots_per_lap = math.ceil(MAX_TRACK_LENGTH / self.marker_spacing)
+        self.window = self.slots_per_lap * window_laps
+
+        # Marker crossings: the marker number (lap * slots_per_lap + marker on the lap) and its session time
+        self.crossed_markers = np.full((MAX_CARS, self.window), -1, dtype=np.int64)
+        self.crossing_times = np.zeros((MAX_CARS, self.window), dtype=np.float64)
+        self.markers = np.full(MAX_CARS, -1, dtype=np.int64)  # Newest marker each car crossed
+        self.samples = np.zeros((MAX_CARS, 3), dtype=np.float64)  # Last session time, lap and lap distance
+
+        self.positions = np.zeros(MAX_CARS, dtype=np.uint8)
+        self.gaps = np.full(MAX_CARS, np.nan)
+        self.intervals = np.full(MAX_CARS, np.nan)
+        self.laps_behind = np.zeros(MAX_CARS, dtype=np.int64)
+
+        self.sequence = 0  # Odd while the writer updates the arrays
+        self.session_uid = None
+        self.session_time = 0.0
+        self.frame_identifier = None
+        self.track_length = None
+
+        self.routes = datagram_routes({PACKET_TYPE_IDS[packet_type]: packet_type for packet_type in ("lap", "session")})
+
+    def reset(self):
+        """Forgets all crossings; called when a new session starts."""
+        self.crossed_markers[:] = -1
+        self.markers[:] = -1
+        self.positions[:] = 0
+        self.gaps[:] = np.nan
+        self.intervals[:] = np.nan
+        self.laps_behind[:] = 0
+        self.track_length = None
+
+    def feed(self, data):
+        """
+        Applies a raw datagram if it is a Lap Data or Session packet; others are ignored.
+
+        Only one thread may feed the engine.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+        """
+        routed = route_datagram(self.routes, data)
+        if routed is None:
+            return
+
+        (packet_type, offset, dtype, _), (_, session_uid, session_time, frame_identifier) = routed
+        self.sequence += 1
+        if session_uid != self.session_uid:
+            self.reset()
+            self.session_uid = session_uid
+        if packet_type == "session":
+            self.track_length = float(np.frombuffer(data, dtype=dtype, count=1)["track_length"][0]) or None
+            self.sequence += 1
+            return
+
+        cars = np.frombuffer(data, dtype=dtype, count=MAX_CARS, offset=offset)
+        laps = cars["current_lap_num"].astype(np.int64)
+        distances = cars["lap_distance"].astype(np.float64)
+        markers = np.where(distances >= 0, laps * self.slots_per_lap + distances // self.marker_spacing, -1)
+        markers = markers.astype(np.int64)
+        self.positions[:] = cars["car_position"]
+        active = cars["result_status"] == ACTIVE_RESULT_STATUS
+
+        # Cars that reached a new marker; first sightings and rewinds (flashbacks) only set the marker
+        moved = markers != self.markers
+        crossed = np.flatnonzero(moved & (self.markers >= 0) & (markers > self.markers) & active)
+        if crossed.size:
+            positions = self.positions.tolist()
+            by_position = [-1] * (MAX_CARS + 2)
+            for car_idx, position in enumerate(positions):
+                if position:
+                    by_position[position] = car_idx
+            marker_list, lap_list, distance_list = markers.tolist(), laps.tolist(), distances.tolist()
+            # Record the leader's crossings first, so the cars behind can be compared against them
+            for car_idx in sorted(crossed.tolist(), key=positions.__getitem__):
+                self._cross(car_idx, marker_list[car_idx], session_time, lap_list[car_idx], distance_list[car_idx],
+                            positions[car_idx], by_position)
+        if moved.any():
+            self.markers[moved] = markers[moved]
+        self.gaps[~active] = np.nan
+        self.intervals[~active] = np.nan
+
+        self.samples[:, 0] = session_time
+        self.samples[:, 1] = laps
+        self.samples[:, 2] = distances
+        self.session_time = session_time
+        self.frame_identifier = frame_identifier
+        self.sequence += 1
+
+    def _cross(self, car_idx, marker, session_time, lap, distance, position, by_position):
+        """Records the markers a car crossed since its previous packet and updates its gap and interval."""
+        previous_time, previous_lap, previous_distance = self.samples[car_idx].tolist()
+        track_length = self.track_length or max(previous_distance, distance)
+        travelled = distance - previous_distance if lap == previous_lap else track_length - previous_distance + distance
+
+        first = max(int(self.markers[car_idx]) + 1, marker - self.window + 1)
+        for crossed in range(first, marker + 1):
+            marker_lap, marker_distance = divmod(crossed, self.slots_per_lap)
+            marker_distance *= self.marker_spacing
+            if marker_lap == previous_lap:
+                progress = marker_distance - previous_distance
+            else:
+                progress = track_length - previous_distance + marker_distance
+            fraction = min(max(progress / travelled, 0.0), 1.0) if travelled > 0 else 1.0
+            slot = crossed % self.window
+            self.crossed_markers[car_idx, slot] = crossed
+            self.crossing_times[car_idx, slot] = previous_time + fraction * (session_time - previous_time)
+        self.markers[car_idx] = marker
+
+        crossing_time = self.crossing_times[car_idx, marker % self.window]
+        leader = by_position[1]
+        if position == 1 or leader < 0:
+            self.gaps[car_idx] = 0.0 if position == 1 else np.nan
+            self.intervals[car_idx] = np.nan
+            self.laps_behind[car_idx] = 0
+            return
+        self.gaps[car_idx] = self._behind(car_idx, leader, marker, crossing_time)
+        self.intervals[car_idx] = self._behind(car_idx, by_position[position - 1], marker, crossing_time)
+        self.laps_behind[car_idx] = max(int(self.markers[leader]) - marker, 0) // self.slots_per_lap
+
+    def _behind(self, car_idx, ahead, marker, crossing_time):
+        """Seconds between `ahead` and `car_idx` crossing `marker`; NaN if `ahead` crossed it outside the window."""
+        if ahead < 0:
+            return np.nan
+        slot = marker % self.window
+        if self.crossed_markers[ahead, slot] != marker:
+            return np.nan
+        return crossing_time - self.crossing_times[ahead, slot]
+
+    def snapshot(self):
+        """
+        Copies the gaps without blocking the writer.
+
+        Returns:
+            GapSnapshot: A consistent copy, or None before the first Lap Data packet.
+        """
+        while True:
+            sequence = self.sequence
+            if not sequence & 1:
+                copies = (self.positions.copy(), self.gaps.copy(), self.intervals.copy(), self.laps_behind.copy())
+                header = (self.session_uid, self.session_time, self.frame_identifier)
+                if self.sequence == sequence:
+                    break
+            time.sleep(0)  # Let the writer finish its update
+
+        if header[0] is None:
+            return None
+        return GapSnapshot(*header, *copies)
@@ -0,0 +1,272 @@
+import collections
+import select
+import socket
+import struct
+import sys
+import time
+import structlog
+from capture.raw_capture import RawCaptureWriter
+from decoders.registry import header_fields, MIN_HEADER_SIZE
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+PACKET_NAMES = {
+    0: "motion",
+    1: "session",
+    2: "lap",
+    3: "event",
+    4: "participants",
+    5: "carSetup",
+    6: "carTelemetry",
+    7: "carStatus",
+    8: "finalClassification",
+    9: "lobbyInfo",
+    10: "carDamage",
+    11: "sessionHistory",
+    12: "tyreSets",
+    13: "motionEx",
+}
+
+# Event, final classification and lobby packets are sent on demand, so gaps say nothing about loss
+_IRREGULAR_PACKET_IDS = {3, 8, 9}
+
+# A frame_identifier this far behind the last one is a flashback or restart, not a late packet
+_RESET_FRAMES = 600
+
+# Linux only: ask the kernel for its per-socket drop counter with every datagram
+_SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40)
+_RXQ_OVFL_COUNTER = struct.Struct("I")
+
+# Linux only: ask the kernel for each datagram's arrival time (a struct timeval), so a batch
+# drained at once keeps the spacing the datagrams arrived with
+_SO_TIMESTAMP = getattr(socket, "SO_TIMESTAMP", 29)
+_TIMEVAL = struct.Struct("@ll")
+
+
+class IngestStats:
+    """
+    Per packet type received, dropped and late counters derived from `frame_identifier`.
+
+    Datagrams shorter than any PacketHeader are counted as `short` by the receiver, which
+    discards them, and datagrams of an unknown packet_format as `unsupported`.
+
+    Each packet type is sent every N game frames, so the smallest positive frame step seen
+    for a type is taken as its send interval; a larger step counts the missing sends as
+    dropped, and a packet older than the last one seen counts as late.
+    """
+
+    def __init__(self):
+        self.received = [0] * 256
+        self.dropped = [0] * 256
+        self.late = [0] * 256
+        self.last_frame = [None] * 256
+        self.frame_step = [None] * 256
+        self.session_uid = None
+        self.unsupported = 0
+        self.short = 0
+        self.kernel_dropped = None
+        self.started = time.monotonic()
+
+    def record(self, data):
+        """
+        Accounts for one received datagram.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+        """
+        fields = header_fields(data)
+        if fields is None:
+            self.unsupported += 1
+            return
+
+        packet_id, session_uid, _, frame = fields
+        self.received[packet_id] += 1
+
+        if session_uid != self.session_uid:
+            self.session_uid = session_uid
+            self.last_frame = [None] * 256
+            self.frame_step = [None] * 256
+
+        if packet_id in _IRREGULAR_PACKET_IDS:
+            return
+
+        last_frame = self.last_frame[packet_id]
+        if last_frame is None:
+            self.last_frame[packet_id] = frame
+            return
+
+        delta = frame - last_frame
+        if delta <= 0:
+            if -delta > _RESET_FRAMES:
+                self.last_frame[packet_id] = frame  # Flashback or restart
+            elif delta < 0:
+                self.late[packet_id] += 1
+            return
+
+        step = self.frame_step[packet_id]
+        if step is None or delta < step:
+            self.frame_step[packet_id] = step = delta
+
+        self.dropped[packet_id] += max(0, round(delta / step) - 1)
+        self.last_frame[packet_id] = frame
+
+    def report(self):
+        """
+        Returns a snapshot of the counters.
+
+        Returns:
+            dict: Totals, the kernel drop counter (when available) and per packet type counts.
+        """
+        packet_types = {
+            PACKET_NAMES.get(packet_id, str(packet_id)): {
+                "received": self.received[packet_id],
+                "dropped": self.dropped[packet_id],
+                "late": self.late[packet_id],
+            }
+            for packet_id in range(256) if self.received[packet_id]
+        }
+        received = sum(self.received)
+        dropped = sum(self.dropped)
+
+        return {
+            "received": received,
+            "dropped": dropped,
+            "late": sum(self.late),
+            "unsupported": self.unsupported,
+            "short": self.short,
+            "loss_rate": dropped / (received + dropped) if received + dropped else 0.0,
+            "kernel_dropped": self.kernel_dropped,
+            "packets_per_second": received / max(time.monotonic() - self.started, 1e-9),
+            "packet_types": packet_types,
+        }
+
+
+class BatchedUdpSource:
+    """
+    Telemetry socket that drains every queued datagram per wakeup instead of one per call.
+
+    The kernel receive buffer is enlarged so bursts are absorbed while the pipeline is busy,
+    and every datagram is accounted for in `stats` so packet loss is visible.
+    """
+
+    def __init__(self, host='127.0.0.1', port=20777, recv_buffer_size=8 * 1024 * 1024,
+                 batch_size=256, timeout=0.5, capture_path=None, stats_log_interval=30.0):
+        """
+        Binds the telemetry socket.
+
+        Args:
+            host (str): Host to bind to.
+            port (int): UDP port to bind to.
+            recv_buffer_size (int): Requested SO_RCVBUF size in bytes. The OS may cap it
+                (e.g. `net.core.rmem_max` on Linux); the granted size is logged.
+            batch_size (int): Maximum datagrams returned per `recv_batch()` call.
+            timeout (float): Seconds `recv_batch()` waits for data before returning empty.
+            capture_path (str, optional): Also records every datagram to this capture file.
+            stats_log_interval (float, optional): Seconds between ingest stats log lines, None to disable.
+        """
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.stats = IngestStats()
+        self.stats_log_interval = stats_log_interval
+        self.last_stats_log = time.monotonic()
+        self.pending = collections.deque()
+        self.writer = RawCaptureWriter(capture_path) if capture_path else None
+
+        self.socket = socket.socket(family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer_size)
+        self.recv_buffer_size = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        if self.recv_buffer_size < recv_buffer_size:
+            log.warning(f"Requested a {recv_buffer_size} byte receive buffer, the OS granted {self.recv_buffer_size}.")
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+
+        self.track_kernel_drops = sys.platform.startswith("linux") and hasattr(self.socket, "recvmsg")
+        if self.track_kernel_drops:
+            try:
+                self.socket.setsockopt(socket.SOL_SOCKET, _SO_RXQ_OVFL, 1)
+                self.stats.kernel_dropped = 0
+            except OSError:
+                self.track_kernel_drops = False
+
+        self.kernel_timestamps = self.track_kernel_drops
+        if self.kernel_timestamps:
+            try:
+                self.socket.setsockopt(socket.SOL_SOCKET, _SO_TIMESTAMP, 1)
+            except OSError:
+                self.kernel_timestamps = False
+
+        self.ancillary_size = 0
+        if self.track_kernel_drops:
+            self.ancillary_size += socket.CMSG_SPACE(_RXQ_OVFL_COUNTER.size)
+        if self.kernel_timestamps:
+            self.ancillary_size += socket.CMSG_SPACE(_TIMEVAL.size)
+
+    def recv_batch(self):
+        """
+        Waits up to `timeout` for data, then drains up to `batch_size` queued datagrams.
+
+        Returns:
+            list: Raw datagrams in arrival order; empty if nothing arrived in time.
+        """
+        if not select.select([self.socket], [], [], self.timeout)[0]:
+            self._maybe_log_stats()
+            return []
+
+        batch = []
+        for _ in range(self.batch_size):
+            recv_time = None
+            try:
+                if self.track_kernel_drops:
+                    data, ancillary, _, _ = self.socket.recvmsg(2048, self.ancillary_size)
+                    for level, kind, value in ancillary:
+                        if level != socket.SOL_SOCKET:
+                            continue
+                        if kind == _SO_RXQ_OVFL:
+                            self.stats.kernel_dropped = _RXQ_OVFL_COUNTER.unpack(value)[0]
+                        elif kind == _SO_TIMESTAMP:
+                            seconds, microseconds = _TIMEVAL.unpack(value)
+                            recv_time = seconds + microseconds / 1e6
+                else:
+                    data = self.socket.recv(2048)
+            except BlockingIOError:
+                break
+
+            if len(data) < MIN_HEADER_SIZE:
+                self.stats.short += 1  # Shorter than any PacketHeader
+                continue
+
+            self.stats.record(data)
+            if self.writer:
+                self.writer.write(data, recv_time or time.time())
+            batch.append(data)
+
+        self._maybe_log_stats()
+        return batch
+
+    def recv(self):
+        """Returns the next datagram, blocking until one arrives."""
+        while not self.pending:
+            self.pending.extend(self.recv_batch())
+        return self.pending.popleft()
+
+    def _maybe_log_stats(self):
+        if self.stats_log_interval is None:
+            return
+
+        now = time.monotonic()
+        if now - self.last_stats_log >= self.stats_log_interval:
+            self.last_stats_log = now
+            report = self.stats.report()
+            log.info("Ingest stats", received=report["received"], dropped=report["dropped"],
+                     late=report["late"], short=report["short"], kernel_dropped=report["kernel_dropped"],
+                     packets_per_second=round(report["packets_per_second"], 1))
+
+    def close(self):
+        """Closes the socket and capture file and logs the final packet accounting."""
+        log.info("Ingest stats", **self.stats.report())
+        if self.writer:
+            self.writer.close()
+        self.socket.close()
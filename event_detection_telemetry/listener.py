@@ -1,4 +1,3 @@
-import json
 import threading
 import structlog
 import sys
@@ -14,14 +13,33 @@ from participants.participants_data_listener import ParticipantsDataParser
 from session.session_data_listener import SessionDataParser
 from sessionHistory.session_history_listener import SessionHistoryParser
 from packetQueue.packet_queue import PacketQueue
+from recordWriter.record_writer import open_writer
+from changeFilter.change_filter import change_filter_for
 
 # Initialize structured logging
 log = structlog.get_logger()
 
+# Parser class for each packet type
+PARSER_MAPPING = {
+    "carDamage": CarDamageParser,
+    "carTelemetry": CarTelemetryParser,
+    "carSetup": CarSetupParser,
+    "carStatus": CarStatusParser,
+    "event": EventDataParser,
+    "finalClassification": FinalClassificationParser,
+    "lap": LapDataParser,
+    "motion": MotionDataParser,
+    "participants": ParticipantsDataParser,
+    "session": SessionDataParser,
+    "sessionHistory": SessionHistoryParser,
+}
+
+
 class Listener:
     """Listener class that runs a separate thread for processing packets and writing JSON data."""
 
-    def __init__(self, packet_type, player_indexes, datetime):
+    def __init__(self, packet_type, player_indexes, datetime, max_batch=64, max_wait=0.01,
+                 output_format="json", writer_options=None, dedupe=None, parser_options=None):
         """
         Initializes a listener for a specific packet type.
 
@@ -29,12 +47,28 @@ class Listener:
             packet_type (str): The type of telemetry packet to process.
             player_indexes (list): The list of player indexes to extract data for.
             datetime (str): Unique timestamp for file naming.
+            max_batch (int): Most packets taken from the queue and written per batch.
+            max_wait (float): Seconds a partial batch may wait to fill once a packet is queued.
+            output_format (str | list): "json", "ndjson", "parquet" or "arrow", or a list of them,
+                see `open_writer`.
+            writer_options (dict, optional): Flush policy passed to `RecordWriter`, e.g.
+                {"flush_interval": 0.5, "fsync_interval": 10}, row groups for `ColumnarWriter`,
+                and session partitioning and rotation for `SessionWriter`.
+            dedupe (bool | dict, optional): Drop records that repeat earlier ones, see `change_filter_for`.
+            parser_options (dict, optional): Keyword arguments for the parser, e.g. {"incremental": True}.
         """
         self.packet_type = packet_type
         self.player_indexes = player_indexes  # Store player indexes
-        self.file_name = f"{packet_type}_{datetime}.json"
-        self.file_handle = open(self.file_name, "a")  # Keep file open for appending
-        self.shutdown_event = threading.Event()
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.parser_options = parser_options or {}
+        self.writer = open_writer(packet_type, datetime, PARSER_MAPPING.get(packet_type), output_format,
+                                  writer_options, self.parser_options)  # Keep file open for appending
+        self.file_name = self.writer.file_name
+        self.partitioned = getattr(self.writer, "partitioned", False)  # A `SessionWriter` takes each record's session
+        self.change_filter = change_filter_for(packet_type, PARSER_MAPPING.get(packet_type), dedupe)
+        self.processed = 0  # Packets taken from the queue and handled
+        self.closed = False
         self.lock = threading.Lock()  # Ensures safe multi-threaded file writing
 
         # Initialize the appropriate parser dynamically
@@ -46,59 +80,96 @@ class Listener:
 
     def _initialize_parser(self):
         """Dynamically initializes the correct parser based on `packet_type`."""
-        parser_mapping = {
-            "carDamage": CarDamageParser,
-            "carTelemetry": CarTelemetryParser,
-            "carSetup": CarSetupParser,
-            "carStatus": CarStatusParser,
-            "event": EventDataParser,
-            "finalClassification": FinalClassificationParser,
-            "lap": LapDataParser,
-            "motion": MotionDataParser,
-            "participants": ParticipantsDataParser,
-            "session": SessionDataParser,
-            "sessionHistory": SessionHistoryParser,
-        }
+        parser_class = PARSER_MAPPING.get(self.packet_type)
+        return parser_class(self.writer, **self.parser_options) if parser_class else None
 
-        return parser_mapping.get(self.packet_type, None)(self.file_handle) if self.packet_type in parser_mapping else None
+    def process_packets(self):
+        """
+        Processes packets received from main_handler until the queue is closed and drained.
 
+        The thread sleeps in `PacketQueue.get_batch` until packets arrive, the queue is
+        closed or buffered records are due to be flushed, so an idle listener with nothing
+        buffered does not wake up at all.
+        """
+        log.info(f"Started listener for {self.packet_type}. Writing to {self.file_name}.")
 
+        while True:
+            batch = PacketQueue.get_batch(self.packet_type, self.max_batch, self.max_wait,
+                                          timeout=self.writer.time_to_flush())
+            if not batch:
+                if PacketQueue.is_closed(self.packet_type):
+                    break  # Queue closed and drained
+                with self.lock:
+                    self.writer.flush()  # Flush interval passed without new packets
+                continue
 
-    def process_packets(self):
-        """Continuously processes packets received from main_handler."""
-        log.info(f"Started listener for {self.packet_type}. Writing to {self.file_name}.")
+            try:
+                if self.parser:
+                    self._process_batch(batch)
+            except Exception as e:
+                log.error(f"Error processing {self.packet_type}: {e}")
+            self.processed += len(batch)
 
-        while not self.shutdown_event.is_set():
+        log.info(f"Stopping {self.packet_type} listener.")
+
+    def _process_batch(self, batch):
+        """Parses a batch of packets and hands the records to the writer."""
+        records = []
+        session_uid = None
+        for packet, player_indexes in batch:
             try:
-                packet_data = PacketQueue.get(self.packet_type)  
-                if packet_data:
-                    packet, player_indexes = packet_data 
+                if self.partitioned:  # Each write holds the records of one session
+                    packet_session = self.parser.session_uid(packet)
+                    if packet_session != session_uid and records:
+                        self._write(records, session_uid)
+                        records = []
+                    session_uid = packet_session
+                record = self.parser.parse(packet, player_indexes)
+                records.append(self.change_filter.filter(record) if self.change_filter else record)
+            except Exception as e:
+                log.error(f"Error parsing {self.packet_type}: {e}")
 
-                    if self.parser:
-                        json_packet = self.parser.parse(packet, player_indexes)
+        self._write(records, session_uid)
 
-                        with self.lock:  # Thread-safe file writing
-                            self.parser.save_to_file(json_packet)
+    def _write(self, records, session_uid=None):
+        with self.lock:  # Thread-safe file writing
+            if self.partitioned:
+                self.writer.write(records, session_uid)
+            else:
+                self.writer.write(records)
 
-            except Exception as e:
-                log.error(f"Error processing {self.packet_type}: {e}")
+    def handle_exit(self, signum=None, frame=None, timeout=5.0):
+        """
+        Drains the queued packets to the file within `timeout`, then closes it.
 
-        log.info(f"Stopping {self.packet_type} listener.")
+        Args:
+            timeout (float): Seconds allowed for draining; packets still queued after it are discarded.
 
-    def handle_exit(self, signum=None, frame=None):
-        """Handles graceful shutdown and closes file properly."""
-        log.info(f"\n[INFO] Stopping {self.packet_type} listener...")
+        Returns:
+            tuple: (flushed, discarded) packet counts.
+        """
+        if self.closed:
+            return 0, 0
+        self.closed = True
 
-        self.shutdown_event.set()
+        log.info(f"\n[INFO] Stopping {self.packet_type} listener...")
+        processed_before = self.processed
+        PacketQueue.close(self.packet_type)  # No new packets; the thread drains what is queued
 
-        # Ensure thread stops safely
+        self.thread.join(timeout=timeout)
+        discarded = 0
         if self.thread.is_alive():
-            self.thread.join(timeout=1)
+            discarded = PacketQueue.discard(self.packet_type)
+            self.thread.join(timeout=1)  # Let the batch in progress finish
+        flushed = self.processed - processed_before
 
         # Ensure file closure
         try:
             with self.lock:
-                self.file_handle.close()
-                log.info(f"[INFO] Closed {self.packet_type}.json")
+                self.writer.close()
+                log.info(f"[INFO] Closed {self.file_name}", flushed=flushed, discarded=discarded,
+                         **({"unchanged": self.change_filter.dropped} if self.change_filter else {}))
         except Exception as e:
-            log.error(f"Error closing file {self.file_name}: {e}")
\ No newline at end of file
+            log.error(f"Error closing file {self.file_name}: {e}")
+
+        return flushed, discarded
\ No newline at end of file
@@ -3,14 +3,21 @@ import threading
 import signal
 import sys
 import datetime
-from f1_22_telemetry.listener import TelemetryListener
-from f1_22_telemetry.packets import (
-    PacketCarDamageData, PacketCarTelemetryData, PacketCarSetupData, PacketCarStatusData, 
-    PacketEventData, PacketFinalClassificationData, PacketLapData, PacketMotionData, 
-    PacketParticipantsData, PacketSessionData, PacketSessionHistoryData
-)
+import time
 from packetQueue.packet_queue import PacketQueue
+from ingest.batched_udp_source import BatchedUdpSource
+from decoders.registry import MIN_HEADER_SIZE
+from dispatch.packet_dispatcher import PacketDispatcher
+from sharedRing.shared_ring import ParserProcessPool
 from listener import Listener
+from recordWriter.session_writer import session_clock_for
+from raceState.race_state import RaceState
+from eventEngine.event_engine import EventEngine
+from gapEngine.gap_engine import GapEngine
+from miniSectors.mini_sector_index import MiniSectorIndex
+from tyreModel.tyre_degradation import TyreDegradationModel
+from engineFeed.engine_feed import EngineSet
+from recordWriter.record_writer import open_writer
 
 # Initialize structured logging
 log = structlog.get_logger()
@@ -20,8 +27,59 @@ class MainTelemetryListener:
 
     _instance = None
 
-    def __init__(self, packet_types=None, player_indexes=None, ip='127.0.0.1', port=20777):
-        """Initializes the listener and starts dedicated packet processors."""
+    def __init__(self, packet_types=None, player_indexes=None, ip='127.0.0.1', port=20777,
+                 source=None, capture_path=None, decoder="ctypes", recv_buffer_size=8 * 1024 * 1024,
+                 parser_processes=False, ring_slots=4096, queue_config=None, drain_timeout=5.0,
+                 output_format="json", writer_options=None, dedupe=None, parser_options=None, engines=None,
+                 pit_strategy=None):
+        """
+        Initializes the listener and starts dedicated packet processors.
+
+        Args:
+            packet_types (list, optional): Packet types to process.
+            player_indexes (list, optional): Player indexes to extract data for.
+            ip (str): Host to bind the telemetry socket to.
+            port (int): UDP port to bind the telemetry socket to.
+            source (object, optional): Packet source used instead of the live `BatchedUdpSource`,
+                e.g. a `ReplaySource`. Must provide `recv()` or `recv_batch()` returning raw
+                datagrams and may provide `close()`.
+            capture_path (str, optional): Records every received datagram to this capture file.
+            decoder (str): "ctypes" (default) or "numpy" for zero-copy structured-array packets.
+            recv_buffer_size (int): Kernel receive buffer requested for the live telemetry socket.
+            parser_processes (bool): Parse each packet type in its own process, fed through a
+                shared-memory ring, instead of a `Listener` thread in this process.
+            ring_slots (int): Datagrams the shared-memory ring holds when `parser_processes` is set.
+            queue_config (dict, optional): packet_type -> (capacity, overflow policy) overriding
+                `DEFAULT_QUEUE_CONFIG`, e.g. {"motion": (60, "coalesce")}.
+            drain_timeout (float): Seconds allowed on shutdown for queued packets to be written
+                before the rest are discarded.
+            output_format (str | list): "json" for pretty-printed records (default), "ndjson" for one
+                compact record per line in `.ndjson` files, "parquet" or "arrow" for columnar files
+                with one row per car per packet (requires pyarrow), or a list, e.g. ["ndjson", "parquet"].
+            writer_options (dict, optional): Flush policy for the record files, see `RecordWriter`,
+                e.g. {"flush_interval": 0.5, "flush_records": 500, "fsync_interval": 10},
+                "row_group_rows"/"compression" for the columnar files, see `ColumnarWriter`, and
+                per-session directories with segment rotation and compression, e.g.
+                {"partition_sessions": True, "rotate_laps": 5, "compress_segments": "gzip"}, see `SessionWriter`.
+            dedupe (bool | dict, optional): True to write carSetup, participants, session,
+                finalClassification and sessionHistory records only when they change, with a full
+                keyframe every 10 s, or options such as {"keyframe_interval": 30, "delta": True},
+                see `change_filter_for`.
+            parser_options (dict, optional): packet_type -> keyword arguments for its parser, e.g.
+                {"sessionHistory": {"incremental": True}} to write only new and changed laps.
+            engines (iterable, optional): Analytics engines fed with every received datagram, as names
+                from `ENGINES` or objects with `feed(data)`, see `EngineSet`. "race_state" keeps every car's
+                current state (`self.race_state.snapshot()`); "event_engine" detects overtakes, pit stops,
+                retirements, fastest laps, damage and penalties, writes them to `raceEvents_<date>.ndjson`
+                and hands them to the subscribers of `self.event_engine`; "gap_engine" computes live gaps
+                and intervals (`self.gap_engine.snapshot()`); "mini_sectors" times every car through 24
+                mini-sectors per lap (`self.mini_sectors`); "tyre_model" fits tyre wear and lap time
+                fall-off per stint (`self.tyre_model.cars()`). An engine that raises is logged and skipped.
+            pit_strategy (bool | dict, optional): Rank every car's pit stop strategies once per lap
+                with a `PitStrategyPlanner` on a process pool, and write the strategy calls to
+                `strategyCalls_<date>.ndjson`. A dict holds planner options, e.g. {"scenarios": 4000,
+                "time_budget": 1.5}. The race state, gap engine and tyre model are added if not given.
+        """
         if MainTelemetryListener._instance is not None:
             raise RuntimeError("An instance of MainTelemetryListener already exists.")
 
@@ -30,16 +88,58 @@ class MainTelemetryListener:
         self.port = port
         self.packet_types = packet_types or ["carDamage","carTelemetry","session"]  # Default packet type
         self.player_indexes = player_indexes  # Store player indexes
+        self.decoder = decoder
+        self.drain_timeout = drain_timeout
+        self.stopped = False
 
         self.session_date = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.engines = EngineSet(engines, pit_strategy)
+        self.race_state = self.engines.find(RaceState)
+        self.event_engine = self.engines.find(EventEngine)
+        self.gap_engine = self.engines.find(GapEngine)
+        self.mini_sectors = self.engines.find(MiniSectorIndex)
+        self.tyre_model = self.engines.find(TyreDegradationModel)
+        self.pit_strategy = self.engines.pit_strategy
+        self.strategy_writer = None
+        if self.pit_strategy:
+            self.strategy_writer = open_writer("strategyCalls", self.session_date, None, "ndjson",
+                                               {"flush_interval": 0},
+                                               directory=(writer_options or {}).get("output_dir", ""))
+            self.pit_strategy.subscribe(lambda call: self.strategy_writer.write([call]))
+            self.pit_strategy.start()
+        self.event_writer = None
+        if self.event_engine:
+            self.event_writer = open_writer("raceEvents", self.session_date, None, "ndjson",
+                                            {"flush_interval": 0},  # Events are rare; write each at once
+                                            directory=(writer_options or {}).get("output_dir", ""))
+            self.event_engine.subscribe(lambda event: self.event_writer.write([event.to_dict()]))
+
+        # The player's lap, read by the receiver, when segments are rotated on lap boundaries
+        self.session_clock = session_clock_for(writer_options)
+        if self.session_clock:
+            writer_options = {**writer_options, "session_clock": self.session_clock}
 
-        # Initialize queues & listeners
+        # Initialize queues & listeners, or the parser processes and their shared ring
         self.listeners = {}
-        for packet_type in self.packet_types:
-            PacketQueue.add_queue(packet_type)
-            self.listeners[packet_type] = Listener(packet_type, self.player_indexes, self.session_date)
+        self.process_pool = None
+        if parser_processes:
+            self.process_pool = ParserProcessPool(self.packet_types, self.player_indexes, self.session_date,
+                                                  decoder=decoder, slot_count=ring_slots,
+                                                  output_format=output_format, writer_options=writer_options,
+                                                  dedupe=dedupe, parser_options=parser_options)
+        else:
+            queue_config = queue_config or {}
+            for packet_type in self.packet_types:
+                PacketQueue.add_queue(packet_type, *queue_config.get(packet_type, (None, None)))
+                self.listeners[packet_type] = Listener(packet_type, self.player_indexes, self.session_date,
+                                                       output_format=output_format, writer_options=writer_options,
+                                                       dedupe=dedupe, parser_options=parser_options)
 
-        self.listener = TelemetryListener(host=self.ip, port=self.port)
+        if source is not None:
+            self.listener = source
+        else:
+            self.listener = BatchedUdpSource(host=self.ip, port=self.port, recv_buffer_size=recv_buffer_size,
+                                             capture_path=capture_path)
         self.shutdown_event = threading.Event()
 
         signal.signal(signal.SIGINT, self.handle_exit)
@@ -49,28 +149,31 @@ class MainTelemetryListener:
         """Listens to F1 22 telemetry packets and adds them to processing queues."""
         log.info(f"Listening on {self.ip}:{self.port} for packets: {self.packet_types}")
 
-        packet_mapping = {
-            "carDamage": PacketCarDamageData,
-            "carTelemetry": PacketCarTelemetryData,
-            "carSetup": PacketCarSetupData,
-            "carStatus": PacketCarStatusData,
-            "event": PacketEventData,
-            "finalClassification": PacketFinalClassificationData,
-            "lap": PacketLapData,
-            "motion": PacketMotionData,
-            "participants": PacketParticipantsData,
-            "session": PacketSessionData,
-            "sessionHistory": PacketSessionHistoryData,
-        }
+        dispatcher = self.process_pool or PacketDispatcher(self.packet_types, self.player_indexes, self.decoder)
+
+        # Read raw datagrams so unsubscribed packet types are dropped before decoding,
+        # draining whole batches when the source supports it
+        recv_batch = getattr(self.listener, "recv_batch", None)
+        if recv_batch is None:
+            recv = getattr(self.listener, "recv", None) or (lambda: self.listener.socket.recv(2048))
+            recv_batch = lambda: (recv(),)
+        session_clock = self.session_clock
+        engines = list(self.engines)  # Each guarded, so an engine's failure cannot stop the receiver
 
         while not self.shutdown_event.is_set():
             try:
-                packet = self.listener.get()
-
-                for packet_type, packet_class in packet_mapping.items():
-                    if isinstance(packet, packet_class) and packet_type in self.packet_types:
-                        PacketQueue.put(packet_type, (packet, self.player_indexes))  # Pass tuple
+                for data in recv_batch():
+                    if len(data) < MIN_HEADER_SIZE:
+                        continue  # Sources without their own check, e.g. `recv()` or a replay
+                    if session_clock:
+                        session_clock.observe(data)  # Before the packet can reach a writer
+                    for engine in engines:
+                        engine.feed(data)
+                    dispatcher.dispatch(data)
 
+            except EOFError:
+                log.info("Replay finished.")
+                break
             except Exception as e:
                 log.error(f"Error: {e}")
                 break
@@ -79,23 +182,59 @@ class MainTelemetryListener:
 
     def start(self):
         """Starts the telemetry listener in a separate thread."""
-        listener_thread = threading.Thread(target=self.listen, daemon=True)
-        listener_thread.start()
+        self.listener_thread = threading.Thread(target=self.listen, daemon=True)
+        self.listener_thread.start()
 
         try:
-            while listener_thread.is_alive():
-                listener_thread.join(timeout=1)
+            while self.listener_thread.is_alive():
+                self.listener_thread.join(timeout=1)
         except KeyboardInterrupt:
-            self.handle_exit(None, None)
+            pass
+
+        self.handle_exit(None, None)
 
     def handle_exit(self, signum, frame):
-        """Handles graceful shutdown and stops all threads."""
+        """
+        Shuts down in a fixed order: stop receiving, close the queues, let every listener
+        drain its queue to file within `drain_timeout`, then close the source.
+        """
+        if self.stopped:
+            return
+        self.stopped = True
         log.info("\n[INFO] Stopping MainTelemetryListener...")
 
         self.shutdown_event.set()
+        listener_thread = getattr(self, "listener_thread", None)
+        if listener_thread and listener_thread is not threading.current_thread():
+            listener_thread.join(timeout=1)  # No more packets are queued or written to the ring
 
+        PacketQueue.close()  # Wake every listener; each drains what is queued and stops
+        deadline = time.monotonic() + self.drain_timeout
+        flushed = discarded = 0
         for packet_type, listener in self.listeners.items():
-            listener.handle_exit(signum, frame)
+            listener_flushed, listener_discarded = listener.handle_exit(
+                timeout=max(deadline - time.monotonic(), 0))
+            flushed += listener_flushed
+            discarded += listener_discarded
+
+        if self.listeners:
+            log.info("Packet queues drained", flushed=flushed, discarded=discarded)
+            log.info("Packet queue stats", queues=PacketQueue.stats())
+
+        if self.process_pool:
+            self.process_pool.close(timeout=self.drain_timeout)
+
+        if self.event_writer:
+            self.event_writer.close()
+            log.info(f"[INFO] Closed {self.event_writer.file_name}", **self.event_engine.stats())
+
+        if self.pit_strategy:
+            self.pit_strategy.stop()
+            self.strategy_writer.close()
+
+        close_source = getattr(self.listener, "close", None)
+        if close_source:
+            close_source()
 
         log.info("[INFO] Listener successfully stopped.")
         sys.exit(0)
@@ -150,5 +289,61 @@ if __name__ == "__main__":
     #     packet_types=["sessionHistory"],
     #     player_indexes=[3, 19, 15]
     # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["carTelemetry", "motion", "lap"],
+    #     parser_processes=True  # One parser process per packet type
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["carTelemetry", "lap", "event"],
+    #     output_format="ndjson",  # One compact record per line
+    #     writer_options={"flush_interval": 0.5, "fsync_interval": 10}
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["carTelemetry", "lap"],
+    #     output_format=["ndjson", "parquet"]  # Also write columnar files for analysis
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["participants", "session", "carSetup"],
+    #     dedupe={"keyframe_interval": 30, "delta": True}  # Write only what changed
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["sessionHistory"],
+    #     parser_options={"sessionHistory": {"incremental": True}}  # Only new and changed laps
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["carTelemetry", "lap", "sessionHistory"],
+    #     output_format="ndjson",  # One directory per session, a gzipped file every 5 laps
+    #     writer_options={"partition_sessions": True, "rotate_laps": 5, "compress_segments": "gzip"}
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["lap", "event"],
+    #     race_state=True  # listener.race_state.snapshot() holds every car's current state
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["lap"],
+    #     event_engine=True  # Overtakes, pit stops, DNFs, fastest laps, damage and penalties
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["lap"],
+    #     gap_engine=True  # listener.gap_engine.snapshot().standings() holds gaps and intervals
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["lap", "session"],
+    #     mini_sectors=MiniSectorIndex(sectors=30)  # listener.mini_sectors.session_best(12)
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["carDamage", "carStatus"],
+    #     tyre_model=TyreDegradationModel(cliff_wear=65.0)  # listener.tyre_model.car(0)["laps_until_cliff"]
+    # )
+    # listener = MainTelemetryListener(
+    #     packet_types=["lap"],
+    #     pit_strategy={"scenarios": 4000, "time_budget": 1.5}  # listener.pit_strategy.plans[car_idx]
+    # )
+    # listener = MainTelemetryListener(capture_path="race.f1cap")
+    # from capture.raw_capture import ReplaySource
+    # listener = MainTelemetryListener(
+    #     packet_types=["lap", "carTelemetry"],
+    #     source=ReplaySource("race.f1cap", speed=None)  # Replay at maximum speed
+    # )
     listener = MainTelemetryListener()
     listener.start()
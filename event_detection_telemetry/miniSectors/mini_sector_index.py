@@ -0,0 +1,198 @@
+import math
+import numpy as np
+from dispatch.packet_dispatcher import PACKET_TYPE_IDS
+from vectorized.numpy_decoder import MAX_CARS, datagram_routes, route_datagram
+
+
+class MiniSectorIndex:
+    """
+    Mini-sector times of every car on every lap, with personal and session bests.
+
+    The track is split into `sectors` equal mini-sectors by `lap_distance`, using the track
+    length from the Session packet; Lap Data that arrives before it is skipped. `feed()`
+    finds the cars that crossed a mini-sector boundary with one vectorized pass, interpolates
+    the crossing time between packets, and stores the completed mini-sector's time in a
+    float32 array per lap. Personal and session bests are updated on the same write, so every
+    query below reads stored values in O(1).
+
+    Mini-sectors driven partly in the pit lane are not timed, and neither is the first one a
+    car is seen in. Only the receiver may call `feed()`; single values can be read from any
+    thread, and arrays are returned as copies.
+    """
+
+    def __init__(self, sectors=24, laps=80):
+        """
+        Args:
+            sectors (int): Mini-sectors per lap.
+            laps (int): Laps to allocate up front; the arrays double when a longer race needs it.
+        """
+        self.sectors = int(sectors)
+        self.times = np.full((MAX_CARS, laps + 1, self.sectors), np.nan, dtype=np.float32)  # Indexed by lap number
+        self.personal_bests = np.full((MAX_CARS, self.sectors), np.inf)
+        self.session_bests = np.full(self.sectors, np.inf)
+        self.session_best_cars = np.full(self.sectors, -1, dtype=np.int64)
+
+        self.boundaries = np.full(MAX_CARS, -1, dtype=np.int64)  # lap * sectors + mini-sector of each car
+        self.crossing_times = np.full(MAX_CARS, np.nan)  # Session time of each car's last boundary; NaN if unknown
+        self.samples = np.zeros((MAX_CARS, 4))  # Last session time, lap, lap distance and pit status
+
+        self.session_uid = None
+        self.track_length = None
+        self.sector_length = None
+
+        self.routes = datagram_routes({PACKET_TYPE_IDS[packet_type]: packet_type for packet_type in ("lap", "session")})
+
+    def reset(self):
+        """Forgets every time; called when a new session starts."""
+        self.times[:] = np.nan
+        self.personal_bests[:] = np.inf
+        self.session_bests[:] = np.inf
+        self.session_best_cars[:] = -1
+        self.boundaries[:] = -1
+        self.crossing_times[:] = np.nan
+        self.track_length = None
+        self.sector_length = None
+
+    def feed(self, data):
+        """
+        Applies a raw datagram if it is a Lap Data or Session packet; others are ignored.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+        """
+        routed = route_datagram(self.routes, data)
+        if routed is None:
+            return
+
+        (packet_type, offset, dtype, _), (_, session_uid, session_time, _) = routed
+        if session_uid != self.session_uid:
+            self.reset()
+            self.session_uid = session_uid
+        if packet_type == "session":
+            track_length = int(np.frombuffer(data, dtype=dtype, count=1)["track_length"][0])
+            if track_length and track_length != self.track_length:
+                self.track_length = track_length
+                self.sector_length = track_length / self.sectors
+            return
+        if not self.sector_length:
+            return
+
+        cars = np.frombuffer(data, dtype=dtype, count=MAX_CARS, offset=offset)
+        laps = cars["current_lap_num"].astype(np.int64)
+        distances = cars["lap_distance"].astype(np.float64)
+        pit_status = cars["pit_status"]
+        sectors = np.minimum(distances // self.sector_length, self.sectors - 1).astype(np.int64)
+        boundaries = np.where((distances >= 0) & (laps > 0), laps * self.sectors + sectors, -1)
+
+        # Cars that reached a new mini-sector; first sightings and rewinds (flashbacks) only set the boundary
+        moved = boundaries != self.boundaries
+        if moved.any():
+            crossed = np.flatnonzero(moved & (self.boundaries >= 0) & (boundaries > self.boundaries))
+            rewound = np.flatnonzero(moved & ((self.boundaries < 0) | (boundaries < self.boundaries)))
+            self.crossing_times[rewound] = np.nan
+            for car_idx in crossed.tolist():
+                self._cross(car_idx, int(boundaries[car_idx]), session_time, float(distances[car_idx]),
+                            int(pit_status[car_idx]))
+            self.boundaries[moved] = boundaries[moved]
+
+        self.samples[:, 0] = session_time
+        self.samples[:, 1] = laps
+        self.samples[:, 2] = distances
+        self.samples[:, 3] = pit_status
+
+    def _cross(self, car_idx, boundary, session_time, distance, pit_status):
+        """Times the mini-sectors a car completed since its previous packet."""
+        previous_time, previous_lap, previous_distance, previous_pit_status = self.samples[car_idx].tolist()
+        if boundary // self.sectors == previous_lap:
+            travelled = distance - previous_distance
+        else:
+            travelled = self.track_length - previous_distance + distance
+        in_pits = pit_status or previous_pit_status
+
+        for crossed in range(int(self.boundaries[car_idx]) + 1, boundary + 1):
+            lap, sector = divmod(crossed, self.sectors)
+            progress = sector * self.sector_length - previous_distance
+            if lap != previous_lap:
+                progress += self.track_length
+            fraction = min(max(progress / travelled, 0.0), 1.0) if travelled > 0 else 1.0
+            crossing_time = previous_time + fraction * (session_time - previous_time)
+
+            entered = self.crossing_times[car_idx]
+            self.crossing_times[car_idx] = crossing_time
+            if in_pits or math.isnan(entered):
+                continue
+            # The crossing ends the previous mini-sector, which may belong to the previous lap
+            completed_lap, completed_sector = divmod(crossed - 1, self.sectors)
+            self._store(car_idx, completed_lap, completed_sector, crossing_time - entered)
+
+        if in_pits:
+            self.crossing_times[car_idx] = np.nan  # The next mini-sector starts in the pit lane
+
+    def _store(self, car_idx, lap, sector, sector_time):
+        """Writes one mini-sector time and updates the bests it beats."""
+        if lap >= self.times.shape[1]:
+            grown = np.full((MAX_CARS, max(lap + 1, 2 * self.times.shape[1]), self.sectors), np.nan,
+                            dtype=np.float32)
+            grown[:, :self.times.shape[1]] = self.times
+            self.times = grown
+        self.times[car_idx, lap, sector] = sector_time
+        if sector_time < self.personal_bests[car_idx, sector]:
+            self.personal_bests[car_idx, sector] = sector_time
+        if sector_time < self.session_bests[sector]:
+            self.session_bests[sector] = sector_time
+            self.session_best_cars[sector] = car_idx
+
+    def sector_time(self, car_idx, lap, sector):
+        """
+        Returns:
+            float: A car's time through a mini-sector on a lap, or None if it was not timed.
+        """
+        if lap >= self.times.shape[1]:
+            return None
+        sector_time = float(self.times[car_idx, lap, sector])
+        return None if math.isnan(sector_time) else sector_time
+
+    def lap_times(self, car_idx, lap):
+        """
+        Returns:
+            numpy.ndarray: A car's float32 mini-sector times on a lap; NaN where not timed.
+        """
+        if lap >= self.times.shape[1]:
+            return np.full(self.sectors, np.nan, dtype=np.float32)
+        return self.times[car_idx, lap].copy()
+
+    def personal_best(self, car_idx, sector):
+        """
+        Returns:
+            float: A car's best time through a mini-sector this session, or None.
+        """
+        best = float(self.personal_bests[car_idx, sector])
+        return None if math.isinf(best) else best
+
+    def session_best(self, sector):
+        """
+        Returns:
+            tuple: (time, car index) of the session's best time through a mini-sector, or (None, None).
+        """
+        best = float(self.session_bests[sector])
+        return (None, None) if math.isinf(best) else (best, int(self.session_best_cars[sector]))
+
+    def delta_to_best(self, car_idx, lap, sector):
+        """
+        Returns:
+            float: Seconds a car's mini-sector time on a lap was slower than the session best, or None.
+        """
+        sector_time = self.sector_time(car_idx, lap, sector)
+        best, _ = self.session_best(sector)
+        return None if sector_time is None or best is None else sector_time - best
+
+    def fastest_cars(self, lap):
+        """
+        Returns:
+            numpy.ndarray: Index of the car fastest through each mini-sector on a lap; -1 if none was timed.
+        """
+        if lap >= self.times.shape[1]:
+            return np.full(self.sectors, -1, dtype=np.int64)
+        times = self.times[:, lap]
+        fastest = np.argmin(np.where(np.isnan(times), np.inf, times), axis=0)
+        return np.where(np.isnan(times).all(axis=0), -1, fastest)
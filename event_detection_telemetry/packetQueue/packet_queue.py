@@ -1,99 +1,224 @@
-# # import queue
-
-# # class PacketQueue:
-# #     """Thread-safe queue to pass telemetry packets between threads."""
-    
-# #     queues = {}
-
-# #     @staticmethod
-# #     def add_queue(packet_type):
-# #         """Adds a new queue for a specific packet type."""
-# #         if packet_type not in PacketQueue.queues:
-# #             PacketQueue.queues[packet_type] = queue.Queue()
-
-# #     @staticmethod
-# #     def put(packet_type, packet):
-# #         """Adds a packet to the queue."""
-# #         if packet_type in PacketQueue.queues:
-# #             PacketQueue.queues[packet_type].put(packet)
-
-# #     @staticmethod
-# #     def get(packet_type):
-# #         """Retrieves the next packet from the queue."""
-# #         if packet_type in PacketQueue.queues:
-# #             return PacketQueue.queues[packet_type].get()
-
-# import queue
-
-# class PacketQueue:
-#     """Thread-safe queue to pass telemetry packets between threads."""
-    
-#     queues = {}
-
-#     @staticmethod
-#     def add_queue(packet_type, max_size=1000):
-#         """
-#         Adds a new queue for a specific packet type.
-        
-#         Args:
-#             packet_type (str): The type of telemetry packet.
-#             max_size (int): The maximum size of the queue (default: 1000).
-#         """
-#         if packet_type not in PacketQueue.queues:
-#             PacketQueue.queues[packet_type] = queue.Queue(maxsize=max_size)
-
-#     @staticmethod
-#     def put(packet_type, packet, player_indexes):
-#         """
-#         Adds a packet to the queue. If the queue is full, it drops the oldest packet.
-        
-#         Args:
-#             packet_type (str): The type of telemetry packet.
-#             packet: The telemetry packet to add.
-#         """
-#         if packet_type in PacketQueue.queues:
-#             q = PacketQueue.queues[packet_type]
-#             if q.full():
-#                 q.get_nowait()  # Remove the oldest packet if the queue is full
-#             q.put(packet,player_indexes)  # Add the new packet
-
-#     @staticmethod
-#     def get(packet_type, timeout=1):
-#         """
-#         Retrieves the next packet from the queue with a timeout.
-
-#         Args:
-#             packet_type (str): The type of telemetry packet.
-#             timeout (int): Timeout in seconds to wait for a packet (default: 1).
-
-#         Returns:
-#             The retrieved telemetry packet, or None if no packet is available.
-#         """
-#         if packet_type in PacketQueue.queues:
-#             q = PacketQueue.queues[packet_type]
-#             try:
-#                 return q.get(timeout=timeout)
-#             except queue.Empty:
-#                 return None  # Return None instead of raising an error
-#         return None  # Return None if queue does not exist
-
-import queue
+import collections
+import threading
+import time
+
+# Overflow policies:
+#   block        - put() waits for space, nothing is ever dropped
+#   drop_oldest  - the oldest queued packet is discarded to make room
+#   drop_newest  - the incoming packet is discarded
+#   coalesce     - the queued packets are discarded and only the newest is kept
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest", "coalesce")
+
+# (capacity, overflow policy) per packet type. High-rate types shed load, while packets that
+# are sent once per event or session are never dropped.
+DEFAULT_QUEUE_CONFIG = {
+    "motion": (120, "coalesce"),
+    "carTelemetry": (240, "drop_oldest"),
+    "lap": (240, "drop_oldest"),
+    "carStatus": (120, "drop_oldest"),
+    "carDamage": (120, "drop_oldest"),
+    "carSetup": (60, "drop_oldest"),
+    "session": (60, "drop_oldest"),
+    "participants": (60, "drop_oldest"),
+    "sessionHistory": (500, "drop_oldest"),
+    "event": (1000, "block"),
+    "finalClassification": (100, "block"),
+}
+_DEFAULT_CONFIG = (1000, "drop_oldest")
+
+
+class BoundedPacketQueue:
+    """
+    FIFO queue for one packet type with a fixed capacity, an overflow policy and live metrics.
+
+    Consumers sleep on a condition until a packet arrives or the queue is closed, so an idle
+    queue causes no wakeups. After `close()`, consumers still receive what is queued and then
+    get an empty result, which is their signal to stop.
+    """
+
+    def __init__(self, capacity=1000, policy="drop_oldest"):
+        """
+        Args:
+            capacity (int): Packets held before the overflow policy applies.
+            policy (str): One of `OVERFLOW_POLICIES`.
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy}, expected one of {OVERFLOW_POLICIES}.")
+        if capacity < 1:
+            raise ValueError("Queue capacity must be at least 1.")
+
+        self.capacity = capacity
+        self.policy = policy
+        self.items = collections.deque()  # (enqueue time, packet_data)
+        self.condition = threading.Condition()
+        self.closed = False
+
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.discarded = 0
+        self.high_water = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def put(self, packet_data):
+        """
+        Queues a packet, applying the overflow policy when the queue is full.
+
+        Args:
+            packet_data (tuple): (packet, player_indexes)
+
+        Returns:
+            bool: False if the incoming packet itself was dropped, or the queue is closed.
+        """
+        with self.condition:
+            if self.closed:
+                self.dropped += 1
+                return False
+
+            if len(self.items) >= self.capacity:
+                if self.policy == "block":
+                    self.condition.wait_for(lambda: len(self.items) < self.capacity or self.closed)
+                    if self.closed:
+                        self.dropped += 1
+                        return False
+                elif self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                elif self.policy == "drop_oldest":
+                    self.items.popleft()
+                    self.dropped += 1
+                else:  # coalesce
+                    self.dropped += len(self.items)
+                    self.items.clear()
+
+            self.items.append((time.perf_counter(), packet_data))
+            self.enqueued += 1
+            if len(self.items) > self.high_water:
+                self.high_water = len(self.items)
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Returns the next packet, waiting up to `timeout` seconds for one.
+
+        Returns:
+            tuple: (packet, player_indexes), or None if the queue stayed empty.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items or self.closed, timeout=timeout) or not self.items:
+                return None
+
+            enqueue_time, packet_data = self.items.popleft()
+            latency = time.perf_counter() - enqueue_time
+            self.dequeued += 1
+            self.latency_total += latency
+            if latency > self.latency_max:
+                self.latency_max = latency
+            self.condition.notify_all()  # Wake a producer blocked on a full queue
+            return packet_data
+
+    def get_batch(self, max_items=64, max_wait=0.01, timeout=None):
+        """
+        Returns up to `max_items` packets under one lock acquisition.
+
+        Waits up to `timeout` seconds (forever by default) for the first packet, then up to
+        `max_wait` seconds more for the batch to fill, so a busy queue is drained in large
+        batches while a quiet one is not held back.
+
+        Returns:
+            list: (packet, player_indexes) tuples in queue order; empty on timeout or once the
+                queue is closed and drained.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items or self.closed, timeout=timeout) or not self.items:
+                return []
+
+            if len(self.items) < max_items and max_wait and not self.closed:
+                self.condition.wait_for(lambda: len(self.items) >= max_items or self.closed, timeout=max_wait)
+
+            now = time.perf_counter()
+            batch = []
+            for _ in range(min(max_items, len(self.items))):
+                enqueue_time, packet_data = self.items.popleft()
+                latency = now - enqueue_time
+                self.latency_total += latency
+                if latency > self.latency_max:
+                    self.latency_max = latency
+                batch.append(packet_data)
+
+            self.dequeued += len(batch)
+            self.condition.notify_all()  # Wake a producer blocked on a full queue
+            return batch
+
+    def close(self):
+        """Stops accepting packets and wakes every waiting consumer and producer."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def discard(self):
+        """
+        Drops every queued packet, e.g. when a shutdown deadline has passed.
+
+        Returns:
+            int: Number of packets discarded.
+        """
+        with self.condition:
+            discarded = len(self.items)
+            self.items.clear()
+            self.discarded += discarded
+            self.condition.notify_all()
+            return discarded
+
+    def stats(self):
+        """
+        Returns a snapshot of the queue metrics.
+
+        Returns:
+            dict: Capacity, policy, current depth, high-water mark, counters and
+                enqueue-to-dequeue latency in milliseconds.
+        """
+        with self.condition:
+            return {
+                "capacity": self.capacity,
+                "policy": self.policy,
+                "depth": len(self.items),
+                "high_water": self.high_water,
+                "enqueued": self.enqueued,
+                "dequeued": self.dequeued,
+                "dropped": self.dropped,
+                "discarded": self.discarded,
+                "latency_avg_ms": 1000 * self.latency_total / self.dequeued if self.dequeued else 0.0,
+                "latency_max_ms": 1000 * self.latency_max,
+            }
+
 
 class PacketQueue:
-    """Thread-safe queue to pass telemetry packets between threads."""
-    
+    """Thread-safe bounded queues to pass telemetry packets between threads, one per packet type."""
+
     queues = {}
 
     @staticmethod
-    def add_queue(packet_type):
-        """Adds a new queue for a specific packet type."""
+    def add_queue(packet_type, capacity=None, policy=None):
+        """
+        Adds a new queue for a specific packet type.
+
+        Args:
+            packet_type (str): The type of telemetry packet.
+            capacity (int, optional): Maximum queued packets. Defaults to `DEFAULT_QUEUE_CONFIG`.
+            policy (str, optional): Overflow policy, see `OVERFLOW_POLICIES`. Defaults to `DEFAULT_QUEUE_CONFIG`.
+        """
         if packet_type not in PacketQueue.queues:
-            PacketQueue.queues[packet_type] = queue.Queue()
+            default_capacity, default_policy = DEFAULT_QUEUE_CONFIG.get(packet_type, _DEFAULT_CONFIG)
+            PacketQueue.queues[packet_type] = BoundedPacketQueue(capacity or default_capacity,
+                                                                 policy or default_policy)
 
     @staticmethod
     def put(packet_type, packet_data):  # packet_data is a tuple (packet, player_indexes)
         """
-        Adds a packet to the queue.
+        Adds a packet to the queue, applying the queue's overflow policy when it is full.
 
         Args:
             packet_type (str): The type of telemetry packet.
@@ -103,11 +228,73 @@ class PacketQueue:
             PacketQueue.queues[packet_type].put(packet_data)
 
     @staticmethod
-    def get(packet_type):
-        """Retrieves the next packet from the queue."""
+    def get(packet_type, timeout=None):
+        """
+        Retrieves the next packet from the queue, sleeping until one arrives or the queue is closed.
+
+        Args:
+            packet_type (str): The type of telemetry packet.
+            timeout (float, optional): Seconds to wait. Defaults to waiting indefinitely.
+        """
         if packet_type in PacketQueue.queues:
-            try:
-                return PacketQueue.queues[packet_type].get(timeout=1)  # Returns (packet, player_indexes)
-            except queue.Empty:
-                return None  # Return None if queue is empty
+            return PacketQueue.queues[packet_type].get(timeout=timeout)  # Returns (packet, player_indexes) or None
         return None  # Return None if queue does not exist
+
+    @staticmethod
+    def get_batch(packet_type, max_items=64, max_wait=0.01, timeout=None):
+        """
+        Retrieves up to `max_items` queued packets at once.
+
+        Args:
+            packet_type (str): The type of telemetry packet.
+            max_items (int): Largest batch returned.
+            max_wait (float): Seconds to wait for a partial batch to fill once a packet is queued.
+            timeout (float, optional): Seconds to wait for the first packet. Defaults to waiting indefinitely.
+
+        Returns:
+            list: (packet, player_indexes) tuples; empty on timeout or once the queue is closed and drained.
+        """
+        if packet_type in PacketQueue.queues:
+            return PacketQueue.queues[packet_type].get_batch(max_items, max_wait, timeout)
+        return []
+
+    @staticmethod
+    def is_closed(packet_type):
+        """Returns True if the queue was closed, or does not exist."""
+        queue = PacketQueue.queues.get(packet_type)
+        return queue is None or queue.closed
+
+    @staticmethod
+    def close(packet_type=None):
+        """
+        Closes a queue, or all queues, so consumers drain what is left and stop.
+
+        Args:
+            packet_type (str, optional): The queue to close. Defaults to all queues.
+        """
+        queues = PacketQueue.queues.values() if packet_type is None else [PacketQueue.queues.get(packet_type)]
+        for queue in queues:
+            if queue:
+                queue.close()
+
+    @staticmethod
+    def discard(packet_type):
+        """Drops the packets still queued for a packet type and returns how many there were."""
+        queue = PacketQueue.queues.get(packet_type)
+        return queue.discard() if queue else 0
+
+    @staticmethod
+    def stats(packet_type=None):
+        """
+        Returns queue metrics.
+
+        Args:
+            packet_type (str, optional): A single queue to report. Defaults to all queues.
+
+        Returns:
+            dict: The metrics of one queue, or packet type -> metrics for all queues.
+        """
+        if packet_type is not None:
+            queue = PacketQueue.queues.get(packet_type)
+            return queue.stats() if queue else None
+        return {packet_type: queue.stats() for packet_type, queue in PacketQueue.queues.items()}
@@ -0,0 +1,390 @@
+import ctypes
+import struct
+import structlog
+from decoders.registry import classes_for
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+_STRUCT_CODES = {
+    ctypes.c_uint8: "B",
+    ctypes.c_int8: "b",
+    ctypes.c_uint16: "H",
+    ctypes.c_int16: "h",
+    ctypes.c_uint32: "I",
+    ctypes.c_int32: "i",
+    ctypes.c_uint64: "Q",
+    ctypes.c_int64: "q",
+    ctypes.c_float: "f",
+    ctypes.c_double: "d",
+    ctypes.c_char: "c",
+}
+
+
+class Nested:
+    """Field table entry for a nested structure, or an array of structures, read with its own table."""
+
+    def __init__(self, fields, count=None, keep=None, index=None):
+        """
+        Args:
+            fields (list): Field table of the nested structure.
+            count (str, optional): Field next to the array holding how many elements are valid.
+            keep (str, optional): Element field that must be non-zero for the element to be kept.
+            index (str, optional): Output name under which each element gets its 1-based position.
+        """
+        self.fields = fields
+        self.count = count
+        self.keep = keep
+        self.index = index
+
+
+def normalize_field(entry):
+    """
+    Expands a field table entry to (output name, source, transform).
+
+    Entries are a field name, (output name, source), (source, transform) or
+    (output name, source, transform). A source is a field name, or a tuple of field names
+    returned together as a list. A transform is a `Nested` table or a callable applied to the value.
+    """
+    if isinstance(entry, str):
+        return entry, entry, None
+    if len(entry) == 3:
+        return entry
+    if isinstance(entry[1], (str, tuple)):
+        return entry[0], entry[1], None
+    return entry[0], entry[0], entry[1]
+
+
+def _leaf_struct(struct_type, sources):
+    """
+    Builds one `struct.Struct` that reads several scalar or scalar-array fields in a single call.
+
+    Args:
+        struct_type (type): The ctypes structure the fields belong to.
+        sources (iterable): Field names to read.
+
+    Returns:
+        tuple: (struct.Struct, {field name: (index in the unpacked tuple, kind)}), where kind
+            is "value", "text" (NUL-terminated `c_char` array) or the length of a scalar array.
+    """
+    members = dict(struct_type._fields_)
+    leaves = []
+    for source in set(sources):
+        if source not in members:
+            raise KeyError(f"{struct_type.__name__} has no field {source}.")
+        field_type = members[source]
+        offset = getattr(struct_type, source).offset
+        if issubclass(field_type, ctypes.Array) and field_type._type_ is ctypes.c_char:
+            leaves.append((offset, source, f"{field_type._length_}s", "text", 1))
+        elif issubclass(field_type, ctypes.Array):
+            code = _STRUCT_CODES[field_type._type_]
+            leaves.append((offset, source, f"{field_type._length_}{code}", field_type._length_, field_type._length_))
+        else:
+            leaves.append((offset, source, _STRUCT_CODES[field_type], "value", 1))
+
+    layout = "<"
+    position = 0
+    index = 0
+    slots = {}
+    for offset, source, code, kind, width in sorted(leaves):
+        if offset < position:
+            raise ValueError(f"Field {source} of {struct_type.__name__} overlaps another selected field.")
+        if offset > position:
+            layout += f"{offset - position}x"
+        layout += code
+        position = offset + struct.calcsize("<" + code)
+        slots[source] = (index, kind)
+        index += width
+
+    return struct.Struct(layout), slots
+
+
+def compile_table(struct_type, fields):
+    """
+    Compiles a field table into a function that reads one structure straight from a buffer.
+
+    The structure's `_fields_` are introspected once: every selected scalar and scalar-array
+    field is read with a single `struct.unpack_from`, and the dict is built by generated code
+    instead of per-field ctypes attribute lookups.
+
+    Args:
+        struct_type (type): The ctypes structure (or union) the table describes.
+        fields (list): Field table, see `normalize_field` for the entry forms.
+
+    Returns:
+        function: extract(buffer, offset) -> dict, reading the structure at `offset` of `buffer`.
+
+    Raises:
+        KeyError: If the table names a field the structure does not have.
+    """
+    members = dict(struct_type._fields_)
+    entries = [normalize_field(entry) for entry in fields]
+
+    leaf_sources = []
+    for _, source, transform in entries:
+        if isinstance(transform, Nested):
+            if transform.count:
+                leaf_sources.append(transform.count)
+        else:
+            leaf_sources.extend(source if isinstance(source, tuple) else (source,))
+    unpacker, slots = _leaf_struct(struct_type, leaf_sources)
+
+    namespace = {"unpack_from": unpacker.unpack_from}
+
+    def leaf(source):
+        index, kind = slots[source]
+        if kind == "value":
+            return f"v[{index}]"
+        if kind == "text":
+            return f"v[{index}].split(b'\\0', 1)[0]"  # ctypes stops c_char arrays at the first NUL
+        return "[" + ", ".join(f"v[{index + i}]" for i in range(kind)) + "]"
+
+    items = []
+    for position, (name, source, transform) in enumerate(entries):
+        if isinstance(transform, Nested):
+            field_type = members[source]
+            offset = getattr(struct_type, source).offset
+            if not issubclass(field_type, ctypes.Array):
+                namespace[f"nested_{position}"] = compile_table(field_type, transform.fields)
+                expression = f"nested_{position}(buffer, base + {offset})"
+            else:
+                element_type = field_type._type_
+                stride = ctypes.sizeof(element_type)
+                namespace[f"nested_{position}"] = compile_table(element_type, transform.fields)
+                count = f"min({leaf(transform.count)}, {field_type._length_})" if transform.count else field_type._length_
+                condition = ""
+                if transform.keep:
+                    keep_struct, _ = _leaf_struct(element_type, [transform.keep])
+                    namespace[f"keep_{position}"] = keep_struct.unpack_from
+                    condition = f" if keep_{position}(buffer, o)[0]"
+                element = f"nested_{position}(buffer, o)"
+                if transform.index:
+                    element = f"{{{transform.index!r}: n, **{element}}}"
+                expression = (f"[{element} for n, o in enumerate("
+                              f"range(base + {offset}, base + {offset} + {stride} * {count}, {stride}), 1){condition}]")
+        elif isinstance(source, tuple):
+            expression = "[" + ", ".join(leaf(part) for part in source) + "]"
+        else:
+            expression = leaf(source)
+
+        if callable(transform) and not isinstance(transform, Nested):
+            namespace[f"convert_{position}"] = transform
+            expression = f"convert_{position}({expression})"
+        items.append(f"        {name!r}: {expression},")
+
+    code = ["def extract(buffer, base):"]
+    if slots:
+        code.append("    v = unpack_from(buffer, base)")
+    code += ["    return {"] + items + ["    }"]
+    exec(compile("\n".join(code), f"<table {struct_type.__name__}>", "exec"), namespace)
+    return namespace["extract"]
+
+
+class _Layout:
+    """The compiled extractors of one parser for one packet class."""
+
+    __slots__ = ("header", "session_uid", "extract", "cars", "extra", "car_index")
+
+    def __init__(self, header, session_uid, extract, cars, extra, car_index):
+        self.header = header  # buffer -> (session_time, player_car_index)
+        self.session_uid = session_uid  # buffer -> (session_uid,)
+        self.extract = extract  # the field table, per car or for the whole packet
+        self.cars = cars  # (offset, stride, count) of the per-car array, or None
+        self.extra = extra  # the `extra_fields` table, or None if the packet class lacks them
+        self.car_index = car_index  # buffer -> (car index,) for `car_index_field`, or None
+
+
+class TableParser:
+    """
+    Base for the packet parsers: builds each record from a declarative field table and writes
+    records to the parser's `RecordWriter`.
+
+    The table is compiled once per packet class of `packet_id` (F1 22 and F1 23), so adding
+    a field to a parser is a change to its `fields` list. Parsers accept ctypes packets and
+    `NumpyPacket` views alike, and return None for packets of another type.
+
+    Subclasses set:
+        packet_id (int): Packet id the parser handles.
+        packet_type (str): Value of "packet_type" in every record.
+        label (str): Name used in log messages.
+        fields (list): Field table, read from each car of `car_array`, or from the packet itself.
+        car_array (str): Per-car array field; records hold `players` keyed by the requested indexes.
+        cars_key (str): With `car_array`, store every car in a list under this key instead.
+        record_key (str): Without `car_array`, store the packet's fields under this key.
+        car_index_field (str): Without `car_array`, the packet field naming the car it describes;
+            records hold it under `players` when that car was requested.
+        extra_fields (list): Packet-level table merged into the record when the packet class has it.
+        skip_empty (bool): Return None instead of a record without players.
+        volatile_fields (tuple): Fields that change on nearly every packet (clocks, forecasts); change
+            detection ignores them and writes them only on keyframes.
+    """
+
+    packet_id = None
+    packet_type = None
+    label = "Data"
+    fields = ()
+    car_array = None
+    cars_key = None
+    record_key = None
+    car_index_field = None
+    extra_fields = None
+    skip_empty = False
+    volatile_fields = ()
+
+    def __init__(self, writer):
+        """
+        Initializes the parser and compiles its field table for every supported game year.
+
+        Args:
+            writer (RecordWriter): Output used by `save_to_file`; None if records are only returned.
+        """
+        self.writer = writer
+        self.layouts = {packet_class: self._compile(packet_class) for packet_class in classes_for(self.packet_id)}
+
+    def _compile(self, packet_class):
+        members = dict(packet_class._fields_)
+        header_struct, header_slots = _leaf_struct(members["header"], ["session_time", "player_car_index"])
+        if header_slots["session_time"][0] != 0:
+            raise ValueError(f"Unexpected header layout in {packet_class.__name__}.")
+
+        cars = None
+        if self.car_array:
+            array_type = members[self.car_array]
+            extract = compile_table(array_type._type_, self.fields)
+            cars = (getattr(packet_class, self.car_array).offset, ctypes.sizeof(array_type._type_), array_type._length_)
+        else:
+            extract = compile_table(packet_class, self.fields)
+
+        extra = None
+        if self.extra_fields and all(name in members for _, source, _ in map(normalize_field, self.extra_fields)
+                                     for name in (source if isinstance(source, tuple) else (source,))):
+            extra = compile_table(packet_class, self.extra_fields)
+
+        car_index = _leaf_struct(packet_class, [self.car_index_field])[0].unpack_from if self.car_index_field else None
+        session_uid = _leaf_struct(members["header"], ["session_uid"])[0].unpack_from
+        return _Layout(header_struct.unpack_from, session_uid, extract, cars, extra, car_index)
+
+    def resolve(self, packet):
+        """
+        Finds the compiled layout for a packet.
+
+        Returns:
+            tuple: (layout, buffer to read), or (None, None) for a packet this parser does not handle.
+        """
+        layout = self.layouts.get(type(packet))
+        if layout is not None:
+            return layout, packet
+
+        # NumpyPacket views carry their packet class and expose the datagram as `record`
+        layout = self.layouts.get(getattr(packet, "packet_class", None))
+        if layout is None:
+            return None, None
+        return layout, packet.record
+
+    def session_uid(self, packet):
+        """
+        Reads the packet header's `session_uid`, which `SessionWriter` partitions the output by.
+
+        Returns:
+            int: The session's unique id, or None for a packet this parser does not handle.
+        """
+        layout, buffer = self.resolve(packet)
+        if layout is None:
+            return None
+        return layout.session_uid(buffer, 0)[0]
+
+    def parse(self, packet, player_indexes=None) -> dict:
+        """
+        Parses a packet with the parser's field table.
+
+        Args:
+            packet (Packet | NumpyPacket): The raw telemetry packet.
+            player_indexes (list, optional): List of player indexes to extract data for. Defaults to None (human player only).
+
+        Returns:
+            dict: Parsed JSON data containing only the specified player indexes, or None.
+        """
+        layout, buffer = self.resolve(packet)
+        if layout is None:
+            return None
+
+        session_time, player_car_index = layout.header(buffer, 0)
+        if player_indexes is None:
+            player_indexes = [player_car_index]  # Default to human player only
+
+        parsed_data = {"timestamp": session_time, "packet_type": self.packet_type}
+
+        if layout.cars:
+            offset, stride, count = layout.cars
+            if self.cars_key:
+                parsed_data[self.cars_key] = [layout.extract(buffer, offset + stride * idx) for idx in range(count)]
+            else:
+                parsed_data["players"] = {idx: layout.extract(buffer, offset + stride * idx)
+                                          for idx in player_indexes if 0 <= idx < count}
+        elif self.car_index_field:
+            car_idx = layout.car_index(buffer, 0)[0]
+            parsed_data["players"] = {car_idx: layout.extract(buffer, 0)} if car_idx in player_indexes else {}
+        elif self.record_key:
+            parsed_data[self.record_key] = layout.extract(buffer, 0)
+        else:
+            parsed_data.update(layout.extract(buffer, 0))
+
+        if layout.extra:
+            parsed_data.update(layout.extra(buffer, 0))
+
+        if self.skip_empty and not parsed_data.get("players"):
+            return None
+        return parsed_data
+
+    def rows(self, record):
+        """
+        Splits a parsed record into the rows of the columnar output, see `ColumnarWriter`.
+
+        Args:
+            record (dict): A record returned by `parse`.
+
+        Returns:
+            list: One dict per car ("timestamp", "car_index", the car's fields and any
+                `extra_fields`), or a single dict of the packet's fields for packet-level parsers.
+        """
+        if self.cars_key:
+            cars = record[self.cars_key]
+            cars = cars.items() if isinstance(cars, dict) else enumerate(cars)  # A dict in delta records
+        elif self.car_array or self.car_index_field:
+            cars = record["players"].items()
+        else:
+            row = {"timestamp": record["timestamp"]}
+            row.update(record[self.record_key] if self.record_key else record)
+            row.pop("packet_type", None)
+            return [row]
+
+        shared = {key: value for key, value in record.items() if key not in ("packet_type", "players", self.cars_key)}
+        return [{"car_index": car_index, **car, **shared} for car_index, car in cars]
+
+    def save_to_file(self, data: dict, session_uid=None):
+        """
+        Hands parsed data to the writer, which flushes it to the file per its flush policy.
+
+        Args:
+            data (dict): The parsed telemetry data to be saved.
+            session_uid (int, optional): The packet's session, for a partitioned `SessionWriter`.
+        """
+        try:
+            if data:
+                if session_uid is None:
+                    self.writer.write([data])
+                else:
+                    self.writer.write([data], session_uid)
+                log.debug(f"{self.label} successfully written to file.")
+        except Exception as e:
+            log.error(f"Failed to write {self.label}: {e}")
+
+    def close_file(self):
+        """
+        Flushes and closes the writer's file to ensure proper saving.
+        """
+        try:
+            self.writer.close()
+            log.info(f"{self.label} file handle successfully closed.")
+        except Exception as e:
+            log.error(f"Error closing {self.label} file: {e}")
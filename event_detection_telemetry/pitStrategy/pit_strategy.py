@@ -0,0 +1,412 @@
+import os
+import threading
+import time
+import numpy as np
+import structlog
+from concurrent.futures import ProcessPoolExecutor, wait
+from eventEngine.detectors import ACTIVE_RESULT_STATUS
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+# F1 22 visual compound -> (name, lap time offset in seconds, wear and fall-off multiplier), relative to mediums
+COMPOUNDS = {
+    16: ("soft", 0.0, 1.4),
+    17: ("medium", 0.35, 1.0),
+    18: ("hard", 0.7, 0.7),
+}
+
+DEFAULT_SETTINGS = {
+    "pit_loss": 22.0,  # Seconds lost by a stop, pit lane and stationary time included
+    "pit_loss_noise": 1.0,  # Standard deviation of the pit loss
+    "lap_time_noise": 0.4,  # Standard deviation of a single lap time
+    "wear_per_lap": 2.0,  # Wear per lap on mediums when the tyre model has no estimate yet
+    "fall_off": 0.05,  # Seconds lost per lap of tyre age on mediums, likewise
+    "cliff_wear": 70.0,  # Wear in percent past which grip falls away
+    "cliff_penalty": 0.15,  # Seconds per lap for every percent of wear past the cliff
+    "fuel_effect": 0.03,  # Seconds per lap per kg of fuel
+    "fuel_saving_penalty": 0.5,  # Seconds per lap of fuel deficit, spread over the remaining laps
+    "late_stop_penalty": 1.0,  # Seconds per lap a first stop is made after the pit window's latest lap
+}
+
+# Scenarios evaluated between two deadline checks of a simulation job
+CHUNK_SCENARIOS = 256
+# Seconds of the time budget kept for returning the results of the jobs to the planner
+RESULT_MARGIN = 0.05
+
+
+def _race_times(car, laps_remaining, stops, compounds, settings):
+    """
+    Deterministic time of every scenario to cover the remaining laps, plus the car's current gap.
+
+    Args:
+        car (dict): The car's inputs, see `PitStrategyPlanner.inputs()`.
+        laps_remaining (int): Laps left in the race.
+        stops (numpy.ndarray): (scenarios, 2) remaining-lap index from which each new set is
+            used; `laps_remaining` for no stop.
+        compounds (numpy.ndarray): (scenarios, 3) visual compound of each stint.
+        settings (dict): `DEFAULT_SETTINGS` with overrides.
+
+    Returns:
+        numpy.ndarray: Seconds per scenario.
+    """
+    laps = np.arange(laps_remaining)[None, :]
+    first_stop, second_stop = stops[:, :1], stops[:, 1:]
+    stint = (laps >= first_stop).astype(np.int64) + (laps >= second_stop)
+    age = np.where(stint == 0, car["tyre_age"] + laps, laps - np.where(stint == 1, first_stop, second_stop))
+    compound = np.take_along_axis(compounds, stint, axis=1)
+
+    offsets = np.zeros(256)
+    multipliers = np.ones(256)
+    for visual, (_, offset, multiplier) in COMPOUNDS.items():
+        offsets[visual], multipliers[visual] = offset, multiplier
+    current = car["compound"]
+    scale = multipliers[compound] / multipliers[current]  # Rates are measured on the current compound
+
+    wear = np.where(stint == 0, car["wear"] + car["wear_per_lap"] * laps, car["wear_per_lap"] * scale * age)
+    lap_times = (car["pace"] + offsets[compound] - offsets[current]
+                 + car["fall_off"] * (scale * age - car["tyre_age"])
+                 + settings["cliff_penalty"] * np.maximum(wear - settings["cliff_wear"], 0.0)
+                 - settings["fuel_effect"] * car["fuel_burn"] * laps)
+    return car["gap"] + lap_times.sum(axis=1) + (stops < laps_remaining).sum(axis=1) * settings["pit_loss"]
+
+
+def _baseline(car, laps_remaining, pit_window_lap, pit_window_latest_lap):
+    """
+    The strategy expected of a rival: one stop in the pit window onto a harder compound, if still due.
+
+    The stop is on the window's ideal lap, or half way through the remaining laps, but no later
+    than its latest lap; a rival already past the window stops on the next lap.
+    """
+    if car["pit_stops"] or laps_remaining < 2:
+        return np.array([[laps_remaining, laps_remaining]]), np.array([[car["compound"]] * 3])
+    stop = pit_window_lap - car["lap"] if pit_window_lap else laps_remaining // 2
+    if pit_window_latest_lap:
+        stop = min(stop, pit_window_latest_lap - car["lap"] + 1)
+    stop = int(np.clip(stop, 1, laps_remaining - 1))
+    harder = 18 if car["compound"] != 18 else 17
+    return np.array([[stop, laps_remaining]]), np.array([[car["compound"], harder, harder]])
+
+
+def _scenarios(car, laps_remaining, count, rng):
+    """
+    Stop laps and compounds to evaluate: staying out, every one-stop and a sample of two-stops.
+
+    A car that has not stopped yet must stop at least once, and fit a second compound.
+    """
+    visuals = np.array(list(COMPOUNDS))
+    stops, compounds = [], []
+    current = car["compound"]
+    if car["pit_stops"]:
+        stops.append((laps_remaining, laps_remaining))
+        compounds.append((current, current, current))
+    for stop in range(1, laps_remaining):
+        for visual in visuals.tolist():
+            if car["pit_stops"] or visual != current:
+                stops.append((stop, laps_remaining))
+                compounds.append((current, visual, visual))
+
+    stops = np.array(stops, dtype=np.int64).reshape(-1, 2)
+    compounds = np.array(compounds, dtype=np.int64).reshape(-1, 3)
+    two_stops = max(count - len(stops), 0) if laps_remaining > 2 else 0
+    if two_stops:
+        first = rng.integers(1, laps_remaining - 1, two_stops)
+        second = first + 1 + (rng.random(two_stops) * (laps_remaining - 1 - first)).astype(np.int64)
+        sets = rng.choice(visuals, (two_stops, 2))
+        valid = car["pit_stops"] > 0
+        valid = valid | (sets[:, 0] != current) | (sets[:, 1] != current)
+        stops = np.concatenate([stops, np.stack([first[valid], second[valid]], axis=1)])
+        compounds = np.concatenate([compounds, np.column_stack([np.full(int(valid.sum()), current), sets[valid]])])
+    return stops, compounds
+
+
+def simulate_car(inputs, car_idx, scenarios, draws, settings, seed, deadline=None):
+    """
+    Ranks one car's strategies by expected finishing position; runs in a worker process.
+
+    Every scenario's deterministic race time is computed for all remaining laps at once, and
+    `draws` random races add lap time and pit loss noise to it and to every rival's baseline
+    strategy. The finishing position of each draw is the number of rivals finishing ahead.
+    A car that has not stopped yet loses `late_stop_penalty` seconds for every lap its first
+    stop is made after the pit window's latest lap.
+
+    Scenarios are evaluated `CHUNK_SCENARIOS` at a time, staying out and the one-stops first,
+    and evaluation stops when another chunk would end past `deadline`. Only the evaluated
+    scenarios are ranked.
+
+    Args:
+        inputs (dict): Race inputs from `PitStrategyPlanner.inputs()`.
+        car_idx (int): The car to plan for.
+        scenarios (int): Strategies to evaluate, at least every one-stop.
+        draws (int): Random races per strategy.
+        settings (dict): `DEFAULT_SETTINGS` with overrides.
+        seed (int): Seed of the random draws.
+        deadline (float, optional): `time.time()` by which the job must return.
+
+    Returns:
+        list: Strategies as dicts, best first, or None if the deadline passed before any
+            scenario was evaluated.
+    """
+    rng = np.random.default_rng(seed)
+    laps_remaining = inputs["laps_remaining"]
+    cars = inputs["cars"]
+    car = cars[car_idx]
+
+    rivals = []
+    for rival_idx, rival in cars.items():
+        if rival_idx != car_idx:
+            rival_stops, rival_compounds = _baseline(rival, laps_remaining, inputs["pit_window_lap"],
+                                                     inputs["pit_window_latest_lap"])
+            rival_time = _race_times(rival, laps_remaining, rival_stops, rival_compounds, settings)[0]
+            rival_noise = (rng.normal(0.0, settings["lap_time_noise"] * np.sqrt(laps_remaining), draws)
+                           + rng.normal(0.0, settings["pit_loss_noise"], draws) * (rival_stops < laps_remaining).sum())
+            rivals.append(rival_time + rival_noise)
+    rivals = np.array(rivals).reshape(-1, draws)
+
+    stops, compounds = _scenarios(car, laps_remaining, scenarios, rng)
+    stop_counts = (stops < laps_remaining).sum(axis=1)
+    late_laps = np.zeros(len(stops))
+    if inputs["pit_window_latest_lap"] and not car["pit_stops"]:
+        late_laps = np.maximum(car["lap"] + stops[:, 0] - 1 - inputs["pit_window_latest_lap"], 0)
+    penalties = late_laps * settings["late_stop_penalty"]
+    times, positions = [], []
+    chunk_seconds = 0.0
+    for start in range(0, len(stops), CHUNK_SCENARIOS):
+        chunk_started = time.time()
+        if deadline is not None and chunk_started + chunk_seconds > deadline:
+            break
+        chunk = slice(start, start + CHUNK_SCENARIOS)
+        chunk_times = _race_times(car, laps_remaining, stops[chunk], compounds[chunk], settings) + penalties[chunk]
+        shape = (len(chunk_times), draws)
+        noise = (rng.normal(0.0, settings["lap_time_noise"] * np.sqrt(laps_remaining), shape)
+                 + rng.normal(0.0, settings["pit_loss_noise"], shape) * stop_counts[chunk, None])
+        totals = chunk_times[:, None] + noise
+        times.append(chunk_times)
+        positions.append(1 + (rivals[None, :, :] < totals[:, None, :]).sum(axis=1))  # (scenarios, draws)
+        chunk_seconds = time.time() - chunk_started
+    if not times:
+        return None
+
+    times = np.concatenate(times)
+    positions = np.concatenate(positions)
+    expected = positions.mean(axis=1)
+    order = np.lexsort((times, expected))
+
+    strategies = []
+    for scenario in order[:inputs["top"]].tolist():
+        used = int(stop_counts[scenario])
+        strategies.append({
+            "pit_laps": [car["lap"] + int(stop) - 1 for stop in stops[scenario, :used].tolist()],
+            "compounds": [COMPOUNDS[visual][0] for visual in compounds[scenario, 1:used + 1].tolist()],
+            "expected_position": round(float(expected[scenario]), 2),
+            "best_position": int(positions[scenario].min()),
+            "worst_position": int(positions[scenario].max()),
+            "expected_race_time": round(float(times[scenario]), 1),
+        })
+    return strategies
+
+
+class PitStrategyPlanner:
+    """
+    Ranks pit stop strategies for every car once per lap, by Monte Carlo simulation.
+
+    A background thread watches the `RaceState` and, when the leader starts a new lap,
+    gathers each car's position, gap (`GapEngine`), tyre age, compound and wear, fitted wear
+    and fall-off (`TyreDegradationModel`), fuel, and the session's pit window, ideal and
+    latest lap. One job per car then runs `simulate_car` on a `ProcessPoolExecutor`. It
+    evaluates thousands of stop lap and compound scenarios as NumPy arrays and ranks them by
+    expected finishing position against the rivals' expected strategies, which stop within
+    the window. Each job is given the lap's deadline,
+    `time_budget` after planning started, and stops evaluating scenarios when it is reached.
+    Jobs not finished by then are dropped, and those cars keep their previous plan; a car
+    whose previous job is still running is not planned again until it ends.
+
+    Each new plan is handed to the subscribers as a strategy call:
+    {"car_index", "lap", "position", "compound", "tyres_age_laps", "strategies": [...]}.
+    """
+
+    def __init__(self, race_state, gap_engine=None, tyre_model=None, cars=None, scenarios=2000, draws=16,
+                 time_budget=2.0, workers=None, top=3, settings=None, subscribers=None):
+        """
+        Args:
+            race_state (RaceState): State fed by the receiver.
+            gap_engine (GapEngine, optional): Gaps; without it, 1.5 s per position is assumed.
+            tyre_model (TyreDegradationModel, optional): Fitted wear and fall-off; without it,
+                `DEFAULT_SETTINGS` rates are used.
+            cars (list, optional): Car indexes to plan for; defaults to every active car.
+            scenarios (int): Strategies evaluated per car and lap.
+            draws (int): Random races per strategy.
+            time_budget (float): Seconds a lap's planning may take.
+            workers (int, optional): Worker processes; defaults to the CPU count, at most 4.
+            top (int): Strategies reported per car.
+            settings (dict, optional): Overrides of `DEFAULT_SETTINGS`.
+            subscribers (list, optional): Callables invoked with every strategy call.
+        """
+        self.race_state = race_state
+        self.gap_engine = gap_engine
+        self.tyre_model = tyre_model
+        self.cars = cars
+        self.scenarios = scenarios
+        self.draws = draws
+        self.time_budget = time_budget
+        self.workers = workers or min(os.cpu_count() or 1, 4)
+        self.top = top
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.subscribers = list(subscribers or [])
+
+        self.plans = {}  # car index -> newest strategy call
+        self.planned_lap = None
+        self.running = {}  # car index -> future of its simulation job
+        self.executor = None
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def subscribe(self, callback):
+        """Adds a callable invoked with every strategy call, in the planner's thread."""
+        self.subscribers.append(callback)
+
+    def start(self):
+        """Starts the worker processes and the thread that plans on every new lap."""
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops planning and shuts the worker processes down."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+
+    def _run(self):
+        """Plans whenever the leader has started a new lap."""
+        while not self.stop_event.wait(0.25):
+            snapshot = self.race_state.snapshot()
+            if snapshot is None:
+                continue
+            leaders = np.flatnonzero(snapshot.cars["car_position"] == 1)
+            lap = int(snapshot.cars["current_lap_num"][leaders[0]]) if leaders.size else 0
+            if lap and lap != self.planned_lap:
+                self.planned_lap = lap
+                try:
+                    self.plan(snapshot)
+                except Exception as e:
+                    log.error(f"Error planning pit strategies: {e}")
+
+    def inputs(self, snapshot):
+        """
+        Gathers the simulation inputs of every active car from the engines.
+
+        Returns:
+            dict: Picklable inputs, or None when the race distance is unknown or almost over.
+        """
+        session = snapshot.session_fields()
+        cars_state = snapshot.cars
+        active = np.flatnonzero((cars_state["result_status"] == ACTIVE_RESULT_STATUS)
+                                & (cars_state["car_position"] > 0))
+        leaders = active[cars_state["car_position"][active] == 1]
+        if not session["total_laps"] or not leaders.size:
+            return None
+        laps_remaining = int(session["total_laps"]) - int(cars_state["current_lap_num"][leaders[0]]) + 1
+        if laps_remaining < 2:
+            return None
+
+        gaps = self.gap_engine.snapshot() if self.gap_engine else None
+        lap_times = cars_state["last_lap_time_in_ms"][active] / 1000.0
+        median_pace = float(np.median(lap_times[lap_times > 0])) if (lap_times > 0).any() else 90.0
+
+        cars = {}
+        for car_idx in active.tolist():
+            state = cars_state[car_idx]
+            compound = int(state["visual_tyre_compound"])
+            if compound not in COMPOUNDS:
+                continue  # Wet weather tyres are not simulated
+            multiplier = COMPOUNDS[compound][2]
+            estimate = self.tyre_model.car(car_idx) if self.tyre_model else {}
+            wear_per_lap = max(estimate.get("wear_per_lap") or 0.0, 0.0) or self.settings["wear_per_lap"] * multiplier
+            fall_off = max(estimate.get("lap_time_fall_off") or 0.0, 0.0) or self.settings["fall_off"] * multiplier
+            pace = float(state["last_lap_time_in_ms"]) / 1000.0
+            gap = float(gaps.gaps[car_idx]) if gaps is not None else np.nan
+            fuel_laps = laps_remaining + float(state["fuel_remaining_laps"])
+            cars[car_idx] = {
+                "lap": int(state["current_lap_num"]),
+                "position": int(state["car_position"]),
+                "gap": gap if np.isfinite(gap) else (int(state["car_position"]) - 1) * 1.5,
+                "pace": pace if abs(pace - median_pace) < 0.1 * median_pace else median_pace,
+                "compound": compound,
+                "tyre_age": int(state["tyres_age_laps"]),
+                "wear": float(np.max(state["tyres_wear"])),
+                "wear_per_lap": wear_per_lap,
+                "fall_off": fall_off,
+                "fuel_burn": float(state["fuel_in_tank"]) / fuel_laps if fuel_laps > 0 else 0.0,
+                "pit_stops": int(state["num_pit_stops"]),
+            }
+            fuel_deficit = -float(state["fuel_remaining_laps"])
+            if fuel_deficit > 0:  # Short on fuel: lift and coast costs time on every lap
+                cars[car_idx]["pace"] += self.settings["fuel_saving_penalty"] * fuel_deficit / laps_remaining
+        return {
+            "laps_remaining": laps_remaining,
+            "pit_window_lap": int(session["pit_stop_window_ideal_lap"]),
+            "pit_window_latest_lap": int(session["pit_stop_window_latest_lap"]),
+            "top": self.top,
+            "cars": cars,
+        }
+
+    def plan(self, snapshot):
+        """
+        Runs one round of simulations within `time_budget` and publishes the new plans.
+
+        Returns:
+            dict: car index -> strategy call, for the cars planned in time.
+        """
+        started = time.perf_counter()
+        inputs = self.inputs(snapshot)
+        if inputs is None:
+            return {}
+        remaining = max(self.time_budget - (time.perf_counter() - started), 0.0)
+        deadline = time.time() + max(remaining - RESULT_MARGIN, 0.0)
+        self.running = {car_idx: future for car_idx, future in self.running.items() if not future.done()}
+        planned = [car_idx for car_idx in inputs["cars"]
+                   if (self.cars is None or car_idx in self.cars) and car_idx not in self.running]
+        futures = {
+            self.executor.submit(simulate_car, inputs, car_idx, self.scenarios, self.draws, self.settings,
+                                 hash((snapshot.session_uid, self.planned_lap, car_idx)) & 0xFFFFFFFF,
+                                 deadline): car_idx
+            for car_idx in planned
+        }
+        done, late = wait(futures, timeout=remaining)
+        for future in late:
+            if not future.cancel():  # Already running: it returns at the deadline
+                self.running[futures[future]] = future
+
+        plans = {}
+        for future in done:
+            car_idx = futures[future]
+            try:
+                strategies = future.result()
+            except Exception as e:
+                log.error(f"Error simulating car {car_idx}: {e}")
+                continue
+            if strategies is None:
+                continue  # Started after the deadline
+            car = inputs["cars"][car_idx]
+            plans[car_idx] = {
+                "car_index": car_idx,
+                "lap": car["lap"],
+                "position": car["position"],
+                "compound": COMPOUNDS[car["compound"]][0],
+                "tyres_age_laps": car["tyre_age"],
+                "strategies": strategies,
+            }
+        self.plans.update(plans)
+
+        for car_idx in sorted(plans, key=lambda idx: plans[idx]["position"]):
+            for subscriber in self.subscribers:
+                try:
+                    subscriber(plans[car_idx])
+                except Exception as e:
+                    log.error(f"Error delivering strategy call: {e}")
+        log.debug("Planned pit strategies", lap=self.planned_lap, cars=len(plans), late=len(late),
+                  seconds=round(time.perf_counter() - started, 3))
+        return plans
@@ -0,0 +1,277 @@
+import ctypes
+import time
+import numpy as np
+from decoders.registry import PACKET_CLASSES
+from dispatch.packet_dispatcher import PACKET_TYPE_IDS
+from parserEngine.table_parser import normalize_field
+from vectorized.numpy_decoder import CAR_ARRAY_FIELDS, MAX_CARS, car_array_layout, ctypes_to_dtype, route_datagram
+
+# packet type -> per-car fields kept in the state, as field names or (state name, source field)
+CAR_STATE_FIELDS = {
+    "lap": [
+        "car_position",
+        "current_lap_num",
+        "lap_distance",
+        "total_distance",
+        "last_lap_time_in_ms",
+        "current_lap_time_in_ms",
+        "sector",
+        "current_lap_invalid",
+        "pit_status",
+        "num_pit_stops",
+        "penalties",
+        "grid_position",
+        "driver_status",
+        "result_status",
+    ],
+    "carTelemetry": [
+        "speed",
+        "throttle",
+        "steer",
+        "brake",
+        "gear",
+        "engine_rpm",
+        "drs",
+        "brakes_temperature",
+        "tyres_surface_temperature",
+        "tyres_inner_temperature",
+    ],
+    "carStatus": [
+        "fuel_in_tank",
+        "fuel_remaining_laps",
+        "drs_allowed",
+        "actual_tyre_compound",
+        "visual_tyre_compound",
+        "tyres_age_laps",
+        "vehicle_fia_flags",
+        "ers_store_energy",
+        "ers_deploy_mode",
+    ],
+    "carDamage": [
+        "tyres_wear",
+        "tyres_damage",
+        "front_left_wing_damage",
+        "front_right_wing_damage",
+        "rear_wing_damage",
+        "floor_damage",
+        "diffuser_damage",
+        "sidepod_damage",
+        "gearbox_damage",
+        ("engine_damage", "engined_damage"),  # Fixed typo
+        "drs_fault",
+        "ers_fault",
+    ],
+    "participants": [
+        "ai_controlled",
+        "driver_id",
+        "team_id",
+        "race_number",
+        "nationality",
+        "name",
+    ],
+    "motion": [
+        "world_position_x",
+        "world_position_y",
+        "world_position_z",
+        "g_force_lateral",
+        "g_force_longitudinal",
+    ],
+}
+
+# packet type -> packet-level fields kept in the state
+SESSION_STATE_FIELDS = {
+    "session": [
+        "session_type",
+        "track_id",
+        "track_length",
+        "total_laps",
+        "session_time_left",
+        "weather",
+        "track_temperature",
+        "air_temperature",
+        "safety_car_status",
+        "pit_stop_window_ideal_lap",
+        "pit_stop_window_latest_lap",
+    ],
+    "participants": ["num_active_cars"],
+}
+
+STATE_PACKET_TYPES = tuple(dict.fromkeys([*CAR_STATE_FIELDS, *SESSION_STATE_FIELDS]))
+
+
+def _state_dtype(tables, struct_of):
+    """Builds the structured dtype of the state fields, typed like their source fields."""
+    names, formats = [], []
+    for packet_type, table in tables.items():
+        struct_type = struct_of(packet_type)
+        source_dtype = ctypes_to_dtype(struct_type)
+        for name, source, transform in map(normalize_field, table):
+            if transform is not None:
+                raise ValueError(f"State field {name} cannot have a transform.")
+            if name in names:
+                raise ValueError(f"State field {name} is read from two packet types.")
+            names.append(name)
+            formats.append(source_dtype[source])
+    return np.dtype({"names": names, "formats": formats})
+
+
+def _car_struct(packet_type):
+    packet_class = PACKET_CLASSES[(2022, PACKET_TYPE_IDS[packet_type])]
+    return dict(packet_class._fields_)[CAR_ARRAY_FIELDS[packet_class]]._type_
+
+
+def _packet_struct(packet_type):
+    return PACKET_CLASSES[(2022, PACKET_TYPE_IDS[packet_type])]
+
+
+CAR_STATE_DTYPE = _state_dtype(CAR_STATE_FIELDS, _car_struct)
+SESSION_STATE_DTYPE = _state_dtype(SESSION_STATE_FIELDS, _packet_struct)
+
+
+class RaceSnapshot:
+    """
+    A consistent copy of the race state, taken by `RaceState.snapshot()`.
+
+    Attributes:
+        session_uid (int): Session the state belongs to.
+        session_time (float): Session time of the newest packet applied.
+        frame_identifier (int): Frame of the newest packet applied; the snapshot's version.
+        frames (dict): packet type -> frame of its last update, or None if none arrived yet.
+        cars (numpy.ndarray): Read-only structured array, one row per car, see `CAR_STATE_FIELDS`.
+        session (numpy.void): Session-level fields, see `SESSION_STATE_FIELDS`.
+    """
+
+    __slots__ = ("session_uid", "session_time", "frame_identifier", "frames", "cars", "session")
+
+    def __init__(self, session_uid, session_time, frame_identifier, frames, cars, session):
+        self.session_uid = session_uid
+        self.session_time = session_time
+        self.frame_identifier = frame_identifier
+        self.frames = frames
+        self.cars = cars
+        self.session = session
+
+    def car(self, car_idx):
+        """
+        Returns:
+            dict: One car's state as Python values, with its name decoded.
+        """
+        car = {name: value.tolist() if isinstance(value, np.ndarray) else value
+               for name, value in zip(CAR_STATE_DTYPE.names, self.cars[car_idx].item())}
+        car["name"] = car["name"].decode("utf-8", "replace").rstrip("\x00")
+        return car
+
+    def session_fields(self):
+        """
+        Returns:
+            dict: The session-level fields as Python values.
+        """
+        return dict(zip(SESSION_STATE_DTYPE.names, self.session.item()))
+
+
+class RaceState:
+    """
+    The current state of the race across lap, telemetry, status, damage, participants, motion
+    and session packets, in preallocated NumPy arrays.
+
+    `feed()` is called by the receiver with every raw datagram. A packet of a state type
+    overwrites its own columns in place with one vectorized copy per field for all 22 cars,
+    so there is no per-car Python work and nothing is allocated. A new `session_uid` clears
+    the state.
+
+    Readers never lock: `snapshot()` copies the arrays under a sequence counter that the
+    single writer makes odd while it updates, and retries if an update overlapped the copy,
+    so every snapshot holds whole packets only. The snapshot is versioned by the newest
+    `frame_identifier` applied.
+    """
+
+    def __init__(self):
+        self.cars = np.zeros(MAX_CARS, dtype=CAR_STATE_DTYPE)
+        self.session = np.zeros(1, dtype=SESSION_STATE_DTYPE)
+        self.frames = np.full(len(STATE_PACKET_TYPES), -1, dtype=np.int64)
+        self.sequence = 0  # Odd while the writer updates the arrays
+        self.session_uid = None
+        self.session_time = 0.0
+        self.frame_identifier = None
+        self.updates = 0
+
+        # (packet_format, packet_id) -> (frame slot, (per-car array offset, car dtype, columns) or None,
+        #                                 (packet dtype, columns) or None, packet size)
+        self.routes = {}
+        for (packet_format, packet_id), packet_class in PACKET_CLASSES.items():
+            packet_type = next((name for name, type_id in PACKET_TYPE_IDS.items() if type_id == packet_id), None)
+            if packet_type not in STATE_PACKET_TYPES:
+                continue
+            cars = None
+            if packet_type in CAR_STATE_FIELDS:
+                cars = (*car_array_layout(packet_class),
+                        [(name, source) for name, source, _ in map(normalize_field, CAR_STATE_FIELDS[packet_type])])
+            session = None
+            if packet_type in SESSION_STATE_FIELDS:
+                session = (ctypes_to_dtype(packet_class), [(name, source) for name, source, _
+                                                           in map(normalize_field, SESSION_STATE_FIELDS[packet_type])])
+            self.routes[(packet_format, packet_id)] = (STATE_PACKET_TYPES.index(packet_type), cars, session,
+                                                       ctypes.sizeof(packet_class))
+
+    def feed(self, data):
+        """
+        Applies a raw datagram if its packet type is part of the state; others are ignored.
+
+        Only one thread may feed the state.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+        """
+        routed = route_datagram(self.routes, data)
+        if routed is None:
+            return
+
+        (frame_slot, cars, session, _), (_, session_uid, session_time, frame_identifier) = routed
+
+        self.sequence += 1
+        if session_uid != self.session_uid:
+            self.cars[:] = 0
+            self.session[:] = 0
+            self.frames[:] = -1
+            self.session_uid = session_uid
+        if cars:
+            offset, car_dtype, columns = cars
+            source = np.frombuffer(data, dtype=car_dtype, count=MAX_CARS, offset=offset)
+            for name, field in columns:
+                self.cars[name] = source[field]
+        if session:
+            packet_dtype, columns = session
+            source = np.frombuffer(data, dtype=packet_dtype, count=1)
+            for name, field in columns:
+                self.session[name] = source[field]
+        self.frames[frame_slot] = frame_identifier
+        self.session_time = session_time
+        self.frame_identifier = frame_identifier
+        self.updates += 1
+        self.sequence += 1
+
+    def snapshot(self):
+        """
+        Copies the state without blocking the writer.
+
+        Returns:
+            RaceSnapshot: A consistent copy, or None before the first state packet.
+        """
+        while True:
+            sequence = self.sequence
+            if not sequence & 1:
+                cars = self.cars.tobytes()  # A plain memcpy; structured `copy()` is far slower
+                session = self.session.tobytes()
+                frames = self.frames.tolist()
+                header = (self.session_uid, self.session_time, self.frame_identifier)
+                if self.sequence == sequence:
+                    break
+            time.sleep(0)  # Let the writer finish its update
+
+        if header[0] is None:
+            return None
+        return RaceSnapshot(*header,
+                            {packet_type: frame if frame >= 0 else None
+                             for packet_type, frame in zip(STATE_PACKET_TYPES, frames)},
+                            np.frombuffer(cars, dtype=CAR_STATE_DTYPE),
+                            np.frombuffer(session, dtype=SESSION_STATE_DTYPE)[0])
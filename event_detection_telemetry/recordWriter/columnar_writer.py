@@ -0,0 +1,237 @@
+import ctypes
+import structlog
+from decoders.registry import classes_for
+from parserEngine.table_parser import Nested, normalize_field
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+# "parquet": Parquet file, one row group per `row_group_rows` rows
+# "arrow": Arrow IPC file (Feather v2), one record batch per `row_group_rows` rows
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+# `writer_options` keys meant for `ColumnarWriter` rather than `RecordWriter`
+COLUMNAR_OPTIONS = ("row_group_rows", "compression")
+
+_ARROW_TYPE_NAMES = {
+    ctypes.c_uint8: "uint8",
+    ctypes.c_int8: "int8",
+    ctypes.c_uint16: "uint16",
+    ctypes.c_int16: "int16",
+    ctypes.c_uint32: "uint32",
+    ctypes.c_int32: "int32",
+    ctypes.c_uint64: "uint64",
+    ctypes.c_int64: "int64",
+    ctypes.c_float: "float32",
+    ctypes.c_double: "float64",
+}
+
+
+def _scalar_type(ctype):
+    return getattr(pyarrow, _ARROW_TYPE_NAMES[ctype])()
+
+
+def _value_type(value):
+    """Arrow type of a converted value, for fields with a transform in the table."""
+    if isinstance(value, str):
+        return pyarrow.string()
+    if isinstance(value, bytes):
+        return pyarrow.binary()
+    if isinstance(value, bool):
+        return pyarrow.bool_()
+    if isinstance(value, int):
+        return pyarrow.int64()
+    if isinstance(value, float):
+        return pyarrow.float64()
+    raise TypeError(f"No Arrow type for converted value {value!r}.")
+
+
+def table_schema(struct_type, fields):
+    """
+    Derives the Arrow fields of the records a field table produces, from the structure's ctypes types.
+
+    Scalar arrays and grouped sources become fixed-size lists, `Nested` tables become structs
+    (or lists of structs), NUL-terminated text becomes binary, and a transformed field gets the
+    type of the transform's result on a zero value.
+
+    Args:
+        struct_type (type): The ctypes structure the table describes.
+        fields (list): Field table, see `parserEngine.table_parser`.
+
+    Returns:
+        list: pyarrow fields, in table order.
+    """
+    members = dict(struct_type._fields_)
+    schema = []
+    for name, source, transform in map(normalize_field, fields):
+        if isinstance(transform, Nested):
+            field_type = members[source]
+            if issubclass(field_type, ctypes.Array):
+                element = table_schema(field_type._type_, transform.fields)
+                if transform.index:
+                    element.insert(0, pyarrow.field(transform.index, pyarrow.uint16()))
+                arrow_type = pyarrow.list_(pyarrow.struct(element))
+            else:
+                arrow_type = pyarrow.struct(table_schema(field_type, transform.fields))
+            schema.append(pyarrow.field(name, arrow_type))
+            continue
+
+        if isinstance(source, tuple):
+            arrow_type = pyarrow.list_(_scalar_type(members[source[0]]), len(source))
+            zero = [0] * len(source)
+        elif issubclass(members[source], ctypes.Array) and members[source]._type_ is ctypes.c_char:
+            arrow_type = pyarrow.binary()
+            zero = b""
+        elif issubclass(members[source], ctypes.Array):
+            arrow_type = pyarrow.list_(_scalar_type(members[source]._type_), members[source]._length_)
+            zero = [0] * members[source]._length_
+        else:
+            arrow_type = _scalar_type(members[source])
+            zero = 0
+
+        if transform is not None:
+            arrow_type = _value_type(transform(zero))
+        schema.append(pyarrow.field(name, arrow_type))
+    return schema
+
+
+def row_schema(parser):
+    """
+    Returns the Arrow schema of the rows `parser.rows()` produces.
+
+    Args:
+        parser (TableParser): The parser, or its class when it has no options changing its table.
+
+    Returns:
+        pyarrow.Schema: "timestamp", "car_index" for per-car parsers, then the table's fields.
+    """
+    packet_classes = classes_for(parser.packet_id)
+    packet_class = packet_classes[0]  # The tables only name fields every game year has
+    columns = [pyarrow.field("timestamp", pyarrow.float32())]
+
+    if parser.car_array:
+        columns.append(pyarrow.field("car_index", pyarrow.uint8()))
+        car_type = dict(packet_class._fields_)[parser.car_array]._type_
+        columns += table_schema(car_type, parser.fields)
+    else:
+        if parser.car_index_field:
+            columns.append(pyarrow.field("car_index", pyarrow.uint8()))
+        columns += table_schema(packet_class, parser.fields)
+
+    if parser.extra_fields:
+        for extra_class in packet_classes:  # Only some game years carry the extra fields
+            try:
+                columns += table_schema(extra_class, parser.extra_fields)
+                break
+            except KeyError:
+                continue
+    return pyarrow.schema(columns)
+
+
+class ColumnarWriter:
+    """
+    Columnar writer for parsed records, with the same interface as `RecordWriter`.
+
+    Each record is split into rows by its parser (one row per car per packet, see
+    `TableParser.rows`), and rows are written `row_group_rows` at a time as a Parquet row
+    group or an Arrow record batch. Readers can then load single columns, e.g. only
+    `car_index` and `speed` of the car telemetry. The file's footer is written by `close()`.
+    """
+
+    def __init__(self, file_name, parser_class, output_format="parquet", row_group_rows=16 * 1024,
+                 compression="zstd", parser_options=None):
+        """
+        Creates the file with the schema derived from the parser's field table.
+
+        Args:
+            file_name (str): File to write.
+            parser_class (type): The `TableParser` subclass whose records are written.
+            output_format (str): One of `COLUMNAR_FORMATS`.
+            row_group_rows (int, optional): Rows per row group (Parquet) or record batch (Arrow).
+            compression (str, optional): "zstd", "lz4" (both formats), "snappy" (Parquet) or None.
+            parser_options (dict, optional): Keyword arguments the pipeline's parser is created with.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        if output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unknown columnar format {output_format}, expected one of {COLUMNAR_FORMATS}.")
+        if pyarrow is None:
+            raise ImportError(f"{output_format} output requires pyarrow (pip install pyarrow).")
+
+        self.file_name = file_name
+        self.output_format = output_format
+        self.row_group_rows = row_group_rows
+        parser = parser_class(None, **(parser_options or {}))
+        self.split_rows = parser.rows
+        self.schema = row_schema(parser)
+
+        self.sink = pyarrow.OSFile(file_name, "wb")
+        if output_format == "parquet":
+            self.file_writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema, compression=compression)
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression=compression)
+            self.file_writer = pyarrow.ipc.new_file(self.sink, self.schema, options=options)
+        self.closed = False
+        self.buffer = []
+
+        self.records = 0
+        self.bytes = 0  # File size after the last row group, without a stat call
+        self.written_rows = 0
+        self.row_groups = 0
+
+    def write(self, records):
+        """
+        Buffers the rows of parsed records and writes every full row group.
+
+        Args:
+            records (list): Parsed records; empty ones are skipped.
+        """
+        for record in records:
+            if record:
+                self.buffer.extend(self.split_rows(record))
+                self.records += 1
+
+        while len(self.buffer) >= self.row_group_rows:
+            self._write_rows(self.buffer[:self.row_group_rows])
+            del self.buffer[:self.row_group_rows]
+
+    def time_to_flush(self):
+        """
+        Returns:
+            None: Row groups are written by size, never on a timer.
+        """
+        return None
+
+    def flush(self):
+        """Does nothing: short row groups would defeat the columnar layout, so rows wait until `close()`."""
+
+    def _write_rows(self, rows):
+        batch = pyarrow.RecordBatch.from_pylist(rows, schema=self.schema)
+        if self.output_format == "parquet":
+            self.file_writer.write_batch(batch, row_group_size=len(rows))
+        else:
+            self.file_writer.write_batch(batch)
+        self.written_rows += len(rows)
+        self.row_groups += 1
+        self.bytes = self.sink.tell()
+
+    def close(self):
+        """Writes the buffered rows and the file footer."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.buffer:
+            self._write_rows(self.buffer)
+            self.buffer = []
+        self.file_writer.close()
+        self.sink.close()
+        log.debug(f"Closed {self.file_name}", records=self.records, rows=self.written_rows,
+                  row_groups=self.row_groups)
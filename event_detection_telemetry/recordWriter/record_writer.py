@@ -0,0 +1,196 @@
+import os
+import time
+import structlog
+from recordWriter.columnar_writer import COLUMNAR_FORMATS, COLUMNAR_OPTIONS, ColumnarWriter
+from recordWriter.serializers import make_encoder
+from recordWriter.session_writer import SESSION_OPTIONS, SessionWriter
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+# "json": records pretty-printed one after another (the original output)
+# "ndjson": one compact record per line, readable line by line by any NDJSON tool
+OUTPUT_FORMATS = ("json", "ndjson")
+
+
+def output_file_name(packet_type, session_date, output_format="json"):
+    """Returns the file name records of one packet type are written to, e.g. `lap_<date>.ndjson`."""
+    return f"{packet_type}_{session_date}.{output_format}"
+
+
+def open_writer(packet_type, session_date, parser_class, output_format="json", writer_options=None,
+                parser_options=None, directory=""):
+    """
+    Opens the output of one packet type's records.
+
+    Args:
+        packet_type (str): The type of telemetry packet.
+        session_date (str): Unique timestamp for file naming.
+        parser_class (type): Parser of the packet type, which defines the columnar schema.
+        output_format (str | list): One of `OUTPUT_FORMATS` or `COLUMNAR_FORMATS`, or a list of
+            them to write each record to several files, e.g. ["ndjson", "parquet"].
+        writer_options (dict, optional): Options for `RecordWriter`; `COLUMNAR_OPTIONS` keys
+            go to `ColumnarWriter` and `SESSION_OPTIONS` keys to `SessionWriter` instead.
+        parser_options (dict, optional): Keyword arguments the parser is created with, which
+            can change the columnar schema.
+        directory (str): Directory of the files; `writer_options["output_dir"]` takes precedence.
+
+    Returns:
+        RecordWriter | ColumnarWriter | WriterGroup | SessionWriter: The writer, a group of them,
+            or a `SessionWriter` opening them per session and segment when rotation options are set.
+    """
+    output_formats = [output_format] if isinstance(output_format, str) else list(output_format)
+    options = dict(writer_options or {})
+    columnar_options = {key: options.pop(key) for key in COLUMNAR_OPTIONS if key in options}
+    session_options = {key: options.pop(key) for key in SESSION_OPTIONS if key in options}
+    directory = session_options.pop("output_dir", directory)
+
+    if session_options:
+        segment_options = {**options, **columnar_options}
+        return SessionWriter(
+            lambda segment_date, segment_directory: open_writer(packet_type, segment_date, parser_class, output_format,
+                                                                segment_options, parser_options, segment_directory),
+            packet_type, session_date, output_dir=directory, **session_options)
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    writers = []
+    for file_format in output_formats:
+        file_name = os.path.join(directory, output_file_name(packet_type, session_date, file_format))
+        if file_format in COLUMNAR_FORMATS:
+            writers.append(ColumnarWriter(file_name, parser_class, file_format, parser_options=parser_options,
+                                          **columnar_options))
+        else:
+            writers.append(RecordWriter(file_name, file_format, **options))
+    return writers[0] if len(writers) == 1 else WriterGroup(writers)
+
+
+class RecordWriter:
+    """
+    Buffered writer for parsed records.
+
+    Encoded records are held in memory and written with one `write()` and `flush()` when the
+    oldest buffered record is `flush_interval` seconds old, or the buffer reaches `flush_bytes`
+    or `flush_records`, whichever comes first. With `fsync_interval` set, a flush also forces
+    the file to disk when that many seconds have passed since the last fsync.
+    """
+
+    def __init__(self, file_name, output_format="json", flush_interval=1.0, flush_bytes=256 * 1024,
+                 flush_records=None, fsync_interval=None, serializer="json"):
+        """
+        Opens `file_name` for appending.
+
+        Args:
+            file_name (str): File to append records to.
+            output_format (str): One of `OUTPUT_FORMATS`.
+            flush_interval (float, optional): Seconds a record may stay buffered; 0 flushes on every write.
+            flush_bytes (int, optional): Buffered bytes that trigger a flush.
+            flush_records (int, optional): Buffered records that trigger a flush.
+            fsync_interval (float, optional): Seconds between fsyncs. Defaults to never.
+            serializer (str): "json", "orjson" or "msgspec"; all write identical bytes, see `make_encoder`.
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {output_format}, expected one of {OUTPUT_FORMATS}.")
+
+        self.file_name = file_name
+        self.output_format = output_format
+        self.encode = make_encoder(output_format, serializer)
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.flush_records = flush_records
+        self.fsync_interval = fsync_interval
+
+        self.file_handle = open(file_name, "a")
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.buffered_since = None  # When the oldest buffered record was written
+        self.last_fsync = time.monotonic()
+
+        self.records = 0
+        self.bytes = 0
+        self.flushes = 0
+
+    def write(self, records):
+        """
+        Buffers parsed records and flushes if the flush policy says so.
+
+        Args:
+            records (list): Parsed records; empty ones are skipped. An empty list only checks the policy.
+        """
+        for record in records:
+            if record:
+                chunk = self.encode(record)
+                self.buffer.append(chunk)
+                self.buffered_bytes += len(chunk)
+                if self.buffered_since is None:
+                    self.buffered_since = time.monotonic()
+
+        if not self.buffer:
+            return
+        if ((self.flush_bytes is not None and self.buffered_bytes >= self.flush_bytes)
+                or (self.flush_records is not None and len(self.buffer) >= self.flush_records)
+                or self.time_to_flush() == 0):
+            self.flush()
+
+    def time_to_flush(self):
+        """
+        Returns:
+            float: Seconds until the buffered records are due, or None if nothing is waiting on a timer.
+        """
+        if self.buffered_since is None or self.flush_interval is None:
+            return None
+        return max(self.buffered_since + self.flush_interval - time.monotonic(), 0)
+
+    def flush(self):
+        """Writes the buffered records to the file, and fsyncs it if `fsync_interval` has passed."""
+        if self.buffer:
+            self.file_handle.write("".join(self.buffer))
+            self.file_handle.flush()
+            self.records += len(self.buffer)
+            self.bytes += self.buffered_bytes
+            self.flushes += 1
+            self.buffer = []
+            self.buffered_bytes = 0
+            self.buffered_since = None
+
+        if self.fsync_interval is not None and time.monotonic() - self.last_fsync >= self.fsync_interval:
+            self.fsync()
+
+    def fsync(self):
+        os.fsync(self.file_handle.fileno())
+        self.last_fsync = time.monotonic()
+
+    def close(self):
+        """Flushes what is buffered and closes the file."""
+        if self.file_handle.closed:
+            return
+        self.flush()
+        if self.fsync_interval is not None:
+            self.fsync()
+        self.file_handle.close()
+        log.debug(f"Closed {self.file_name}", records=self.records, bytes=self.bytes, flushes=self.flushes)
+
+
+class WriterGroup:
+    """Writes the same records to several writers, e.g. NDJSON and Parquet, behind one writer interface."""
+
+    def __init__(self, writers):
+        self.writers = writers
+        self.file_name = ", ".join(writer.file_name for writer in writers)
+
+    def write(self, records):
+        for writer in self.writers:
+            writer.write(records)
+
+    def time_to_flush(self):
+        """Returns the earliest `time_to_flush()` of the writers, or None if none is waiting."""
+        due = [seconds for seconds in (writer.time_to_flush() for writer in self.writers) if seconds is not None]
+        return min(due) if due else None
+
+    def flush(self):
+        for writer in self.writers:
+            writer.flush()
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
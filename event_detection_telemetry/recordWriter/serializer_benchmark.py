@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of the serializer backends on real parser output, per packet type.
+
+    python -m recordWriter.serializer_benchmark --format ndjson --number 2000
+
+Each packet type is parsed once from a synthetic F1 22 packet for all 22 cars, then every
+installed backend encodes the same record and is checked against `json`; times are
+microseconds per record.
+"""
+
+import argparse
+import ctypes
+import random
+import struct
+import timeit
+from decoders.registry import PACKET_CLASSES
+from dispatch.packet_dispatcher import PACKET_TYPE_IDS
+from listener import PARSER_MAPPING
+from recordWriter.serializers import SERIALIZERS, make_encoder
+
+
+def _live_values(value, rng):
+    """Replaces raw random floats and control-character text with values a session would send."""
+    if isinstance(value, dict):
+        return {key: _live_values(item, rng) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_live_values(item, rng) for item in value]
+    if isinstance(value, float):
+        return struct.unpack("<f", struct.pack("<f", rng.uniform(-1000, 1000)))[0]  # Sent as float32
+    if isinstance(value, str) and not value.isprintable():
+        return "DRIVER"
+    return value
+
+
+def sample_record(packet_type, seed=0):
+    """Parses a packet of small random field values for all cars, with live-like floats and text."""
+    packet_class = PACKET_CLASSES[(2022, PACKET_TYPE_IDS[packet_type])]
+    rng = random.Random(seed)
+    data = bytearray(rng.choice((0, 1, 2, 3, 64)) for _ in range(ctypes.sizeof(packet_class)))
+    data[0:2] = (2022).to_bytes(2, "little")
+    packet = packet_class.from_buffer_copy(bytes(data))
+    if packet_type == "sessionHistory":
+        packet.car_idx = 0
+    return _live_values(PARSER_MAPPING[packet_type](None).parse(packet, list(range(22))), rng)
+
+
+def run(output_format="ndjson", number=1000):
+    """Prints microseconds per record, and the speedup over json, for every installed backend."""
+    stdlib = make_encoder(output_format, "json")
+    encoders = {}
+    for serializer in SERIALIZERS:
+        encoder = make_encoder(output_format, serializer)
+        if serializer == "json" or encoder is not stdlib:
+            encoders[serializer] = encoder  # Skip backends that fell back to json
+
+    print(f"{output_format}: microseconds per record, best of 3 x {number}")
+    print(f"{'packet type':22}{'bytes':>8}" + "".join(f"{name:>18}" for name in encoders))
+    for packet_type in PARSER_MAPPING:
+        record = sample_record(packet_type)
+        reference = stdlib(record)
+        row = f"{packet_type:22}{len(reference):8d}"
+        for name, encode in encoders.items():
+            if encode(record) != reference:
+                raise AssertionError(f"{name} output differs from json for {packet_type}.")
+            seconds = min(timeit.repeat(lambda: encode(record), number=number, repeat=3)) / number
+            if name == "json":
+                baseline = seconds
+            row += f"{seconds * 1e6:11.1f} ({baseline / seconds:3.1f}x)"
+        print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare json, orjson and msgspec on parser output.")
+    parser.add_argument("--format", choices=("json", "ndjson"), default="ndjson")
+    parser.add_argument("--number", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.format, args.number)
@@ -0,0 +1,175 @@
+import functools
+import json
+import re
+import structlog
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+# "json" is the stdlib; "orjson" and "msgspec" are optional and fall back to it when missing
+SERIALIZERS = ("json", "orjson", "msgspec")
+
+# Output of orjson/msgspec that differs from `json`: exponents ("1e-7" for "1e-07", "1e16" for
+# "1e+16"), the 1e-05 decade written as decimals ("0.00001" for "1e-05") and NaN/Infinity (null).
+# Each pattern starts with a literal so the scan stays fast on large records.
+_EXPONENT = re.compile(rb"e(?<=\de)-?\d+")
+_SMALL_DECIMAL = re.compile(rb"0\.0000(?<![\d.]0\.0000)\d+")
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?:e[-+]?\d+)?|null')
+# Two spaces that are not indentation, i.e. inside a string
+_STRING_SPACES = re.compile(rb"[^\n ]  ")
+
+# Covers everything the normalization handles; a backend that does not reproduce it is not used
+_PROBE_RECORD = {
+    "timestamp": 1.2e-07,
+    "packet_type": "Probe",
+    "players": {3: {"a": [1, 2.5, 0.00001, 1.5e-05, -0.0], "b": [], "c": {}, "d": 1e16, "e": "A B", "f": 2 ** 64 - 1}},
+}
+
+
+class _Fallback(Exception):
+    """Raised when a record must be encoded by `json` to stay byte-for-byte identical."""
+
+
+def _stdlib_number(text):
+    """Rewrites an exponent ("e-7") or a 1e-05 decade decimal ("0.000015") the way `json` writes it."""
+    if text[0] == 101:  # b"e"
+        sign = b"-" if text[1] == 45 else b"+"
+        return b"e" + sign + text.lstrip(b"e-").zfill(2)
+    digits = text[6:]
+    if digits[0] == 48:  # Below 1e-05, which the backends are not expected to write as decimals
+        raise _Fallback
+    return digits[:1] + (b"." + digits[1:] if len(digits) > 1 else b"") + b"e-05"
+
+
+def _to_stdlib_token(match):
+    token = match.group()
+    if token[0] == 34:  # Strings are kept as they are
+        return token
+    if token == b"null":
+        raise _Fallback  # NaN or Infinity
+    if b"e" in token or token.lstrip(b"-").startswith(b"0.0000"):
+        return repr(float(token)).encode()  # Both are shortest round-trip, so only the notation differs
+    return token
+
+
+def _fix_numbers(output):
+    """
+    Rewrites the numbers `json` writes differently, skipping text inside strings. Strings are
+    told apart by counting quotes, so the output must not contain escapes.
+    """
+    matches = sorted(list(_EXPONENT.finditer(output)) + list(_SMALL_DECIMAL.finditer(output)),
+                     key=lambda match: match.start())
+    pieces = []
+    position = counted = quotes = 0
+    for match in matches:
+        start = match.start()
+        quotes += output.count(b'"', counted, start)
+        counted = start
+        if quotes % 2:
+            continue  # Inside a string
+        pieces += (output[position:start], _stdlib_number(match.group()))
+        position = match.end()
+    pieces.append(output[position:])
+    return b"".join(pieces)
+
+
+def _as_stdlib(output, indented):
+    """
+    Rewrites compact (or 2-space indented) output of a fast encoder into exactly what `json` writes.
+
+    Raises:
+        _Fallback: If the record has non-ASCII text, NaN/Infinity or double spaces inside a string.
+    """
+    if not output.isascii():
+        raise _Fallback  # `json` escapes non-ASCII characters
+    if b"null" in output or b"\\" in output:
+        output = _TOKEN.sub(_to_stdlib_token, output)  # Token by token, slower but exact
+    else:
+        output = _fix_numbers(output)
+    if indented:
+        if _STRING_SPACES.search(output):
+            raise _Fallback
+        output = output.replace(b"  ", b"    ")  # Only indentation is left, so this doubles it
+    return output.decode() + "\n"
+
+
+def _stdlib_encoder(output_format):
+    if output_format == "json":
+        return lambda record: json.dumps(record, indent=4) + "\n"
+    return lambda record: json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def _fast_encoder(dump, output_format):
+    """Wraps a bytes encoder so its output matches `json`, using `json` for records it cannot match."""
+    indented = output_format == "json"
+    fallback = _stdlib_encoder(output_format)
+
+    def encode(record):
+        try:
+            return _as_stdlib(dump(record), indented)
+        except Exception:  # _Fallback, or a value the backend cannot encode
+            return fallback(record)
+
+    return encode
+
+
+def _backend_dump(serializer, output_format):
+    """Returns the raw bytes encoder of an optional backend, or None if it is not installed."""
+    indented = output_format == "json"
+    if serializer == "orjson" and orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indented else 0)
+        return lambda record: orjson.dumps(record, option=option)
+    if serializer == "msgspec" and msgspec is not None:
+        encoder = msgspec.json.Encoder()
+        if indented:
+            return lambda record: msgspec.json.format(encoder.encode(record), indent=2)
+        return encoder.encode
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def make_encoder(output_format="json", serializer="json"):
+    """
+    Returns the record encoder for an output format and serializer backend.
+
+    Every backend writes byte-for-byte what `json` writes, with the same field order. A
+    backend that is not installed, or that fails the startup check against `json`, is
+    replaced by `json` with a warning.
+
+    Args:
+        output_format (str): "json" (indent=4) or "ndjson" (compact, one record per line).
+        serializer (str): One of `SERIALIZERS`.
+
+    Returns:
+        function: encode(record) -> str, including the trailing newline.
+    """
+    if serializer not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer {serializer}, expected one of {SERIALIZERS}.")
+
+    if serializer == "json":
+        return _stdlib_encoder(output_format)
+
+    stdlib = make_encoder(output_format, "json")  # The cached instance, so fallbacks are recognizable
+    dump = _backend_dump(serializer, output_format)
+    if dump is None:
+        log.warning(f"{serializer} is not installed, serializing with json.")
+        return stdlib
+
+    try:
+        matches = _as_stdlib(dump(_PROBE_RECORD), output_format == "json") == stdlib(_PROBE_RECORD)
+    except Exception:
+        matches = False
+    if not matches:
+        log.warning(f"{serializer} output does not match json, serializing with json.")
+        return stdlib
+    return _fast_encoder(dump, output_format)
@@ -0,0 +1,368 @@
+import ctypes
+import gzip
+import math
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+import structlog
+from decoders.registry import HEADER_LAYOUTS, PACKET_CLASSES
+from recordWriter.columnar_writer import COLUMNAR_FORMATS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+# `writer_options` keys meant for `SessionWriter` rather than the per-segment writers
+SESSION_OPTIONS = ("output_dir", "partition_sessions", "rotate_bytes", "rotate_laps", "compress_segments",
+                   "session_clock")
+
+# Compression of finished segments -> file suffix
+SEGMENT_COMPRESSION = {"gzip": ".gz", "zstd": ".zst"}
+
+_LAP_DATA_ID = 2
+_MAX_LAPS = 256  # current_lap_num is a uint8
+
+
+class SessionClock:
+    """
+    Session time at which each lap of the player started, read from Lap Data datagrams by the
+    receiver and shared with every writer, including those in parser processes.
+
+    Writers compare the timestamps of their own records with the lap starts, so segments are
+    cut on lap boundaries whichever packet types are written, and however far behind the
+    receiver a writer's queue is. The lap starts of the last `sessions` sessions are kept for
+    writers still finishing an earlier session.
+    """
+
+    def __init__(self, sessions=4):
+        """
+        Args:
+            sessions (int): Sessions whose lap starts are kept.
+        """
+        # Each value is written by the receiver thread only, and read without a lock
+        self.row = multiprocessing.Value("B", 0, lock=False)  # Row of the current session
+        self.session_uids = multiprocessing.Array("Q", sessions, lock=False)
+        self.laps = multiprocessing.Array("B", sessions, lock=False)  # Current lap per session
+        self.lap_starts = multiprocessing.Array("d", [math.inf] * (sessions * _MAX_LAPS), lock=False)
+
+        # packet_format -> (packet_id offset, header struct, player_car_index offset,
+        #                   lap_data offset, LapData size, current_lap_num offset, packet size)
+        self.layouts = {}
+        for packet_format, (id_offset, header, _) in HEADER_LAYOUTS.items():
+            packet_class = PACKET_CLASSES.get((packet_format, _LAP_DATA_ID))
+            if packet_class is None:
+                continue
+            header_type = dict(packet_class._fields_)["header"]
+            lap_type = dict(packet_class._fields_)["lap_data"]._type_
+            self.layouts[packet_format] = (id_offset, header,
+                                           packet_class.header.offset + header_type.player_car_index.offset,
+                                           packet_class.lap_data.offset, ctypes.sizeof(lap_type),
+                                           lap_type.current_lap_num.offset, ctypes.sizeof(packet_class))
+
+    def observe(self, data):
+        """
+        Records a lap start if the datagram is Lap Data showing the player on a new lap; other
+        packets are ignored.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+        """
+        layout = self.layouts.get(data[0] | data[1] << 8)
+        if layout is None:
+            return
+        id_offset, header, player_offset, lap_data, stride, lap_offset, size = layout
+        if len(data) < size or data[id_offset] != _LAP_DATA_ID or data[player_offset] >= 22:
+            return  # Another packet, or a spectator without a car
+
+        lap = data[lap_data + stride * data[player_offset] + lap_offset]
+        _, session_uid, session_time, _ = header.unpack_from(data)
+        row = self.row.value
+        if session_uid != self.session_uids[row]:  # New session: reuse the oldest row
+            row = (row + 1) % len(self.session_uids)
+            self.lap_starts[row * _MAX_LAPS:(row + 1) * _MAX_LAPS] = [math.inf] * _MAX_LAPS
+            self.laps[row] = 0
+            self.session_uids[row] = session_uid
+            self.row.value = row
+        if lap != self.laps[row]:  # Also after a flashback to an earlier lap
+            self.lap_starts[row * _MAX_LAPS + lap] = session_time
+            self.laps[row] = lap
+
+    def _row(self, session_uid):
+        for row, row_session in enumerate(self.session_uids):
+            if row_session == session_uid:
+                return row
+        return None
+
+    def lap_at(self, session_uid, timestamp):
+        """
+        Returns:
+            int: The player's lap at `timestamp` in the session, or None if the session is unknown.
+        """
+        row = self._row(session_uid)
+        if row is None:
+            return None
+        for lap in range(self.laps[row], 0, -1):
+            if self.lap_starts[row * _MAX_LAPS + lap] <= timestamp:
+                return lap
+        return 0
+
+    def lap_start(self, session_uid, lap):
+        """
+        Returns:
+            float: Session time at which `lap` started, or inf if it has not started in the session.
+        """
+        row = self._row(session_uid)
+        if row is None or lap >= _MAX_LAPS:
+            return math.inf
+        return self.lap_starts[row * _MAX_LAPS + lap]
+
+
+class SegmentCompressor:
+    """
+    Background thread compressing finished segment files, so the listener never waits on it.
+
+    Each file is streamed to `<file>.gz` or `<file>.zst` and removed once its copy is complete.
+    """
+
+    def __init__(self, method="gzip", level=None):
+        """
+        Args:
+            method (str): "gzip" or "zstd" (requires `zstandard`), see `SEGMENT_COMPRESSION`.
+            level (int, optional): Compression level. Defaults to the library's default.
+
+        Raises:
+            ImportError: If "zstd" is requested and zstandard is not installed.
+        """
+        if method not in SEGMENT_COMPRESSION:
+            raise ValueError(f"Unknown segment compression {method}, expected one of {tuple(SEGMENT_COMPRESSION)}.")
+        if method == "zstd" and zstandard is None:
+            raise ImportError("zstd segment compression requires zstandard (pip install zstandard).")
+
+        self.method = method
+        self.level = level
+        self.files = queue.Queue()
+        self.compressed = 0
+        self.thread = threading.Thread(target=self._run, name=f"compress-{method}", daemon=True)
+        self.thread.start()
+
+    def submit(self, file_name):
+        """Queues a finished file for compression."""
+        self.files.put(file_name)
+
+    def _run(self):
+        while True:
+            file_name = self.files.get()
+            if file_name is None:
+                break
+            try:
+                self._compress(file_name)
+            except Exception as e:
+                log.error(f"Error compressing {file_name}: {e}")
+
+    def _compress(self, file_name):
+        target_name = file_name + SEGMENT_COMPRESSION[self.method]
+        with open(file_name, "rb") as source:
+            if self.method == "gzip":
+                with gzip.open(target_name, "wb", compresslevel=9 if self.level is None else self.level) as target:
+                    shutil.copyfileobj(source, target, 1024 * 1024)
+            else:
+                compressor = zstandard.ZstdCompressor(level=3 if self.level is None else self.level)
+                with open(target_name, "wb") as target:
+                    compressor.copy_stream(source, target)
+        os.remove(file_name)
+        self.compressed += 1
+        log.debug(f"Compressed {file_name}", method=self.method)
+
+    def close(self):
+        """Waits for every queued file to be compressed."""
+        self.files.put(None)
+        self.thread.join()
+
+
+def _timestamp(record):
+    """Session time of a record; event records carry it in their header."""
+    if "timestamp" in record:
+        return record["timestamp"]
+    return record.get("header", {}).get("session_time")
+
+
+class SessionWriter:
+    """
+    Writer that splits one packet type's records into per-session directories and bounded segments.
+
+    A new segment is started whenever the game's `session_uid` changes, e.g. from qualifying
+    to the race or on a restart, and with `partition_sessions` (the default) each session's
+    segments go to `<output_dir>/session_<session_uid>/`. Within a session, a segment is also
+    rotated once its files reach `rotate_bytes`, or every `rotate_laps` laps of the player
+    (see `SessionClock`). Each
+    segment is a complete file opened with `open_writer`, named `<packet_type>_<date>_<n>`,
+    so it can be loaded on its own. Finished text segments are compressed by a
+    `SegmentCompressor` if `compress_segments` is set; columnar segments are compressed internally.
+
+    `write()` takes the session_uid of the records it is given; pipelines group records by it.
+    """
+
+    partitioned = True
+
+    def __init__(self, open_segment, packet_type, session_date, output_dir="", partition_sessions=True,
+                 rotate_bytes=None, rotate_laps=None, compress_segments=None, session_clock=None):
+        """
+        Args:
+            open_segment (callable): (session_date, directory) -> writer of one segment, see `open_writer`.
+            packet_type (str): The type of telemetry packet.
+            session_date (str): Unique timestamp for file naming.
+            output_dir (str): Directory the session directories, or the segments, are created in.
+                Defaults to the working directory.
+            partition_sessions (bool): One directory and a new segment per `session_uid`.
+            rotate_bytes (int, optional): Segment size in bytes after which a new segment is started;
+                checked before each write, so a segment can exceed it by one batch.
+            rotate_laps (int, optional): Player laps per segment; requires `session_clock`.
+            compress_segments (str, optional): "gzip" or "zstd" to compress finished text segments.
+            session_clock (SessionClock, optional): The player's lap starts, fed by the receiver.
+        """
+        if rotate_laps and session_clock is None:
+            raise ValueError("rotate_laps requires a SessionClock fed with the received datagrams.")
+
+        self.open_segment = open_segment
+        self.packet_type = packet_type
+        self.session_date = session_date
+        self.output_dir = output_dir
+        self.partition_sessions = partition_sessions
+        self.rotate_bytes = rotate_bytes
+        self.rotate_laps = rotate_laps
+        self.session_clock = session_clock
+        self.compressor = SegmentCompressor(compress_segments) if compress_segments else None
+
+        self.writer = None
+        self.segment_files = []
+        self.segment_writers = []
+        self.segment_base_bytes = 0  # Bytes the segment files held when they were opened
+        self.session_uid = None
+        self.segment = -1
+        self.segment_lap = None  # The player's lap when the segment started, for `rotate_laps`
+        self.segments = 0
+
+        directory = os.path.join(output_dir, "session_<session_uid>") if partition_sessions else output_dir
+        self.file_name = os.path.join(directory, f"{packet_type}_{session_date}_<segment>")
+
+    def _directory(self, session_uid):
+        if self.partition_sessions and session_uid is not None:
+            return os.path.join(self.output_dir, f"session_{session_uid}")
+        return self.output_dir
+
+    def _rotation_due(self, session_uid, timestamp):
+        if self.writer is None:
+            return True
+        if session_uid is not None and session_uid != self.session_uid:
+            return True
+        if self.rotate_laps and timestamp is not None:
+            if self.segment_lap is None:  # The clock had not reached this session when the segment started
+                self.segment_lap = self.session_clock.lap_at(self.session_uid, timestamp)
+            elif timestamp >= self.session_clock.lap_start(self.session_uid, self.segment_lap + self.rotate_laps):
+                return True
+        if self.rotate_bytes and self._segment_bytes() >= self.rotate_bytes:
+            return True
+        return False
+
+    def _segment_bytes(self):
+        """
+        Returns:
+            int: Size of the current segment: the bytes its files held when opened, plus what
+                the writers have written or buffered since, from their running counters.
+        """
+        size = self.segment_base_bytes
+        for writer in self.segment_writers:
+            size += getattr(writer, "bytes", 0) + getattr(writer, "buffered_bytes", 0)
+        return size
+
+    def _lap_split(self, records):
+        """Returns the index of the first record past the segment's last lap, or None."""
+        if not self.rotate_laps or self.segment_lap is None:
+            return None
+        boundary = self.session_clock.lap_start(self.session_uid, self.segment_lap + self.rotate_laps)
+        if boundary == math.inf:
+            return None
+        for idx, record in enumerate(records):
+            if idx and record and (_timestamp(record) or 0) >= boundary:
+                return idx
+        return None
+
+    def _rotate(self, session_uid, timestamp):
+        """Closes the current segment and opens the next one."""
+        self._close_segment()
+        if self.partition_sessions and session_uid is not None and session_uid != self.session_uid:
+            self.segment = 0  # Segments are numbered per session directory
+        else:
+            self.segment += 1
+        if session_uid is not None:
+            self.session_uid = session_uid
+        if self.rotate_laps:
+            self.segment_lap = None if timestamp is None else self.session_clock.lap_at(self.session_uid, timestamp)
+
+        self.writer = self.open_segment(f"{self.session_date}_{self.segment:03d}", self._directory(self.session_uid))
+        self.segment_writers = getattr(self.writer, "writers", [self.writer])
+        self.segment_files = [writer.file_name for writer in self.segment_writers]
+        if self.rotate_bytes:  # Text segments are appended to, so count what a restart left behind
+            self.segment_base_bytes = sum(os.path.getsize(name) for name in self.segment_files if os.path.exists(name))
+        self.segments += 1
+        log.info(f"Writing {self.packet_type} to {self.writer.file_name}", session_uid=self.session_uid,
+                 lap=self.segment_lap)
+
+    def _close_segment(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        if self.compressor:
+            for file_name in self.segment_files:
+                if os.path.splitext(file_name)[1][1:] not in COLUMNAR_FORMATS and os.path.exists(file_name):
+                    self.compressor.submit(file_name)
+        self.writer = None
+
+    def write(self, records, session_uid=None):
+        """
+        Writes records of one session, first rotating the segment if it is due.
+
+        Args:
+            records (list): Parsed records; an empty list only checks the flush policy.
+            session_uid (int, optional): The session the records belong to; None keeps the current one.
+        """
+        timestamp = next((_timestamp(record) for record in records if record), None)
+        if timestamp is None and not any(records):
+            if self.writer is not None:
+                self.writer.write(records)
+            return
+        if self._rotation_due(session_uid, timestamp):
+            self._rotate(session_uid, timestamp)
+
+        split = self._lap_split(records)
+        if split is None:
+            self.writer.write(records)
+        else:  # The batch crosses into the next segment's first lap
+            self.writer.write(records[:split])
+            self.write(records[split:], session_uid)
+
+    def time_to_flush(self):
+        return self.writer.time_to_flush() if self.writer else None
+
+    def flush(self):
+        if self.writer:
+            self.writer.flush()
+
+    def close(self):
+        """Closes the last segment and waits for the segments still being compressed."""
+        self._close_segment()
+        if self.compressor:
+            self.compressor.close()
+        log.debug(f"Closed {self.file_name}", segments=self.segments,
+                  compressed=self.compressor.compressed if self.compressor else 0)
+
+
+def session_clock_for(writer_options):
+    """Returns a `SessionClock` for the receiver to feed if the writer options rotate on laps, else None."""
+    return SessionClock() if (writer_options or {}).get("rotate_laps") else None
@@ -0,0 +1,226 @@
+import argparse
+import collections
+import os
+import signal
+import socket
+import threading
+import structlog
+from ingest.batched_udp_source import BatchedUdpSource, PACKET_NAMES
+from decoders.registry import packet_id_of
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+PACKET_IDS = {name: packet_id for packet_id, name in PACKET_NAMES.items()}
+DROP_POLICIES = ("drop_oldest", "drop_newest")
+
+
+class RelayConsumer:
+    """
+    One downstream consumer of the relay, with its own packet filter, queue and sender thread.
+
+    Datagrams are queued without blocking the relay; when the queue is full the drop policy
+    decides whether the oldest queued or the newest datagram is discarded, so a slow consumer
+    only ever loses its own packets.
+    """
+
+    def __init__(self, target, packet_types=None, transport="udp", queue_size=1024,
+                 drop_policy="drop_oldest", name=None):
+        """
+        Args:
+            target (tuple | str): (host, port) for "udp", a socket path for "unix".
+            packet_types (list, optional): Packet types to forward. Defaults to all.
+            transport (str): "udp" for loopback UDP or "unix" for a Unix datagram socket.
+            queue_size (int): Datagrams buffered before the drop policy applies.
+            drop_policy (str): "drop_oldest" or "drop_newest".
+            name (str, optional): Name used in logs. Defaults to the target.
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {drop_policy}, expected one of {DROP_POLICIES}.")
+        if transport == "unix" and not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Unix sockets are not supported on this platform.")
+        if transport not in ("udp", "unix"):
+            raise ValueError(f"Unknown transport {transport}, expected 'udp' or 'unix'.")
+
+        self.target = target
+        self.transport = transport
+        self.name = name or str(target)
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.packet_ids = None if packet_types is None else {PACKET_IDS[packet_type] for packet_type in packet_types}
+
+        self.queue = collections.deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+
+        family = socket.AF_UNIX if transport == "unix" else socket.AF_INET
+        self.socket = socket.socket(family=family, type=socket.SOCK_DGRAM)
+        self.thread = threading.Thread(target=self._send_loop, daemon=True, name=f"relay-{self.name}")
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+
+    def offer(self, datagrams):
+        """
+        Queues datagrams for sending without blocking on the consumer.
+
+        Args:
+            datagrams (list): Raw datagrams that passed this consumer's filter.
+        """
+        with self.condition:
+            for data in datagrams:
+                if len(self.queue) >= self.queue_size:
+                    self.dropped += 1
+                    if self.drop_policy == "drop_newest":
+                        continue
+                    self.queue.popleft()
+                self.queue.append(data)
+            self.condition.notify()
+
+    def _send_loop(self):
+        while True:
+            with self.condition:
+                while not self.queue and self.running:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                batch = list(self.queue)
+                self.queue.clear()
+
+            for data in batch:
+                try:
+                    self.socket.sendto(data, self.target)
+                    self.sent += 1
+                except OSError:
+                    self.errors += 1  # Consumer not listening (yet)
+
+    def close(self, timeout=1.0):
+        """Stops the sender after it has flushed what is queued, then closes the socket."""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+        self.socket.close()
+
+    def report(self):
+        return {"sent": self.sent, "dropped": self.dropped, "errors": self.errors, "queued": len(self.queue)}
+
+
+class UdpFanOutRelay:
+    """Owns the game's telemetry socket and republishes every datagram to N local consumers."""
+
+    def __init__(self, consumers, host='127.0.0.1', port=20777, recv_buffer_size=8 * 1024 * 1024):
+        """
+        Args:
+            consumers (list): `RelayConsumer` instances to publish to.
+            host (str): Host the game sends telemetry to.
+            port (int): Port the game sends telemetry to.
+            recv_buffer_size (int): Kernel receive buffer requested for the game socket.
+        """
+        self.consumers = consumers
+        self.source = BatchedUdpSource(host=host, port=port, recv_buffer_size=recv_buffer_size)
+        self.shutdown_event = threading.Event()
+
+        # packet_id -> consumers subscribed to it
+        self.routes = [
+            [consumer for consumer in consumers if consumer.packet_ids is None or packet_id in consumer.packet_ids]
+            for packet_id in range(256)
+        ]
+
+    def run(self):
+        """Relays datagrams until `stop()` is called."""
+        for consumer in self.consumers:
+            consumer.start()
+        log.info(f"Relaying {self.source.host}:{self.source.port} to {[c.name for c in self.consumers]}")
+
+        try:
+            while not self.shutdown_event.is_set():
+                outgoing = collections.defaultdict(list)
+                for data in self.source.recv_batch():
+                    packet_id = packet_id_of(data)
+                    if packet_id is None:
+                        continue
+                    for consumer in self.routes[packet_id]:
+                        outgoing[consumer].append(data)
+
+                for consumer, datagrams in outgoing.items():
+                    consumer.offer(datagrams)
+        finally:
+            self.close()
+
+    def stop(self, signum=None, frame=None):
+        self.shutdown_event.set()
+
+    def close(self):
+        for consumer in self.consumers:
+            consumer.close()
+            log.info(f"Relay consumer {consumer.name}", **consumer.report())
+        self.source.close()
+
+
+class UnixRelaySource:
+    """Receives relayed datagrams on a Unix datagram socket; usable as a `MainTelemetryListener` source."""
+
+    def __init__(self, path, recv_buffer_size=8 * 1024 * 1024, timeout=0.5):
+        """
+        Args:
+            path (str): Socket path the relay publishes to. A stale socket file is replaced.
+            recv_buffer_size (int): Kernel receive buffer requested for the socket.
+            timeout (float): Seconds `recv_batch()` waits before returning empty.
+        """
+        self.path = path
+        if os.path.exists(path):
+            os.unlink(path)
+        self.socket = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer_size)
+        self.socket.bind(path)
+        self.socket.settimeout(timeout)
+
+    def recv_batch(self):
+        try:
+            return [self.socket.recv(2048)]
+        except socket.timeout:
+            return []
+
+    def close(self):
+        self.socket.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def _parse_consumer(spec, transport, drop_policy, queue_size):
+    """Parses `target[=type,type...]`, where target is host:port for UDP or a path for Unix sockets."""
+    target, _, packet_types = spec.partition("=")
+    if transport == "udp":
+        host, _, port = target.rpartition(":")
+        target = (host or "127.0.0.1", int(port))
+    return RelayConsumer(target, packet_types.split(",") if packet_types else None, transport=transport,
+                         queue_size=queue_size, drop_policy=drop_policy, name=spec)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fan F1 22 telemetry out from one socket to several consumers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=20777)
+    parser.add_argument("--udp", action="append", default=[], metavar="HOST:PORT[=TYPES]",
+                        help="Loopback UDP consumer, optionally limited to comma-separated packet types.")
+    parser.add_argument("--unix", action="append", default=[], metavar="PATH[=TYPES]",
+                        help="Unix datagram socket consumer, optionally limited to packet types.")
+    parser.add_argument("--queue-size", type=int, default=1024)
+    parser.add_argument("--drop-policy", choices=DROP_POLICIES, default="drop_oldest")
+    args = parser.parse_args()
+
+    consumers = [_parse_consumer(spec, "udp", args.drop_policy, args.queue_size) for spec in args.udp]
+    consumers += [_parse_consumer(spec, "unix", args.drop_policy, args.queue_size) for spec in args.unix]
+    if not consumers:
+        parser.error("At least one --udp or --unix consumer is required.")
+
+    relay = UdpFanOutRelay(consumers, host=args.host, port=args.port)
+    signal.signal(signal.SIGINT, relay.stop)
+    signal.signal(signal.SIGTERM, relay.stop)
+    relay.run()
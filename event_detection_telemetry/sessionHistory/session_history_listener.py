@@ -1,95 +1,144 @@
-import json
-import structlog
-from f1_22_telemetry.packets import PacketSessionHistoryData
+import threading
+from parserEngine.table_parser import TableParser, Nested
 
-# Initialize structured logging
-log = structlog.get_logger()
+LAP_FIELDS = [
+    "lap_time_in_ms",
+    "sector1_time_in_ms",
+    "sector2_time_in_ms",
+    "sector3_time_in_ms",
+    "lap_valid_bit_flags",
+]
+STINT_FIELDS = [
+    "end_lap",
+    "tyre_actual_compound",
+    "tyre_visual_compound",
+]
+SUMMARY_FIELDS = [
+    "best_lap_time_lap_num",
+    "best_sector1_lap_num",
+    "best_sector2_lap_num",
+    "best_sector3_lap_num",
+    "num_laps",
+    "num_tyre_stints",
+]
 
-class SessionHistoryParser:
-    """Handles parsing and storing F1 22 Session History Data."""
 
-    def __init__(self, file_handle):
-        """
-        Initializes the SessionHistoryParser.
+def _without(entry, key):
+    return {name: value for name, value in entry.items() if name != key}
+
+
+class SessionHistoryParser(TableParser):
+    """
+    Handles parsing and storing F1 22 Session History Data.
+
+    By default every record holds a car's complete lap and stint history. With `incremental`,
+    the parser remembers per car what it already emitted and a record holds only the laps
+    and stints that are new or changed (including the sector times of the lap in progress),
+    each numbered by `lap_num`/`stint_num`, so output grows linearly with race length. Entries
+    past `num_laps`/`num_tyre_stints` are void, e.g. after a flashback. `snapshot()` returns
+    the full history as the default mode would write it.
+    """
+
+    packet_id = 11
+    packet_type = "SessionHistory"
+    label = "Session History Data"
+    car_index_field = "car_idx"  # Each packet describes one car
+    skip_empty = True
+    fields = SUMMARY_FIELDS + [
+        ("lap_history", "lap_history_data", Nested(LAP_FIELDS, keep="lap_time_in_ms")),  # Remove empty lap data
+        ("tyre_stints", "tyre_stints_history_data", Nested(STINT_FIELDS, keep="end_lap")),  # Remove empty stints
+    ]
+    # Incremental mode reads every lap up to num_laps, including the lap in progress
+    incremental_fields = SUMMARY_FIELDS + [
+        ("lap_history", "lap_history_data", Nested(LAP_FIELDS, count="num_laps", index="lap_num")),
+        ("tyre_stints", "tyre_stints_history_data", Nested(STINT_FIELDS, count="num_tyre_stints", index="stint_num")),
+    ]
 
+    def __init__(self, writer, incremental=False):
+        """
         Args:
-            file_handle (file object): Open file handle to write parsed data.
+            writer (RecordWriter): Output used by `save_to_file`; None if records are only returned.
+            incremental (bool): Emit only new and changed laps and stints, see the class docstring.
         """
-        self.file_handle = file_handle
+        self.incremental = incremental
+        if incremental:
+            self.fields = self.incremental_fields
+        super().__init__(writer)
+        self.history = {}  # car index -> {"timestamp", "summary", "laps": {lap_num: lap}, "stints": {stint_num: stint}}
+        self.lock = threading.Lock()  # `snapshot()` may be called from another thread
 
-    def parse(self, packet: PacketSessionHistoryData, player_indexes=None) -> dict:
+    def parse(self, packet, player_indexes=None) -> dict:
         """
-        Parses the Session History packet and extracts data for specified player indexes.
-
-        Args:
-            packet (PacketSessionHistoryData): The raw session history telemetry packet.
-            player_indexes (list, optional): List of player indexes to extract data for. Defaults to None (human player only).
+        Parses a Session History packet; in incremental mode, only what changed since the car's last record.
 
         Returns:
-            dict: Parsed JSON data containing only the specified player indexes.
+            dict: Parsed JSON data for the packet's car, or None if it was not requested or,
+                in incremental mode, nothing changed.
         """
-        if player_indexes is None:
-            player_indexes = [packet.header.player_car_index]  # Default to human player only
-
-        parsed_data = {
-            "timestamp": packet.header.session_time,
-            "packet_type": "SessionHistory",
-            "players": {}
-        }
-
-        for idx in player_indexes:
-            if idx == packet.car_idx:  # Only process the current packet if it belongs to a requested player
-                parsed_data["players"][idx] = {
-                    "best_lap_time_lap_num": packet.best_lap_time_lap_num,
-                    "best_sector1_lap_num": packet.best_sector1_lap_num,
-                    "best_sector2_lap_num": packet.best_sector2_lap_num,
-                    "best_sector3_lap_num": packet.best_sector3_lap_num,
-                    "num_laps": packet.num_laps,
-                    "num_tyre_stints": packet.num_tyre_stints,
-                    "lap_history": [
-                        {
-                            "lap_time_in_ms": lap.lap_time_in_ms,
-                            "sector1_time_in_ms": lap.sector1_time_in_ms,
-                            "sector2_time_in_ms": lap.sector2_time_in_ms,
-                            "sector3_time_in_ms": lap.sector3_time_in_ms,
-                            "lap_valid_bit_flags": lap.lap_valid_bit_flags
-                        }
-                        for lap in packet.lap_history_data if lap.lap_time_in_ms > 0  # Remove empty lap data
-                    ],
-                    "tyre_stints": [
-                        {
-                            "end_lap": stint.end_lap,
-                            "tyre_actual_compound": stint.tyre_actual_compound,
-                            "tyre_visual_compound": stint.tyre_visual_compound
-                        }
-                        for stint in packet.tyre_stints_history_data if stint.end_lap > 0  # Remove empty stints
-                    ]
-                }
+        parsed_data = super().parse(packet, player_indexes)
+        if not self.incremental or parsed_data is None:
+            return parsed_data
 
-        return parsed_data if parsed_data["players"] else None  # Return None if no valid player data
+        with self.lock:
+            players = {}
+            for car_idx, car in parsed_data["players"].items():
+                update = self._update(car_idx, parsed_data["timestamp"], car)
+                if update:
+                    players[car_idx] = update
+        if not players:
+            return None
+        parsed_data["players"] = players
+        return parsed_data
 
-    def save_to_file(self, data: dict):
+    def _update(self, car_idx, timestamp, car):
+        """Merges a car's history into the state and returns what changed, or None."""
+        state = self.history.get(car_idx)
+        if state is None or timestamp < state["timestamp"]:  # First packet, or a new session
+            state = self.history[car_idx] = {"timestamp": timestamp, "summary": None, "laps": {}, "stints": {}}
+        state["timestamp"] = timestamp
+
+        summary = {name: value for name, value in car.items() if name not in ("lap_history", "tyre_stints")}
+        new_laps = self._merge(state["laps"], car["lap_history"], "lap_num")
+        new_stints = self._merge(state["stints"], car["tyre_stints"], "stint_num")
+        if not new_laps and not new_stints and summary == state["summary"]:
+            return None
+
+        state["summary"] = summary
+        return {**summary, "lap_history": new_laps, "tyre_stints": new_stints}
+
+    @staticmethod
+    def _merge(known, entries, number_key):
+        """Stores the entries that differ from `known`, keyed by their number, and returns them."""
+        changed = []
+        for entry in entries:
+            if known.get(entry[number_key]) != entry:
+                known[entry[number_key]] = entry
+                changed.append(entry)
+        for number in [number for number in known if number > len(entries)]:
+            del known[number]  # Dropped by a flashback
+        return changed
+
+    def snapshot(self, car_idx=None):
         """
-        Writes parsed data to an **open** file handle.
+        Returns the full history seen so far, in the layout of a default-mode record.
 
         Args:
-            data (dict): The parsed session history telemetry data to be saved.
-        """
-        try:
-            if data:
-                json.dump(data, self.file_handle, indent=4)  # Proper JSON formatting
-                self.file_handle.write("\n")  # Ensure each entry is on a new line
-                self.file_handle.flush()  # Flush immediately for real-time updates
-                log.info("Session History Data successfully written to file.")
-        except Exception as e:
-            log.error(f"Failed to write Session History Data: {e}")
-
-    def close_file(self):
-        """
-        Closes the file handle to ensure proper saving.
+            car_idx (int, optional): A single car. Defaults to every car seen.
+
+        Returns:
+            dict: The car's summary fields with complete `lap_history` and `tyre_stints` (None
+                for an unknown car), or car index -> that dict for every car.
         """
-        try:
-            self.file_handle.close()
-            log.info("Session History Data file handle successfully closed.")
-        except Exception as e:
-            log.error(f"Error closing Session History Data file: {e}")
+        with self.lock:
+            cars = {
+                idx: {
+                    **state["summary"],
+                    "lap_history": [_without(lap, "lap_num") for _, lap in sorted(state["laps"].items())
+                                    if lap["lap_time_in_ms"]],
+                    "tyre_stints": [_without(stint, "stint_num") for _, stint in sorted(state["stints"].items())
+                                    if stint["end_lap"]],
+                }
+                for idx, state in self.history.items()
+                if car_idx is None or idx == car_idx
+            }
+        return cars if car_idx is None else cars.get(car_idx)
@@ -0,0 +1,318 @@
+import multiprocessing
+import struct
+import time
+from multiprocessing import shared_memory
+import structlog
+from dispatch.packet_dispatcher import PacketDispatcher, PACKET_TYPE_IDS
+from decoders.registry import packet_id_of
+from listener import PARSER_MAPPING
+from recordWriter.record_writer import open_writer
+from changeFilter.change_filter import change_filter_for
+
+# Initialize structured logging
+log = structlog.get_logger()
+
+# write_sequence, slot_count, slot_size
+_RING_HEADER = struct.Struct("<QII")
+# stamp, length, packet_id
+_SLOT_HEADER = struct.Struct("<QHB5x")
+_STAMP = struct.Struct("<Q")
+_SLOT_INFO = struct.Struct("<HB")
+
+
+class SharedPacketRing:
+    """
+    Single-producer ring of raw datagrams in shared memory, readable by any number of processes.
+
+    Every slot carries a seqlock stamp: odd while the producer is writing sequence `n`
+    (`2n + 1`), even once it is complete (`2n + 2`). Readers never take a lock; they compare
+    the stamp before and after copying a slot, and a changed stamp means the producer lapped
+    them and the datagram is counted as overrun instead of being returned torn.
+    """
+
+    def __init__(self, slot_count=4096, slot_size=2048, name=None):
+        """
+        Creates a new ring, or attaches to an existing one when `name` is given.
+
+        Args:
+            slot_count (int): Number of datagrams the ring holds before the oldest is overwritten.
+            slot_size (int): Largest datagram in bytes that fits in a slot.
+            name (str, optional): Shared memory block to attach to; its layout is read from the ring header.
+        """
+        if name is None:
+            size = _RING_HEADER.size + slot_count * (_SLOT_HEADER.size + slot_size)
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+            _RING_HEADER.pack_into(self.memory.buf, 0, 0, slot_count, slot_size)
+            self.owner = True
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            _, slot_count, slot_size = _RING_HEADER.unpack_from(self.memory.buf, 0)
+            self.owner = False
+
+        self.name = self.memory.name
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.slot_stride = _SLOT_HEADER.size + slot_size
+        self.write_sequence = self.head()
+        self.oversized = 0
+
+    def _slot_offset(self, sequence):
+        return _RING_HEADER.size + (sequence % self.slot_count) * self.slot_stride
+
+    def head(self):
+        """Returns the number of datagrams written so far."""
+        return _STAMP.unpack_from(self.memory.buf, 0)[0]
+
+    def write(self, data, packet_id):
+        """
+        Appends one datagram, overwriting the oldest slot. Only one process may write.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+            packet_id (int): Its packet id, stored in the slot so readers can filter without copying.
+
+        Returns:
+            bool: False if the datagram is larger than a slot and was not written.
+        """
+        if len(data) > self.slot_size:
+            self.oversized += 1
+            return False
+
+        buf = self.memory.buf
+        sequence = self.write_sequence
+        offset = self._slot_offset(sequence)
+        payload = offset + _SLOT_HEADER.size
+
+        _STAMP.pack_into(buf, offset, 2 * sequence + 1)
+        _SLOT_INFO.pack_into(buf, offset + _STAMP.size, len(data), packet_id)
+        buf[payload:payload + len(data)] = data
+        _STAMP.pack_into(buf, offset, 2 * sequence + 2)
+
+        self.write_sequence = sequence + 1
+        _STAMP.pack_into(buf, 0, self.write_sequence)  # Publish only after the slot is complete
+        return True
+
+    def close(self):
+        self.memory.close()
+
+    def unlink(self):
+        """Frees the shared memory block; called once by the creating process."""
+        if self.owner:
+            self.memory.unlink()
+
+
+class RingReader:
+    """
+    One consumer's cursor over a `SharedPacketRing`, optionally filtered by packet id.
+
+    `overrun` counts ring datagrams of any packet type that were overwritten before this
+    reader reached them, since a lapped slot no longer says what it held.
+    """
+
+    def __init__(self, ring, packet_ids=None, start=None):
+        """
+        Args:
+            ring (SharedPacketRing): The ring to read.
+            packet_ids (set, optional): Packet ids to return; others are skipped without copying.
+            start (int, optional): Sequence to start from. Defaults to the current head (new datagrams only).
+        """
+        self.ring = ring
+        self.packet_ids = packet_ids
+        self.cursor = ring.head() if start is None else start
+        self.read = 0
+        self.overrun = 0
+
+    def read_batch(self, max_items=256):
+        """
+        Copies out the next datagrams written since the last call.
+
+        Args:
+            max_items (int): Maximum datagrams returned per call.
+
+        Returns:
+            list: Raw datagrams of the subscribed packet ids, in write order.
+        """
+        ring = self.ring
+        buf = ring.memory.buf
+        head = ring.head()
+
+        if head - self.cursor > ring.slot_count:
+            # Lapped by the producer: everything older than one ring length is gone
+            self.overrun += head - self.cursor - ring.slot_count
+            self.cursor = head - ring.slot_count
+
+        batch = []
+        while self.cursor < head and len(batch) < max_items:
+            offset = ring._slot_offset(self.cursor)
+            expected = 2 * self.cursor + 2
+            stamp = _STAMP.unpack_from(buf, offset)[0]
+            if stamp < expected:
+                break  # Not visible yet, retry on the next call
+            if stamp != expected:
+                self.overrun += 1
+                self.cursor += 1
+                continue
+
+            length, packet_id = _SLOT_INFO.unpack_from(buf, offset + _STAMP.size)
+            if self.packet_ids is None or packet_id in self.packet_ids:
+                payload = offset + _SLOT_HEADER.size
+                data = bytes(buf[payload:payload + length])
+                if _STAMP.unpack_from(buf, offset)[0] == expected:
+                    batch.append(data)
+                    self.read += 1
+                else:
+                    self.overrun += 1  # Overwritten while copying
+
+            self.cursor += 1
+
+        return batch
+
+
+def _write(writer, packet_type, records, session_uid):
+    try:
+        if session_uid is None:
+            writer.write(records)
+        else:
+            writer.write(records, session_uid)
+    except Exception as e:
+        log.error(f"Error writing {packet_type}: {e}")
+
+
+def _run_parser(ring_name, packet_type, player_indexes, session_date, decoder, stop_event, wakeup, idle_timeout,
+                output_format, writer_options, dedupe, parser_options):
+    """
+    Parser process: reads one packet type from the ring and writes it like a `Listener` thread.
+
+    The dispatcher releases `wakeup` once per datagram it writes for this process, so an idle
+    process blocks on it instead of polling the ring.
+    """
+    ring = SharedPacketRing(name=ring_name)
+    reader = RingReader(ring, {PACKET_TYPE_IDS[packet_type]}, start=0)
+    dispatcher = PacketDispatcher([packet_type], player_indexes, decoder)
+    writer = open_writer(packet_type, session_date, PARSER_MAPPING[packet_type], output_format, writer_options,
+                         parser_options)
+    parser = PARSER_MAPPING[packet_type](writer, **parser_options)
+    change_filter = change_filter_for(packet_type, PARSER_MAPPING[packet_type], dedupe)
+    partitioned = getattr(writer, "partitioned", False)  # A `SessionWriter` takes each record's session
+
+    log.info(f"Started parser process for {packet_type}. Writing to {writer.file_name}.")
+
+    while True:
+        stopping = stop_event.is_set()
+        while wakeup.acquire(False):
+            pass  # Every datagram released so far is visible to this read
+        batch = reader.read_batch()
+
+        records = []
+        session_uid = None
+        for data in batch:
+            try:
+                decoded = dispatcher.decode(data)
+                if decoded:
+                    if partitioned:  # Each write holds the records of one session
+                        packet_session = parser.session_uid(decoded[1])
+                        if packet_session != session_uid and records:
+                            _write(writer, packet_type, records, session_uid)
+                            records = []
+                        session_uid = packet_session
+                    record = parser.parse(decoded[1], player_indexes)
+                    records.append(change_filter.filter(record) if change_filter else record)
+            except Exception as e:
+                log.error(f"Error processing {packet_type}: {e}")
+
+        _write(writer, packet_type, records, session_uid if partitioned else None)  # Also flushes due records
+
+        if not batch:
+            if stopping:
+                break  # Drained everything written before the stop request
+            wakeup.acquire(timeout=idle_timeout)
+
+    parser.close_file()
+    ring.close()
+    log.info(f"Stopping {packet_type} parser process.", read=reader.read, overrun=reader.overrun,
+             **({"unchanged": change_filter.dropped} if change_filter else {}))
+
+
+class ParserProcessPool:
+    """
+    Runs one parser process per packet type, fed from a shared-memory ring instead of `PacketQueue`.
+
+    Used by `MainTelemetryListener(parser_processes=True)` so that parsing and JSON encoding
+    do not compete with packet receive for the GIL. Datagrams cross the process boundary as
+    raw bytes in the ring, so nothing is pickled.
+    """
+
+    def __init__(self, packet_types, player_indexes, session_date, decoder="ctypes",
+                 slot_count=4096, idle_timeout=0.5, output_format="json", writer_options=None, dedupe=None,
+                 parser_options=None):
+        """
+        Creates the ring and starts the parser processes.
+
+        Args:
+            packet_types (list): Packet types to parse, one process each.
+            player_indexes (list): Player indexes to extract data for.
+            session_date (str): Unique timestamp for file naming.
+            decoder (str): "ctypes" or "numpy", see `PacketDispatcher`.
+            slot_count (int): Datagrams the ring holds; a process further behind loses the oldest.
+            idle_timeout (float): Longest an idle parser process blocks waiting for a datagram.
+            output_format (str | list): Output file format(s), see `open_writer`.
+            writer_options (dict, optional): Writer options passed to each process's `open_writer`.
+            dedupe (bool | dict, optional): Drop records that repeat earlier ones, see `change_filter_for`.
+            parser_options (dict, optional): packet_type -> keyword arguments for its parser.
+        """
+        self.ring = SharedPacketRing(slot_count)
+        self.stop_event = multiprocessing.Event()
+        self.subscribed = bytearray(256)
+        self.wakeups = [None] * 256  # packet_id -> semaphore of the process parsing it
+        self.processes = {}
+
+        for packet_type in packet_types:
+            packet_id = PACKET_TYPE_IDS.get(packet_type)
+            if packet_id is None or packet_type not in PARSER_MAPPING:
+                log.warning(f"Unknown packet type {packet_type}, it will not be dispatched.")
+                continue
+
+            self.subscribed[packet_id] = 1
+            self.wakeups[packet_id] = multiprocessing.Semaphore(0)
+            self.processes[packet_type] = multiprocessing.Process(
+                target=_run_parser,
+                args=(self.ring.name, packet_type, player_indexes, session_date, decoder,
+                      self.stop_event, self.wakeups[packet_id], idle_timeout, output_format, writer_options, dedupe,
+                      (parser_options or {}).get(packet_type, {})),
+                name=f"parser-{packet_type}",
+                daemon=True,
+            )
+
+        for process in self.processes.values():
+            process.start()
+
+    def dispatch(self, data):
+        """
+        Writes a subscribed datagram to the ring and wakes its parser process; other packet
+        types never reach it.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+        """
+        packet_id = packet_id_of(data)
+        if packet_id is not None and self.subscribed[packet_id] and self.ring.write(data, packet_id):
+            self.wakeups[packet_id].release()
+
+    def close(self, timeout=5.0):
+        """Lets the processes drain the ring within `timeout`, then frees the shared memory."""
+        self.stop_event.set()
+        for wakeup in self.wakeups:
+            if wakeup is not None:
+                wakeup.release()  # Idle processes see the stop request now, not after `idle_timeout`
+        deadline = time.monotonic() + timeout
+
+        for packet_type, process in self.processes.items():
+            process.join(timeout=max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                log.warning(f"Parser process for {packet_type} did not stop in time, terminating it.")
+                process.terminate()
+                process.join()
+
+        log.info("Shared ring closed.", written=self.ring.write_sequence, oversized=self.ring.oversized)
+        self.ring.close()
+        self.ring.unlink()
@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# The packages import each other relative to event_detection_telemetry, as when run from there
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
@@ -0,0 +1,90 @@
+"""
+Regenerates the golden parser records in `tests/golden/` from the baseline parsers.
+
+Each packet type gets one constructed F1 22 datagram, parsed by the hand-written parser of
+the baseline commit, read with `git show`, for every car and for a selection of cars. Run
+from the repository: `python event_detection_telemetry/tests/make_golden.py`.
+"""
+import ctypes
+import json
+import pathlib
+import random
+import subprocess
+import sys
+import types
+from f1_22_telemetry.packets import HEADER_FIELD_TO_PACKET_TYPE
+
+BASELINE = "9f7603f"
+GOLDEN_DIR = pathlib.Path(__file__).parent / "golden"
+PACKAGE_DIR = pathlib.Path(__file__).parent.parent
+
+# packet_type -> (baseline module, parser class, packet_id)
+PARSERS = {
+    "motion": ("motion/motion_data_listener.py", "MotionDataParser", 0),
+    "session": ("session/session_data_listener.py", "SessionDataParser", 1),
+    "lap": ("lap/lap_data_listener.py", "LapDataParser", 2),
+    "event": ("event/event_data_listener.py", "EventDataParser", 3),
+    "participants": ("participants/participants_data_listener.py", "ParticipantsDataParser", 4),
+    "carSetup": ("carSetup/car_setup_listener.py", "CarSetupParser", 5),
+    "carTelemetry": ("carTelemetry/car_telemetry_listener.py", "CarTelemetryParser", 6),
+    "carStatus": ("carStatus/car_status_listener.py", "CarStatusParser", 7),
+    "finalClassification": ("finalClassification/final_classification_listener.py",
+                            "FinalClassificationParser", 8),
+    "carDamage": ("carDamage/car_damage_listener.py", "CarDamageParser", 10),
+    "sessionHistory": ("sessionHistory/session_history_listener.py", "SessionHistoryParser", 11),
+}
+
+# Player indexes each datagram is parsed with: the player's car, then a selection
+PLAYER_INDEXES = [None, [0, 3, 21]]
+
+
+def baseline_parser(path, class_name):
+    """Loads a parser class from the baseline commit's source."""
+    source = subprocess.run(["git", "show", f"{BASELINE}:event_detection_telemetry/{path}"], cwd=PACKAGE_DIR,
+                            check=True, capture_output=True, text=True).stdout
+    module = types.ModuleType(f"baseline_{class_name}")
+    exec(compile(source, path, "exec"), module.__dict__)
+    return getattr(module, class_name)
+
+
+def make_datagram(packet_id, packet_class, rng):
+    """
+    Builds a datagram of small field values, so counts stay in range, names are printable
+    and no float is NaN, with a valid header.
+    """
+    data = bytearray(rng.choice((0, 1, 2, 5, 9, 65)) for _ in range(ctypes.sizeof(packet_class)))
+    packet = packet_class.from_buffer(data)
+    packet.header.packet_format = 2022
+    packet.header.game_major_version = 1
+    packet.header.game_minor_version = 19
+    packet.header.packet_version = 1
+    packet.header.packet_id = packet_id
+    packet.header.session_uid = 0x0123456789ABCDEF
+    packet.header.session_time = 1234.5
+    packet.header.frame_identifier = 4321
+    packet.header.player_car_index = 3
+    packet.header.secondary_player_car_index = 255
+    if packet_id == 3:
+        packet.event_string_code[:] = b"PENA"
+    del packet
+    return bytes(data)
+
+
+def main():
+    GOLDEN_DIR.mkdir(exist_ok=True)
+    for packet_type, (path, class_name, packet_id) in PARSERS.items():
+        packet_class = HEADER_FIELD_TO_PACKET_TYPE[(2022, 1, packet_id)]
+        data = make_datagram(packet_id, packet_class, random.Random(packet_id))
+        parser = baseline_parser(path, class_name)
+        cases = [{"player_indexes": player_indexes,
+                  "record": parser(None).parse(packet_class.from_buffer_copy(data), player_indexes)}
+                 for player_indexes in PLAYER_INDEXES]
+        golden = {"packet_format": 2022, "packet_id": packet_id, "datagram": data.hex(), "cases": cases}
+        with open(GOLDEN_DIR / f"{packet_type}.json", "w") as f:
+            json.dump(golden, f, indent=1)
+            f.write("\n")
+        print(f"Wrote {packet_type}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
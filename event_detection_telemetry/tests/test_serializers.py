@@ -0,0 +1,52 @@
+import json
+import math
+import random
+import struct
+import pytest
+from recordWriter.serializers import make_encoder
+
+EDGE_FLOATS = [
+    0.0, -0.0, 0.1, 0.1 + 0.2, 1.5, -2.75, 1 / 3, 100.0, 123456789.123, 1e15, 1e16, 1.5e16, 1e22, 1e-4,
+    1e-05, 1.5e-05, 9.99e-05, 1e-06, 1.2e-07, 5e-324, 2.2250738585072014e-308, 1.7976931348623157e308,
+    float(struct.unpack("<f", struct.pack("<f", 0.1))[0]), 4.999999987376214e-07,
+]
+
+EDGE_RECORDS = [
+    {"timestamp": 1234.5, "packet_type": "Edge", "floats": EDGE_FLOATS},
+    {"nan": math.nan, "inf": math.inf, "ninf": -math.inf, "list": [1.0, math.nan, [math.inf]]},
+    {"ints": [0, -1, 255, 2 ** 31, 2 ** 53 + 1, 2 ** 63 - 1, -2 ** 63, 2 ** 64 - 1]},
+    {"big": 2 ** 64, "bigger": -2 ** 70},
+    {"nested": [[], [[]], [[1, [2.5, [1e-07, {}]]]], {"a": {"b": {"c": [1e16, "x"]}}}]},
+    {"players": {3: {"name": "A  B", "tyres": [16, 17]}, 21: {"name": "e-07 1e-05 0.00001", "lap": 0.00001}}},
+    {"text": "Pérez", "quote": 'say "hi"', "escape": "tab\tnew\nline\\"},
+    {"empty_list": [], "empty_dict": {}, "bool": [True, False, None]},
+]
+
+
+def _random_records(count=200, seed=7):
+    """Records of random float32 and float64 values and their sums, like parsed telemetry."""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        floats = [struct.unpack("<f", rng.getrandbits(32).to_bytes(4, "little"))[0] for _ in range(8)]
+        floats += [rng.uniform(-1e6, 1e6), rng.random() * 10 ** rng.randint(-12, 20)]
+        records.append({"timestamp": rng.random() * 5000, "players": {i: floats[i:] for i in range(3)}})
+    return records
+
+
+@pytest.mark.parametrize("output_format", ["json", "ndjson"])
+@pytest.mark.parametrize("serializer", ["orjson", "msgspec"])
+def test_matches_json(serializer, output_format):
+    pytest.importorskip(serializer)
+    stdlib = make_encoder(output_format, "json")
+    encode = make_encoder(output_format, serializer)
+    assert encode is not stdlib, f"{serializer} failed the startup check"
+
+    for record in EDGE_RECORDS + _random_records():
+        assert encode(record) == stdlib(record)
+
+
+def test_stdlib_formats():
+    record = {"players": {3: [1.5, math.nan]}}
+    assert make_encoder("json", "json")(record) == json.dumps(record, indent=4) + "\n"
+    assert make_encoder("ndjson", "json")(record) == '{"players":{"3":[1.5,NaN]}}\n'
@@ -0,0 +1,25 @@
+import json
+import pathlib
+import pytest
+from dispatch.packet_dispatcher import PacketDispatcher
+from listener import PARSER_MAPPING
+
+GOLDEN_DIR = pathlib.Path(__file__).parent / "golden"
+PACKET_TYPES = sorted(path.stem for path in GOLDEN_DIR.glob("*.json"))
+
+
+def test_every_parser_has_a_golden_record():
+    assert PACKET_TYPES == sorted(PARSER_MAPPING)
+
+
+@pytest.mark.parametrize("decoder", ["ctypes", "numpy"])
+@pytest.mark.parametrize("packet_type", PACKET_TYPES)
+def test_matches_baseline_parser(packet_type, decoder):
+    """Records equal those of the hand-written baseline parsers, see `make_golden.py`."""
+    golden = json.loads((GOLDEN_DIR / f"{packet_type}.json").read_text())
+    decoded = PacketDispatcher([packet_type], decoder=decoder).decode(bytes.fromhex(golden["datagram"]))
+    assert decoded is not None and decoded[0] == packet_type
+
+    for case in golden["cases"]:
+        record = PARSER_MAPPING[packet_type](None).parse(decoded[1], case["player_indexes"])
+        assert json.loads(json.dumps(record)) == case["record"]
@@ -0,0 +1,213 @@
+import numpy as np
+from dispatch.packet_dispatcher import PACKET_TYPE_IDS
+from eventEngine.detectors import ACTIVE_RESULT_STATUS
+from vectorized.numpy_decoder import MAX_CARS, datagram_routes, route_datagram
+
+INITIAL_COVARIANCE = 1e6  # Weak prior: the first samples decide the fit
+
+
+def _rls_reset(theta, covariance, cars):
+    """Forgets the fits of the given cars."""
+    theta[cars] = 0.0
+    covariance[cars] = np.eye(theta.shape[1]) * INITIAL_COVARIANCE
+
+
+def _rls_update(theta, covariance, x, y, cars, forgetting):
+    """
+    One recursive least squares step of the fit `y = theta[0] + theta[1] * x` for the given cars.
+
+    Args:
+        theta (numpy.ndarray): (cars, 2) coefficients, updated in place.
+        covariance (numpy.ndarray): (cars, 2, 2) inverse information matrices, updated in place.
+        x (numpy.ndarray): Regressor of every car.
+        y (numpy.ndarray): Observation of every car.
+        cars (numpy.ndarray): Indexes of the cars that have a new sample.
+        forgetting (float): Weight of the previous samples, in (0, 1]; below 1 follows a changing slope.
+    """
+    regressors = np.stack([np.ones(len(cars)), x[cars]], axis=1)
+    p = covariance[cars]
+    p_x = np.einsum("nij,nj->ni", p, regressors)
+    gain = p_x / (forgetting + np.einsum("ni,ni->n", regressors, p_x))[:, None]
+    error = y[cars] - np.einsum("ni,ni->n", regressors, theta[cars])
+    theta[cars] += gain * error[:, None]
+    covariance[cars] = (p - np.einsum("ni,nj->nij", gain, p_x)) / forgetting
+
+
+class TyreDegradationModel:
+    """
+    Online tyre wear and lap time fall-off of every car, per stint.
+
+    Two linear fits per car are kept with recursive least squares, so memory is constant and
+    each packet updates all 22 cars with a few vectorized operations:
+
+    * wear: the most worn tyre's `tyres_wear` from Car Damage, against laps driven in the
+      stint (completed laps plus the fraction of the current one);
+    * lap time: `last_lap_time_in_ms` of every clean lap, against the stint lap it was
+      driven on. Laps touching the pit lane, invalidated laps and the first lap seen are
+      left out. The fall-off includes the fuel burn, as on the timing screen.
+
+    A stint starts, and both fits are reset, when Car Status shows a new compound or a
+    fresh set (`tyres_age_laps` dropping). Older samples are down-weighted by the
+    forgetting factors, so the slopes follow the tyre as it degrades. Only the receiver may
+    call `feed()`.
+    """
+
+    def __init__(self, cliff_wear=70.0, wear_forgetting=0.995, lap_time_forgetting=0.95):
+        """
+        Args:
+            cliff_wear (float): Wear in percent at which a tyre is considered past its cliff.
+            wear_forgetting (float): Weight kept by earlier wear samples on every Car Damage packet.
+            lap_time_forgetting (float): Weight kept by earlier lap times on every completed lap.
+        """
+        self.cliff_wear = cliff_wear
+        self.wear_forgetting = wear_forgetting
+        self.lap_time_forgetting = lap_time_forgetting
+
+        self.wear_fit = np.zeros((MAX_CARS, 2))
+        self.wear_covariance = np.zeros((MAX_CARS, 2, 2))
+        self.lap_time_fit = np.zeros((MAX_CARS, 2))
+        self.lap_time_covariance = np.zeros((MAX_CARS, 2, 2))
+        self.wear_samples = np.zeros(MAX_CARS, dtype=np.int64)
+        self.lap_time_samples = np.zeros(MAX_CARS, dtype=np.int64)
+
+        self.stints = np.zeros(MAX_CARS, dtype=np.int64)  # Stint number; 0 until Car Status arrives
+        self.compounds = np.zeros(MAX_CARS, dtype=np.int64)  # Visual compound of the stint
+        self.tyre_ages = np.full(MAX_CARS, -1, dtype=np.int64)
+        self.stint_laps = np.zeros(MAX_CARS, dtype=np.int64)  # Laps completed in the stint
+        self.lap_fractions = np.zeros(MAX_CARS)
+        self.wear = np.full(MAX_CARS, np.nan)  # Most worn tyre, in percent
+        self.laps = np.zeros(MAX_CARS, dtype=np.int64)  # Current lap number
+        self.clean_laps = np.zeros(MAX_CARS, dtype=bool)  # Current lap still counts for the lap time fit
+
+        self.session_uid = None
+        self.track_length = None
+
+        self.routes = datagram_routes({PACKET_TYPE_IDS[packet_type]: packet_type
+                                       for packet_type in ("lap", "carStatus", "carDamage", "session")})
+        self.reset()
+
+    def reset(self):
+        """Forgets every stint; called when a new session starts."""
+        every_car = np.arange(MAX_CARS)
+        _rls_reset(self.wear_fit, self.wear_covariance, every_car)
+        _rls_reset(self.lap_time_fit, self.lap_time_covariance, every_car)
+        self.wear_samples[:] = 0
+        self.lap_time_samples[:] = 0
+        self.stints[:] = 0
+        self.compounds[:] = 0
+        self.tyre_ages[:] = -1
+        self.stint_laps[:] = 0
+        self.lap_fractions[:] = 0.0
+        self.wear[:] = np.nan
+        self.laps[:] = 0
+        self.clean_laps[:] = False
+        self.track_length = None
+
+    def feed(self, data):
+        """
+        Applies a raw datagram if it is a Lap Data, Car Status, Car Damage or Session packet.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+        """
+        routed = route_datagram(self.routes, data)
+        if routed is None:
+            return
+
+        (packet_type, offset, dtype, _), (_, session_uid, _, _) = routed
+        if session_uid != self.session_uid:
+            self.reset()
+            self.session_uid = session_uid
+        if packet_type == "session":
+            self.track_length = int(np.frombuffer(data, dtype=dtype, count=1)["track_length"][0]) or None
+            return
+
+        cars = np.frombuffer(data, dtype=dtype, count=MAX_CARS, offset=offset)
+        if packet_type == "lap":
+            self._lap(cars)
+        elif packet_type == "carStatus":
+            self._status(cars)
+        else:
+            self._damage(cars)
+
+    def _status(self, cars):
+        """Starts a new stint for the cars that changed compound or fitted a fresh set."""
+        compounds = cars["visual_tyre_compound"].astype(np.int64)
+        ages = cars["tyres_age_laps"].astype(np.int64)
+        new_stint = np.flatnonzero((compounds != self.compounds) | (ages < self.tyre_ages))
+        if new_stint.size:
+            _rls_reset(self.wear_fit, self.wear_covariance, new_stint)
+            _rls_reset(self.lap_time_fit, self.lap_time_covariance, new_stint)
+            self.wear_samples[new_stint] = 0
+            self.lap_time_samples[new_stint] = 0
+            self.stint_laps[new_stint] = 0
+            self.stints[new_stint] += 1
+        self.compounds[:] = compounds
+        self.tyre_ages[:] = ages
+
+    def _lap(self, cars):
+        """Counts stint laps and fits the lap time of every clean lap completed in this packet."""
+        laps = cars["current_lap_num"].astype(np.int64)
+        if self.track_length:
+            self.lap_fractions[:] = np.clip(cars["lap_distance"] / self.track_length, 0.0, 1.0)
+
+        completed = np.flatnonzero((laps > self.laps) & (self.laps > 0))
+        if completed.size:
+            lap_times = cars["last_lap_time_in_ms"] / 1000.0
+            timed = completed[self.clean_laps[completed] & (lap_times[completed] > 0) & (self.stints[completed] > 0)]
+            if timed.size:
+                _rls_update(self.lap_time_fit, self.lap_time_covariance, self.stint_laps.astype(np.float64),
+                            lap_times, timed, self.lap_time_forgetting)
+                self.lap_time_samples[timed] += 1
+            self.stint_laps[completed] += 1
+        started = laps != self.laps
+        self.clean_laps[started] = self.laps[started] > 0  # The first lap seen may have started anywhere
+        self.laps[:] = laps
+
+        # Pit lane, invalidated laps and retirements keep the current lap out of the lap time fit
+        self.clean_laps &= ((cars["pit_status"] == 0) & (cars["current_lap_invalid"] == 0)
+                            & (cars["result_status"] == ACTIVE_RESULT_STATUS))
+
+    def _damage(self, cars):
+        """Fits the most worn tyre's wear against the laps driven in the stint."""
+        self.wear[:] = cars["tyres_wear"].max(axis=1)
+        fitted = np.flatnonzero(self.stints > 0)
+        if fitted.size:
+            _rls_update(self.wear_fit, self.wear_covariance, self.stint_laps + self.lap_fractions, self.wear,
+                        fitted, self.wear_forgetting)
+            self.wear_samples[fitted] += 1
+
+    def car(self, car_idx):
+        """
+        Returns:
+            dict: A car's stint, tyre age and wear, the fitted wear per lap and lap time fall-off
+                (seconds lost per lap), and laps until the most worn tyre reaches `cliff_wear`.
+                Estimates are None until a stint has enough samples.
+        """
+        stint_laps = int(self.stint_laps[car_idx]) + float(self.lap_fractions[car_idx])
+        wear = float(self.wear[car_idx])
+        wear_per_lap = float(self.wear_fit[car_idx, 1]) if self.wear_samples[car_idx] > 1 and stint_laps >= 1 else None
+        lap_time_fall_off = float(self.lap_time_fit[car_idx, 1]) if self.lap_time_samples[car_idx] >= 3 else None
+
+        laps_until_cliff = None
+        if wear >= self.cliff_wear:
+            laps_until_cliff = 0.0
+        elif wear_per_lap and wear_per_lap > 0:
+            laps_until_cliff = round((self.cliff_wear - wear) / wear_per_lap, 1)
+        return {
+            "car_index": car_idx,
+            "stint": int(self.stints[car_idx]),
+            "visual_tyre_compound": int(self.compounds[car_idx]),
+            "tyres_age_laps": int(self.tyre_ages[car_idx]),
+            "wear": None if np.isnan(wear) else round(wear, 2),
+            "wear_per_lap": None if wear_per_lap is None else round(wear_per_lap, 3),
+            "lap_time_fall_off": None if lap_time_fall_off is None else round(lap_time_fall_off, 3),
+            "laps_until_cliff": laps_until_cliff,
+        }
+
+    def cars(self):
+        """
+        Returns:
+            list: `car()` of every car that is on a stint.
+        """
+        return [self.car(car_idx) for car_idx in np.flatnonzero(self.stints > 0).tolist()]
@@ -0,0 +1,238 @@
+import ctypes
+import functools
+import numpy as np
+from decoders.registry import HEADER_LAYOUTS, PACKET_CLASSES, packet_class_of
+
+# Cars in the per-car array of every all-cars packet
+MAX_CARS = 22
+
+# Field holding the per-car array in each all-cars packet, by packet id
+_CAR_ARRAY_FIELDS_BY_ID = {
+    0: "car_motion_data",
+    2: "lap_data",
+    4: "participants",
+    5: "car_setups",
+    6: "car_telemetry_data",
+    7: "car_status_data",
+    8: "classification_data",
+    10: "car_damage_data",
+}
+
+# Packet class -> field holding its per-car array, for every supported game year
+CAR_ARRAY_FIELDS = {
+    packet_class: _CAR_ARRAY_FIELDS_BY_ID[packet_id]
+    for (_, packet_id), packet_class in PACKET_CLASSES.items() if packet_id in _CAR_ARRAY_FIELDS_BY_ID
+}
+
+_CTYPES_TO_NUMPY = {
+    ctypes.c_uint8: "u1",
+    ctypes.c_int8: "i1",
+    ctypes.c_uint16: "<u2",
+    ctypes.c_int16: "<i2",
+    ctypes.c_uint32: "<u4",
+    ctypes.c_int32: "<i4",
+    ctypes.c_uint64: "<u8",
+    ctypes.c_int64: "<i8",
+    ctypes.c_float: "<f4",
+    ctypes.c_double: "<f8",
+    ctypes.c_char: "S1",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def ctypes_to_dtype(ctype):
+    """
+    Builds the NumPy dtype with the exact memory layout of a ctypes type.
+
+    Structures and unions keep their ctypes field offsets, so packed (`_pack_ = 1`)
+    packets map onto datagrams byte for byte.
+
+    Args:
+        ctype (type): A ctypes scalar, array, structure or union type.
+
+    Returns:
+        numpy.dtype: The equivalent dtype.
+    """
+    if issubclass(ctype, ctypes.Array):
+        if ctype._type_ is ctypes.c_char:
+            return np.dtype(f"S{ctype._length_}")
+        return np.dtype((ctypes_to_dtype(ctype._type_), (ctype._length_,)))
+
+    if issubclass(ctype, (ctypes.Structure, ctypes.Union)):
+        names = [name for name, _ in ctype._fields_]
+        return np.dtype({
+            "names": names,
+            "formats": [ctypes_to_dtype(field_type) for _, field_type in ctype._fields_],
+            "offsets": [getattr(ctype, name).offset for name in names],
+            "itemsize": ctypes.sizeof(ctype),
+        })
+
+    return np.dtype(_CTYPES_TO_NUMPY[ctype])
+
+
+def decode_cars(data, packet_class=None):
+    """
+    Maps the per-car array of an all-cars packet onto a structured array without copying.
+
+    Args:
+        data (bytes): The raw UDP datagram (or any buffer, e.g. a ctypes packet).
+        packet_class (type, optional): The packet class. Read from the header if omitted.
+
+    Returns:
+        numpy.ndarray: Read-only structured array with one row per car.
+    """
+    packet_class = packet_class or packet_class_of(data)
+    field_name = CAR_ARRAY_FIELDS[packet_class]
+    array_type = dict(packet_class._fields_)[field_name]
+    return np.frombuffer(data, dtype=ctypes_to_dtype(array_type._type_), count=array_type._length_,
+                         offset=getattr(packet_class, field_name).offset)
+
+
+def car_array_layout(packet_class):
+    """
+    Returns:
+        tuple: (offset, car dtype) of the per-car array of an all-cars packet class.
+    """
+    field_name = CAR_ARRAY_FIELDS[packet_class]
+    return getattr(packet_class, field_name).offset, ctypes_to_dtype(dict(packet_class._fields_)[field_name]._type_)
+
+
+def datagram_routes(packet_types):
+    """
+    Builds the routing table of an engine that reads raw datagrams with `np.frombuffer`.
+
+    Args:
+        packet_types (dict): packet_id -> packet type name, of the packets the engine reads.
+
+    Returns:
+        dict: (packet_format, packet_id) -> (packet type, offset, dtype, packet size) for every
+            supported game year. All-cars packets map to their per-car array and car dtype,
+            other packets to offset 0 and the packet dtype.
+    """
+    routes = {}
+    for (packet_format, packet_id), packet_class in PACKET_CLASSES.items():
+        if packet_id not in packet_types:
+            continue
+        if packet_class in CAR_ARRAY_FIELDS:
+            offset, dtype = car_array_layout(packet_class)
+        else:
+            offset, dtype = 0, ctypes_to_dtype(packet_class)
+        routes[(packet_format, packet_id)] = (packet_types[packet_id], offset, dtype, ctypes.sizeof(packet_class))
+    return routes
+
+
+def route_datagram(routes, data):
+    """
+    Looks a raw datagram up in a routing table and reads its header.
+
+    Args:
+        routes (dict): (packet_format, packet_id) -> route tuple whose last item is the packet
+            size, e.g. from `datagram_routes()`.
+        data (bytes): The raw UDP datagram.
+
+    Returns:
+        tuple: (route, (packet_id, session_uid, session_time, frame_identifier)), or None if the
+            packet is not routed or the datagram is shorter than its packet.
+    """
+    packet_format = data[0] | data[1] << 8
+    layout = HEADER_LAYOUTS.get(packet_format)
+    if layout is None or len(data) <= layout[0]:
+        return None
+    route = routes.get((packet_format, data[layout[0]]))
+    if route is None or len(data) < route[-1]:
+        return None
+    return route, layout[1].unpack_from(data)
+
+
+def car_columns(data, packet_class=None, fields=None):
+    """
+    Returns column arrays for all cars in one step.
+
+    Args:
+        data (bytes): The raw UDP datagram.
+        packet_class (type, optional): The packet class. Read from the header if omitted.
+        fields (list, optional): Fields to return. Defaults to every per-car field.
+
+    Returns:
+        dict: Field name -> NumPy array over all cars (zero copy views into `data`).
+    """
+    cars = decode_cars(data, packet_class)
+    return {name: cars[name] for name in (fields or cars.dtype.names)}
+
+
+def _to_python(value):
+    """Converts a NumPy field value to what the ctypes packet attribute would return."""
+    if isinstance(value, np.void):
+        return RecordView(value)
+    if isinstance(value, np.ndarray):
+        return CarArrayView(value) if value.dtype.names else value.tolist()
+    return value.item()
+
+
+class RecordView:
+    """Attribute access over a single structured record, mirroring a ctypes structure."""
+
+    __slots__ = ("record",)
+
+    def __init__(self, record):
+        self.record = record
+
+    def __getattr__(self, name):
+        try:
+            return _to_python(self.record[name])
+        except (KeyError, ValueError):
+            raise AttributeError(name) from None
+
+
+class CarArrayView:
+    """Sequence over a structured per-car array, mirroring a ctypes array of structures."""
+
+    __slots__ = ("array",)
+
+    def __init__(self, array):
+        self.array = array
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CarArrayView(self.array[index])
+        return RecordView(self.array[index])
+
+    def __iter__(self):
+        for record in self.array:
+            yield RecordView(record)
+
+    @property
+    def columns(self):
+        """Field name -> column array for all cars (zero copy)."""
+        return {name: self.array[name] for name in self.array.dtype.names}
+
+
+class NumpyPacket(RecordView):
+    """
+    Zero-copy NumPy view of a datagram that the parsers can consume in place of a ctypes packet.
+
+    Only the fields a parser actually reads are converted to Python values, and per-car
+    arrays are exposed as `CarArrayView` objects whose `columns` cover all 22 cars at once.
+    """
+
+    __slots__ = ("packet_class",)
+
+    def __init__(self, data, packet_class):
+        """
+        Maps a datagram onto the dtype of its packet class.
+
+        Args:
+            data (bytes): The raw UDP datagram.
+            packet_class (type): The F1 22 or F1 23 packet class the datagram was sent as.
+        """
+        super().__init__(np.frombuffer(data, dtype=ctypes_to_dtype(packet_class), count=1)[0])
+        self.packet_class = packet_class
+
+    @property
+    def cars(self):
+        """The structured per-car array, or None for packets without one."""
+        field_name = CAR_ARRAY_FIELDS.get(self.packet_class)
+        return self.record[field_name] if field_name else None